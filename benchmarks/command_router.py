@@ -0,0 +1,89 @@
+"""Per-update filter cost: one handler per command vs the single CommandRouter.
+
+pyrogram checks every registered MessageHandler's filter until one matches,
+so with one handler per command each group message pays for every command
+filter. This replays that check loop for both layouts and reports CPU
+microseconds per message for plain group traffic and for a command.
+
+Usage: python benchmarks/command_router.py [messages]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "0" * 32)
+
+from pyrogram import Client, enums, filters, types
+from pyrogram.handlers import MessageHandler
+
+from handlers import (
+    MediaHandler, AdminHandler, SudoHandler, ExemptionHandler, QuickActionsHandler, CommandRouter
+)
+
+HANDLER_CLASSES = (MediaHandler, AdminHandler, SudoHandler, ExemptionHandler, QuickActionsHandler)
+
+
+async def noop(client, message):
+    pass
+
+
+def per_command_handlers():
+    """The previous layout: filters.command(...) & filters.me (& filters.group) per command."""
+    handlers = []
+    for handler_class in HANDLER_CLASSES:
+        group_commands = getattr(handler_class, "GROUP_COMMANDS", set())
+        for command in handler_class.COMMANDS:
+            flt = filters.command(command, prefixes=".") & filters.me
+            if command in group_commands:
+                flt = flt & filters.group
+            handlers.append(MessageHandler(noop, flt))
+    return handlers
+
+
+def router_handlers(client: Client):
+    """The router layout: a single prefix/ownership filter."""
+    router = CommandRouter(client)
+    for handler_class in HANDLER_CLASSES:
+        for command in handler_class.COMMANDS:
+            router.add(command, noop, command in getattr(handler_class, "GROUP_COMMANDS", set()))
+    return [MessageHandler(noop, router.filter)]
+
+
+def make_message(client: Client, text: str, outgoing: bool) -> types.Message:
+    chat = types.Chat(id=-1001234567890, type=enums.ChatType.SUPERGROUP, title="Bench")
+    user = types.User(id=1 if outgoing else 42, is_self=outgoing, first_name="user")
+    return types.Message(id=1, chat=chat, from_user=user, text=text, outgoing=outgoing, client=client)
+
+
+async def check_loop(client: Client, handlers, message) -> bool:
+    """What the dispatcher does for each update: test filters until one matches."""
+    for handler in handlers:
+        if await handler.check(client, message):
+            return True
+    return False
+
+
+async def main(count: int):
+    client = Client("benchmark", api_id=1, api_hash="0" * 32, in_memory=True)
+    client.me = types.User(id=1, is_self=True, first_name="me", username="me")
+
+    layouts = (("per-command handlers", per_command_handlers()), ("command router", router_handlers(client)))
+    samples = (
+        ("group text", make_message(client, "hello everyone", outgoing=False)),
+        ("own command", make_message(client, ".checkstatus", outgoing=True)),
+    )
+    for layout, handlers in layouts:
+        for label, message in samples:
+            started = time.process_time()
+            for _ in range(count):
+                await check_loop(client, handlers, message)
+            elapsed = time.process_time() - started
+            print(f"{layout:>21} | {label:<11}: {elapsed / count * 1e6:7.1f} µs CPU/message "
+                  f"({len(handlers)} handlers)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,177 @@
+"""End-to-end throughput of the whole bot against an in-process fake Telegram.
+
+Builds the real MediaCleanerBot wiring around a FakeClient (see
+fake_client.py), feeds it synthetic group traffic through pyrogram's own
+dispatcher, waits for every scheduled deletion to finish and reports:
+updates/s handled, deletions/s, p50/p99 deletion lateness past each
+message's deadline, API calls per deletion and peak RSS.
+
+Runs in a temporary directory, so the bot's data files are never touched.
+Deadlines are real time: a run takes at least the sticker delay plus the
+5s random jitter, so keep the delays short.
+
+Usage: python benchmarks/end_to_end.py [--updates N] [--chats N] [--media-ratio R] ...
+       python benchmarks/end_to_end.py --help
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    traffic = parser.add_argument_group("traffic")
+    traffic.add_argument("--updates", type=int, default=20000, help="group updates to feed")
+    traffic.add_argument("--rate", type=float, default=0, help="updates/s to feed at (0 = as fast as possible)")
+    traffic.add_argument("--chats", type=int, default=20, help="managed groups")
+    traffic.add_argument("--users", type=int, default=1000, help="distinct senders")
+    traffic.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for chat and sender activity")
+    traffic.add_argument("--media-ratio", type=float, default=0.2, help="share of updates carrying media")
+    traffic.add_argument("--mix", default="photo=50,video=20,sticker=20,animation=10",
+                         help="relative weights per media kind")
+    traffic.add_argument("--album-ratio", type=float, default=0.05, help="share of media posts that are albums")
+    traffic.add_argument("--bot-ratio", type=float, default=0.02, help="share of senders that are bots")
+    api = parser.add_argument_group("fake Telegram")
+    api.add_argument("--latency-ms", type=float, default=20, help="simulated round trip per API call")
+    api.add_argument("--flood-rate", type=float, default=0.0, help="probability a delete raises FloodWait")
+    api.add_argument("--flood-seconds", type=int, default=3, help="FloodWait duration")
+    api.add_argument("--no-rights", type=float, default=0.1, help="share of chats without delete rights")
+    bot = parser.add_argument_group("bot settings")
+    bot.add_argument("--delay", type=int, default=1, help="media deletion delay (s)")
+    bot.add_argument("--sticker-delay", type=int, default=2, help="sticker/GIF deletion delay (s)")
+    bot.add_argument("--max-per-minute", type=int, default=100000, help="global deletion budget")
+    bot.add_argument("--workers", type=int, default=4, help="deletion workers")
+    bot.add_argument("--fast-path", action="store_true", help="detect media from raw updates")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="max seconds to wait for the backlog")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def run(args):
+    from fake_client import FakeClient, TrafficGenerator, parse_mix, no_rights_chats
+    from main import MediaCleanerBot
+    from utils.loop_watchdog import LOOP_LAG
+
+    random.seed(args.seed)  # The bot's per-message delay jitter
+    generator = TrafficGenerator(args.chats, args.users, args.media_ratio, parse_mix(args.mix),
+                                 args.album_ratio, args.bot_ratio, args.skew, args.seed)
+    packets = generator.packets(args.updates)
+    rss_before = peak_rss_mb()
+
+    lateness = {"media": [], "sticker": []}
+    deleted_at = []
+
+    def on_delete(chat_id, message_ids):
+        now = time.time()
+        deleted_at.append(now)
+        for message_id in message_ids:
+            # Still live in the journal until the batch is marked done
+            media_type, due, _, _ = bot.deletion_journal.live[(chat_id, message_id)]
+            lateness["sticker" if media_type in ("sticker", "animation") else "media"].append(now - due)
+
+    client = FakeClient(args.latency_ms / 1000, args.flood_rate, args.flood_seconds,
+                        no_rights_chats(generator.chat_ids(), args.no_rights, args.seed), seed=args.seed,
+                        on_delete=on_delete)
+    bot = MediaCleanerBot(client)
+    media_handler = bot.media_handler
+
+    await client.start()
+    await media_handler.start()
+    bot.loop_watchdog.start()
+    await asyncio.sleep(0)  # Let the dispatcher pick up the registered handlers
+
+    print(f"▶️ Feeding {len(packets)} updates across {args.chats} chats "
+          f"({'as fast as possible' if not args.rate else f'{args.rate:g}/s'})...")
+    started, cpu_started = time.perf_counter(), time.process_time()
+    if args.rate:
+        for index, packet in enumerate(packets):
+            client.feed(packet)
+            ahead = started + (index + 1) / args.rate - time.perf_counter()
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+    else:
+        for packet in packets:
+            client.feed(packet)
+    while not client.idle():
+        await asyncio.sleep(0.005)
+    ingest_elapsed = time.perf_counter() - started
+    ingest_cpu = time.process_time() - cpu_started
+
+    print(f"⏳ Waiting for {media_handler.pending_count()} pending deletions...")
+    deadline = time.perf_counter() + args.drain_timeout + max(args.delay, args.sticker_delay) + 5
+    # Batches being deleted right now are no longer queued anywhere, so check busy workers too
+    while (media_handler.pending_count() or media_handler.workers.busy_workers) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    left_over = media_handler.pending_count() + media_handler.workers.busy_workers
+
+    await bot.loop_watchdog.stop()
+    await media_handler.shutdown()
+    await client.stop()
+    bot.log_listener.stop()
+
+    deleted = client.deleted
+    api_calls = sum(client.api_calls.values())
+    deleting_for = deleted_at[-1] - deleted_at[0] if len(deleted_at) > 1 else 0
+
+    print("\n📊 Results")
+    print(f"• Updates: {len(packets)} in {ingest_elapsed:.2f}s = {len(packets) / ingest_elapsed:,.0f} updates/s "
+          f"({ingest_cpu / len(packets) * 1e6:.1f} µs CPU/update)")
+    print(f"• Media scheduled: {media_handler.accepted} | rejected: "
+          + ", ".join(f"{step} {count}" for step, count in media_handler.rejections.items() if count))
+    print(f"• Deleted: {deleted} in {deleting_for:.2f}s = "
+          f"{deleted / deleting_for if deleting_for else float(deleted):,.0f} deletions/s"
+          + (f" ({left_over} still pending after timeout)" if left_over else ""))
+    for kind, values in lateness.items():
+        if values:
+            print(f"• Lateness ({kind}): p50 {percentile(values, 0.5) * 1000:.0f} ms, "
+                  f"p99 {percentile(values, 0.99) * 1000:.0f} ms, max {max(values) * 1000:.0f} ms")
+    print(f"• API calls: {api_calls} = {api_calls / deleted if deleted else float('nan'):.3f} per deletion ("
+          + ", ".join(f"{method} {count}" for method, count in client.api_calls.most_common()) + ")")
+    print(f"• FloodWaits injected: {client.flood_waits}")
+    if LOOP_LAG.count():
+        print(f"• Event loop lag: p99 ≤ {LOOP_LAG.quantile(0.99) * 1000:g} ms")
+    print(f"• Peak RSS: {peak_rss_mb():.1f} MB ({rss_before:.1f} MB after generating the traffic)")
+
+
+def main():
+    args = parse_args()
+    # Config reads the environment at import time
+    os.environ.update({
+        "API_ID": "1",
+        "API_HASH": "0" * 32,
+        "DELETION_DELAY_SECONDS": str(args.delay),
+        "STICKER_DELETION_DELAY_SECONDS": str(args.sticker_delay),
+        "MAX_DELETIONS_PER_MINUTE": str(args.max_per_minute),
+        "DELETION_WORKERS": str(args.workers),
+        "FAST_PATH": str(args.fast_path).lower(),
+    })
+    os.environ.pop("SESSION_STRING", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FORMAT", "text")
+
+    with tempfile.TemporaryDirectory(prefix="mediacleaner-bench-") as workdir:
+        os.chdir(workdir)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Event-loop throughput: the default asyncio loop vs uvloop.
+
+Runs the same workloads on each loop implementation and reports operations
+per second: raw callbacks, task creation, queue hand-offs between tasks and
+the deletion scheduler firing a backlog of due entries into a worker queue
+(the shape of the bot's pipeline, without any network I/O). Loops that are
+not installed are skipped.
+
+Usage: python benchmarks/event_loop.py [operations]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "0" * 32)
+
+from utils.scheduler import DeletionScheduler
+
+WORKERS = 4
+
+
+def loop_factories():
+    factories = [("asyncio", asyncio.new_event_loop)]
+    try:
+        import uvloop
+        factories.append(("uvloop", uvloop.new_event_loop))
+    except ImportError:
+        print("⚠️ uvloop is not installed - only the asyncio loop is measured")
+    return factories
+
+
+async def callbacks(count: int):
+    """call_soon chain: the loop's bare scheduling overhead."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    remaining = [count]
+
+    def step():
+        remaining[0] -= 1
+        if remaining[0]:
+            loop.call_soon(step)
+        else:
+            done.set_result(None)
+
+    loop.call_soon(step)
+    await done
+
+
+async def tasks(count: int):
+    """Create and await short-lived tasks in batches, like per-update handler tasks."""
+    async def work():
+        await asyncio.sleep(0)
+
+    batch = 1000
+    for start in range(0, count, batch):
+        await asyncio.gather(*(work() for _ in range(min(batch, count - start))))
+
+
+async def queue_handoff(count: int):
+    """Producer -> asyncio.Queue -> worker tasks, as between the scheduler and the worker pool."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            queue.task_done()
+            if item is None:
+                return
+
+    workers = [asyncio.get_running_loop().create_task(worker()) for _ in range(WORKERS)]
+    for i in range(count):
+        await queue.put(i)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+
+async def scheduler_backlog(count: int):
+    """DeletionScheduler firing `count` overdue entries into worker tasks."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    processed = [0]
+    finished = asyncio.get_running_loop().create_future()
+
+    async def on_due(entries):
+        await queue.put(entries)
+
+    async def worker():
+        while True:
+            entries = await queue.get()
+            scheduler.mark_done(entries)
+            processed[0] += len(entries)
+            if processed[0] == count:
+                finished.set_result(None)
+
+    scheduler = DeletionScheduler(on_due)
+    workers = [asyncio.get_running_loop().create_task(worker()) for _ in range(WORKERS)]
+    for i in range(count):
+        scheduler.schedule(-100 - i % 50, i, "photo", 0, user_id=i % 500)
+    await finished
+    await scheduler.stop()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+WORKLOADS = (
+    ("call_soon callbacks", callbacks),
+    ("task create + await", tasks),
+    ("queue hand-offs", queue_handoff),
+    ("scheduler backlog", scheduler_backlog),
+)
+
+
+def run(factory, workload, count: int) -> float:
+    loop = factory()
+    try:
+        started = time.perf_counter()
+        loop.run_until_complete(workload(count))
+        return time.perf_counter() - started
+    finally:
+        loop.close()
+
+
+def main(count: int):
+    results = {}
+    factories = loop_factories()
+    for name, workload in WORKLOADS:
+        for loop_name, factory in factories:
+            run(factory, workload, min(count, 1000))  # warm up
+            elapsed = run(factory, workload, count)
+            results[name, loop_name] = elapsed
+            print(f"{loop_name:>8} | {name:<20}: {count / elapsed:12,.0f} ops/s")
+        if len(factories) > 1:
+            baseline = results[name, factories[0][0]]
+            print(f"{'':>8} | {'':<20}  uvloop speedup: {baseline / results[name, 'uvloop']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,312 @@
+"""In-process stand-in for pyrogram.Client plus a synthetic group traffic generator.
+
+FakeClient is a real pyrogram Client that never connects: start() only runs
+pyrogram's own dispatcher workers, so raw updates fed to it are parsed and
+routed to the registered handlers exactly as in production. The API methods
+the bot uses are emulated in memory, with optional latency and injected
+FloodWait errors, and every call is counted.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from pyrogram import Client, enums, raw, types, utils
+from pyrogram.errors import FloodWait
+
+ME_ID = 999000001
+MEDIA_KINDS = ("photo", "video", "sticker", "animation", "document", "audio", "voice", "video_note")
+
+_MISSING = object()
+
+Packet = Tuple[raw.base.Update, Dict[int, raw.base.User], Dict[int, raw.base.Chat]]
+
+
+def roundtrip(obj):
+    """Serialize and read back, so optional fields look exactly like they do off the wire."""
+    return raw.core.TLObject.read(BytesIO(obj.write()))
+
+
+def make_media(kind: str):
+    """Build a raw MessageMedia constructor of the given kind."""
+    if kind == "photo":
+        return raw.types.MessageMediaPhoto(photo=raw.types.Photo(
+            id=1, access_hash=1, file_reference=b"", date=0, dc_id=2,
+            sizes=[raw.types.PhotoSize(type="x", w=800, h=600, size=50000)]
+        ))
+    attributes = {
+        "sticker": [raw.types.DocumentAttributeSticker(alt="🙂", stickerset=raw.types.InputStickerSetEmpty()),
+                    raw.types.DocumentAttributeImageSize(w=512, h=512)],
+        "animation": [raw.types.DocumentAttributeAnimated(),
+                      raw.types.DocumentAttributeVideo(duration=3, w=320, h=240)],
+        "video": [raw.types.DocumentAttributeVideo(duration=10, w=640, h=360),
+                  raw.types.DocumentAttributeFilename(file_name="clip.mp4")],
+        "video_note": [raw.types.DocumentAttributeVideo(duration=10, w=240, h=240, round_message=True)],
+        "document": [raw.types.DocumentAttributeFilename(file_name="notes.pdf")],
+        "audio": [raw.types.DocumentAttributeAudio(duration=180, title="song")],
+        "voice": [raw.types.DocumentAttributeAudio(duration=5, voice=True)],
+    }[kind]
+    return raw.types.MessageMediaDocument(document=raw.types.Document(
+        id=2, access_hash=1, file_reference=b"", date=0, mime_type="application/octet-stream",
+        size=100000, dc_id=2, attributes=attributes
+    ))
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'photo=50,sticker=30,video=20' -> relative weights per media kind."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in MEDIA_KINDS:
+            raise ValueError(f"Unknown media kind {kind!r}, expected one of {', '.join(MEDIA_KINDS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+class TrafficGenerator:
+    """Synthetic incoming supergroup updates
+
+    Chats and senders are picked from Zipf-like distributions (a few busy
+    chats and heavy posters, a long tail of quiet ones). A fraction of the
+    messages carry media drawn from `mix`, and some media posts are albums.
+    """
+
+    def __init__(self, chats: int = 20, users: int = 1000, media_ratio: float = 0.2,
+                 mix: Optional[Dict[str, float]] = None, album_ratio: float = 0.05,
+                 bot_ratio: float = 0.02, skew: float = 1.1, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.media_ratio = media_ratio
+        self.album_ratio = album_ratio
+        self.mix = mix or {"photo": 50, "video": 20, "sticker": 20, "animation": 10}
+        self._mix_kinds = list(self.mix)
+        self._mix_weights = list(self.mix.values())
+        self.channel_ids = [1500000000 + i for i in range(chats)]
+        self.user_ids = list(range(1, users + 1))
+        self._chat_weights = self._zipf(chats, skew)
+        self._user_weights = self._zipf(users, skew)
+        self._next_message_id = dict.fromkeys(self.channel_ids, 0)
+        self._next_album_id = 1
+
+        self.users = {uid: roundtrip(raw.types.User(
+            id=uid, access_hash=uid, first_name=f"user{uid}", username=f"user{uid}",
+            bot=self.rng.random() < bot_ratio
+        )) for uid in self.user_ids}
+        self.chats = {cid: roundtrip(raw.types.Channel(
+            id=cid, title=f"Group {n}", photo=raw.types.ChatPhotoEmpty(), date=0, access_hash=cid, megagroup=True
+        )) for n, cid in enumerate(self.channel_ids, 1)}
+
+    @staticmethod
+    def _zipf(count: int, skew: float) -> List[float]:
+        total, weights = 0.0, []
+        for rank in range(1, count + 1):
+            total += 1 / rank ** skew
+            weights.append(total)
+        return weights
+
+    def chat_ids(self) -> List[int]:
+        """The chats as the bot sees them (pyrogram's -100 prefixed ids)."""
+        return [utils.get_channel_id(cid) for cid in self.channel_ids]
+
+    def _message(self, channel_id: int, user_id: int, media=None, grouped_id: Optional[int] = None,
+                 date: Optional[int] = None) -> Packet:
+        self._next_message_id[channel_id] += 1
+        message_id = self._next_message_id[channel_id]
+        message = raw.types.Message(
+            id=message_id, peer_id=raw.types.PeerChannel(channel_id=channel_id), date=date or int(time.time()),
+            message="" if media else "hello there, just some text", media=media, grouped_id=grouped_id,
+            from_id=raw.types.PeerUser(user_id=user_id)
+        )
+        update = roundtrip(raw.types.UpdateNewChannelMessage(message=message, pts=message_id, pts_count=1))
+        return update, self.users, self.chats
+
+    def packets(self, count: int) -> List[Packet]:
+        """Generate `count` updates (an album counts once per item)."""
+        rng = self.rng
+        packets: List[Packet] = []
+        while len(packets) < count:
+            channel_id = rng.choices(self.channel_ids, cum_weights=self._chat_weights)[0]
+            user_id = rng.choices(self.user_ids, cum_weights=self._user_weights)[0]
+            if rng.random() >= self.media_ratio:
+                packets.append(self._message(channel_id, user_id))
+                continue
+            if rng.random() < self.album_ratio:
+                grouped_id = self._next_album_id
+                self._next_album_id += 1
+                for _ in range(min(rng.randint(2, 10), count - len(packets))):
+                    packets.append(self._message(channel_id, user_id, make_media(rng.choice(("photo", "video"))),
+                                                 grouped_id))
+                continue
+            kind = rng.choices(self._mix_kinds, self._mix_weights)[0]
+            packets.append(self._message(channel_id, user_id, make_media(kind)))
+        return packets
+
+
+class FakeClient(Client):
+    """pyrogram Client that runs its dispatcher but answers API calls from memory
+
+    Emulated: get_me, get_chat, get_dialogs, get_chat_member, get_chat_history,
+    delete_messages, resolve_peer and invoke(messages.Search). `no_rights` chats report us as a plain member;
+    `flood_rate` is the probability that a delete raises FloodWait for
+    `flood_seconds`; `on_delete(chat_id, message_ids)` observes every
+    successful delete.
+    """
+
+    def __init__(self, latency: float = 0.0, flood_rate: float = 0.0, flood_seconds: int = 3,
+                 no_rights: Iterable[int] = (), workers: int = 4, seed: int = 42,
+                 on_delete: Optional[Callable[[int, List[int]], None]] = None):
+        super().__init__("fake_client", api_id=1, api_hash="0" * 32, in_memory=True, workers=workers)
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.no_rights = set(no_rights)
+        self.on_delete = on_delete
+        self.rng = random.Random(seed)
+        self.me = types.User(id=ME_ID, is_self=True, first_name="me", username="me")
+        self.api_calls: Counter = Counter()
+        self.flood_waits = 0
+        self.deleted = 0
+        # chat id -> message id -> raw message, for history and deletes
+        self.history: Dict[int, Dict[int, raw.base.Message]] = {}
+        self.titles: Dict[int, str] = {}
+        self._peers: Tuple[Dict, Dict] = ({}, {})
+        self._dispatching = False
+
+    async def start(self):
+        """Run the dispatcher workers only; nothing connects."""
+        if not self._dispatching:
+            await self.dispatcher.start()
+            self._dispatching = True
+        return self
+
+    async def stop(self, block: bool = True):
+        if self._dispatching:
+            await self.dispatcher.stop()
+            self._dispatching = False
+        return self
+
+    def feed(self, packet: Packet):
+        """Hand a raw update to the dispatcher, as the session would on receipt."""
+        update, users, chats = packet
+        message = update.message
+        chat_id = utils.get_channel_id(message.peer_id.channel_id)
+        self.add_message(chat_id, message.id, message)
+        if chat_id not in self.titles:
+            self.titles[chat_id] = chats[message.peer_id.channel_id].title
+        self._peers = (users, chats)
+        self.dispatcher.updates_queue.put_nowait(packet)
+
+    def add_message(self, chat_id: int, message_id: int, message: Optional[raw.base.Message] = None):
+        """Make a message exist so it can be deleted (replays have ids but no raw message)."""
+        self.history.setdefault(chat_id, {})[message_id] = message
+
+    def idle(self) -> bool:
+        """True once every fed update has gone through the handlers."""
+        # Parsing never yields, so a worker is either waiting for an update or holding its lock
+        return self.dispatcher.updates_queue.empty() and not any(lock.locked() for lock in self.dispatcher.locks_list)
+
+    async def _api(self, method: str):
+        self.api_calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_me(self) -> types.User:
+        await self._api("get_me")
+        return self.me
+
+    async def get_chat(self, chat_id: Union[int, str]) -> types.Chat:
+        await self._api("get_chat")
+        return types.Chat(id=chat_id, type=enums.ChatType.SUPERGROUP,
+                          title=self.titles.get(chat_id, str(chat_id)), client=self)
+
+    async def get_dialogs(self, limit: int = 0):
+        """Every chat with stored history, one emulated API call per 100 dialogs."""
+        chat_ids = list(self.history)[:limit or None]
+        for index, chat_id in enumerate(chat_ids):
+            if index % 100 == 0:
+                await self._api("get_dialogs")
+            chat = types.Chat(id=chat_id, type=enums.ChatType.SUPERGROUP,
+                              title=self.titles.get(chat_id, str(chat_id)), client=self)
+            yield types.Dialog(chat=chat, top_message=None, unread_messages_count=0,
+                               unread_mentions_count=0, unread_mark=False, is_pinned=False, client=self)
+
+    async def get_chat_member(self, chat_id: Union[int, str], user_id: Union[int, str]) -> types.ChatMember:
+        await self._api("get_chat_member")
+        if chat_id in self.no_rights:
+            return types.ChatMember(status=enums.ChatMemberStatus.MEMBER, client=self)
+        return types.ChatMember(status=enums.ChatMemberStatus.ADMINISTRATOR,
+                                privileges=types.ChatPrivileges(can_delete_messages=True), client=self)
+
+    async def get_chat_history(self, chat_id: Union[int, str], limit: int = 0, offset: int = 0,
+                               offset_id: int = 0, offset_date=None):
+        """Newest first, one emulated API call per 100 messages like the real paging."""
+        users, chats = self._peers
+        messages = sorted((item for item in self.history.get(chat_id, {}).items() if item[1] is not None),
+                          reverse=True)
+        if offset_id:
+            messages = [item for item in messages if item[0] < offset_id]
+        messages = messages[offset:]
+        if limit:
+            messages = messages[:limit]
+        for index, (_, message) in enumerate(messages):
+            if index % 100 == 0:
+                await self._api("get_chat_history")
+            yield await types.Message._parse(self, message, users, chats)
+
+    async def resolve_peer(self, peer_id: Union[int, str]) -> raw.base.InputPeer:
+        if isinstance(peer_id, int) and peer_id < 0:
+            return raw.types.InputPeerChannel(channel_id=utils.get_channel_id(peer_id), access_hash=0)
+        return raw.types.InputPeerUser(user_id=int(peer_id), access_hash=0)
+
+    async def invoke(self, query: raw.core.TLObject, *args, **kwargs):
+        """Only messages.Search is emulated: server-side media filters over the stored history."""
+        if not isinstance(query, raw.functions.messages.Search):
+            raise NotImplementedError(f"FakeClient cannot invoke {type(query).__name__}")
+        from utils.fast_path import get_raw_media_type
+        from utils.purge import SEARCH_FILTERS
+
+        await self._api("search_messages")
+        filter_types = {search_filter.__name__: types for types, search_filter in SEARCH_FILTERS}
+        wanted = filter_types.get(type(query.filter).__name__)  # None: InputMessagesFilterEmpty
+        chat_id = utils.get_channel_id(query.peer.channel_id)
+        from_id = getattr(query.from_id, "user_id", None)
+        matches = [
+            message for message_id, message in sorted(self.history.get(chat_id, {}).items(), reverse=True)
+            if message is not None
+            and (not query.offset_id or message_id < query.offset_id)
+            and message_id > query.min_id
+            and (not query.min_date or message.date >= query.min_date)
+            and (not query.max_date or message.date <= query.max_date)
+            and (from_id is None or getattr(message.from_id, "user_id", None) == from_id)
+            and (wanted is None or get_raw_media_type(message.media) in wanted)
+        ]
+        users, chats = self._peers
+        page = matches[:query.limit]
+        senders = {message.from_id.user_id for message in page if isinstance(message.from_id, raw.types.PeerUser)}
+        return raw.types.messages.ChannelMessages(
+            pts=0, count=len(matches), messages=page, topics=[],
+            chats=[chats[query.peer.channel_id]] if query.peer.channel_id in chats else [],
+            users=[users[user_id] for user_id in senders if user_id in users]
+        )
+
+    async def delete_messages(self, chat_id: Union[int, str], message_ids: Union[int, Iterable[int]],
+                              revoke: bool = True) -> int:
+        await self._api("delete_messages")
+        if self.flood_rate and self.rng.random() < self.flood_rate:
+            self.flood_waits += 1
+            raise FloodWait(value=self.flood_seconds)
+        if chat_id in self.no_rights:
+            raise Exception("MESSAGE_DELETE_FORBIDDEN")
+        message_ids = [message_ids] if isinstance(message_ids, int) else list(message_ids)
+        history = self.history.get(chat_id, {})
+        deleted = [message_id for message_id in message_ids if history.pop(message_id, _MISSING) is not _MISSING]
+        self.deleted += len(deleted)
+        if self.on_delete and deleted:
+            self.on_delete(chat_id, deleted)
+        return len(deleted)
+
+
+def no_rights_chats(chat_ids: Sequence[int], ratio: float, seed: int = 42) -> List[int]:
+    """Pick the chats in which the account is not an admin."""
+    return random.Random(seed).sample(list(chat_ids), round(len(chat_ids) * ratio))
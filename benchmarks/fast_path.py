@@ -0,0 +1,82 @@
+"""CPU cost per incoming group update: parsed Message path vs raw fast path.
+
+Feeds synthetic UpdateNewChannelMessage updates (mostly text, some media)
+through pyrogram's own update parser plus our media filter, then through
+utils.fast_path.parse_raw_media, and reports CPU microseconds per update.
+
+Usage: python benchmarks/fast_path.py [updates] [media_ratio]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyrogram import Client, raw
+
+from fake_client import make_media, roundtrip
+from utils.fast_path import MediaEvent, parse_raw_media
+from utils.helpers import media_filter
+
+CHANNEL_ID = 1234567890
+
+
+def make_updates(count: int, media_ratio: float):
+    """Synthetic incoming supergroup updates plus the users/chats maps pyrogram passes along."""
+    rng = random.Random(42)
+    users = {uid: raw.types.User(id=uid, access_hash=uid, first_name=f"user{uid}", username=f"user{uid}")
+             for uid in range(1, 101)}
+    chats = {CHANNEL_ID: raw.types.Channel(id=CHANNEL_ID, title="Bench", photo=raw.types.ChatPhotoEmpty(),
+                                           date=0, access_hash=1, megagroup=True)}
+    updates = []
+    for message_id in range(1, count + 1):
+        media = make_media(rng.choice(("photo", "sticker", "video"))) if rng.random() < media_ratio else None
+        message = raw.types.Message(
+            id=message_id, peer_id=raw.types.PeerChannel(channel_id=CHANNEL_ID), date=int(time.time()),
+            message="" if media else "hello there, just some text", media=media,
+            from_id=raw.types.PeerUser(user_id=rng.randint(1, 100))
+        )
+        updates.append(roundtrip(raw.types.UpdateNewChannelMessage(message=message, pts=message_id, pts_count=1)))
+    users = {uid: roundtrip(user) for uid, user in users.items()}
+    chats = {cid: roundtrip(chat) for cid, chat in chats.items()}
+    return updates, users, chats
+
+
+async def message_path(client: Client, updates, users, chats) -> int:
+    """What the default handler costs: full Message parse, then the media filter."""
+    parse = client.dispatcher.update_parsers[raw.types.UpdateNewChannelMessage]
+    found = 0
+    for update in updates:
+        message, _ = await parse(update, users, chats)
+        if await media_filter(client, message):
+            MediaEvent.from_message(message)
+            found += 1
+    return found
+
+
+async def fast_path(client: Client, updates, users, chats) -> int:
+    """What the fast path costs: inspect the raw constructors only."""
+    found = 0
+    for update in updates:
+        if parse_raw_media(update, users, chats):
+            found += 1
+    return found
+
+
+async def main(count: int, media_ratio: float):
+    client = Client("benchmark", api_id=1, api_hash="0" * 32, in_memory=True)
+    updates, users, chats = make_updates(count, media_ratio)
+
+    print(f"{count} updates, {media_ratio:.0%} media")
+    for name, path in (("Message path", message_path), ("Raw fast path", fast_path)):
+        started = time.process_time()
+        found = await path(client, updates, users, chats)
+        elapsed = time.process_time() - started
+        print(f"{name:>14}: {elapsed / count * 1e6:8.1f} µs CPU/update ({found} media)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+                     float(sys.argv[2]) if len(sys.argv) > 2 else 0.1))
@@ -0,0 +1,246 @@
+"""Replay a recorded traffic trace against the bot at accelerated speed.
+
+Traces come from `.trace start` / TRACE_FILE (see utils/trace.py). The
+replay runs the real MediaCleanerBot wiring around a FakeClient (see
+fake_client.py) on a scaled clock: the Clock injected into the bot and the
+event loop's timers both run `--speed` times faster than real time, so a
+day of traffic takes about 15 minutes at the default 100x. Every media update is
+handed to MediaHandler.handle_media at its recorded (scaled) moment.
+
+Pass the settings you want to evaluate (delays, limits, batch window,
+workers); anything not given uses the bot's configured defaults. The
+report shows backlog, deletion lateness and API usage for those settings.
+
+Caveat: CPU cost is magnified by the speed-up, so the loop lag thresholds
+for load shedding and stall reports are scaled by the same factor.
+
+Usage: python benchmarks/replay.py TRACE [--speed 100] [--delay S] [--max-per-minute N] ...
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from end_to_end import percentile, peak_rss_mb
+from utils.clock import Clock
+
+
+class ScaledClock(Clock):
+    """Clock running `speed` times faster than real time, injected into the bot"""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self._origin = time.monotonic()
+        self._wall_origin = time.time()
+
+    def monotonic(self) -> float:
+        return self._origin + (time.monotonic() - self._origin) * self.speed
+
+    def time(self) -> float:
+        return self._wall_origin + (time.monotonic() - self._origin) * self.speed
+
+    def real_elapsed(self) -> float:
+        return time.monotonic() - self._origin
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop whose timers (asyncio.sleep, wait_for timeouts) run on this clock."""
+        return _ScaledEventLoop(self)
+
+
+class _ScaledEventLoop(asyncio.SelectorEventLoop):
+    """Schedules timers on a ScaledClock and shortens select() timeouts to match"""
+
+    def __init__(self, clock: ScaledClock):
+        super().__init__()
+        self._scaled_clock = clock
+        self._selector = _ScaledSelector(self._selector, clock.speed)
+
+    def time(self) -> float:
+        return self._scaled_clock.monotonic()
+
+
+class _ScaledSelector:
+    """Wraps the loop's selector; a timeout of N scaled seconds waits N/speed real seconds"""
+
+    def __init__(self, selector, speed: float):
+        self._selector = selector
+        self._speed = speed
+
+    def select(self, timeout=None):
+        return self._selector.select(None if timeout is None else timeout / self._speed)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace", help="trace file recorded with .trace or TRACE_FILE")
+    parser.add_argument("--speed", type=float, default=100, help="replay speed-up factor")
+    bot = parser.add_argument_group("bot settings (default: the bot's configuration)")
+    bot.add_argument("--delay", type=int, help="media deletion delay (s)")
+    bot.add_argument("--sticker-delay", type=int, help="sticker/GIF deletion delay (s)")
+    bot.add_argument("--max-per-minute", type=int, help="global deletion budget")
+    bot.add_argument("--max-chat-per-minute", type=int, help="per-chat deletion budget (0 = none)")
+    bot.add_argument("--batch-window-ms", type=int, help="deletion batching window")
+    bot.add_argument("--workers", type=int, help="deletion workers")
+    api = parser.add_argument_group("fake Telegram")
+    api.add_argument("--latency-ms", type=float, default=50, help="round trip per API call")
+    api.add_argument("--flood-rate", type=float, default=0.0, help="probability a delete raises FloodWait")
+    api.add_argument("--flood-seconds", type=int, default=10, help="FloodWait duration")
+    api.add_argument("--no-rights", type=float, default=0.0, help="share of chats without delete rights")
+    parser.add_argument("--sample-seconds", type=float, default=60, help="backlog sampling interval (trace time)")
+    parser.add_argument("--drain-timeout", type=float, default=3600, help="max trace seconds to wait for the backlog")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+async def replay(args, clock: ScaledClock):
+    from fake_client import FakeClient
+    from main import MediaCleanerBot
+    from utils.fast_path import MediaEvent
+    from utils.trace import read_trace
+
+    random.seed(args.seed)
+    started, records = read_trace(args.trace)
+    loop = asyncio.get_running_loop()
+
+    lateness = {"media": [], "sticker": []}
+
+    def on_delete(chat_id, message_ids):
+        now = clock.time()
+        for message_id in message_ids:
+            media_type, due, _, _ = bot.deletion_journal.live[(chat_id, message_id)]
+            lateness["sticker" if media_type in ("sticker", "animation") else "media"].append(now - due)
+
+    client = FakeClient(args.latency_ms / 1000, args.flood_rate, args.flood_seconds, seed=args.seed,
+                        on_delete=on_delete)
+    bot = MediaCleanerBot(client, clock=clock)
+    media_handler = bot.media_handler
+    config = bot.config_manager
+    await client.start()
+    await media_handler.start()
+
+    backlog = []
+    deferred = []
+
+    async def sample():
+        while True:
+            backlog.append(media_handler.pending_count())
+            deferred.append(len(media_handler.deferred))
+            await asyncio.sleep(args.sample_seconds)
+
+    sampler = loop.create_task(sample())
+
+    print(f"▶️ Replaying {args.trace} at {args.speed:g}x (recorded {time.ctime(started)})")
+    print(f"⚙️ delay {config.delay}s, sticker delay {config.sticker_delay}s, "
+          f"{config.max_deletions}/min global, {config.max_chat_deletions or 'no'} per-chat limit, "
+          f"batch window {config.runtime_config.DELETION_BATCH_WINDOW_MS} ms, {config.deletion_workers} workers")
+
+    message_ids = {}
+    chat_rights = random.Random(args.seed)
+    events = 0
+    feed_lag = 0.0
+    offset = 0.0
+    replay_start = loop.time()
+    for record in records:
+        target = replay_start + record.offset
+        wait = target - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        else:
+            feed_lag = max(feed_lag, -wait)
+        chat_id = record.chat_id
+        if chat_id not in message_ids:
+            message_ids[chat_id] = 0
+            if chat_rights.random() < args.no_rights:
+                client.no_rights.add(chat_id)
+        message_ids[chat_id] += 1
+        client.add_message(chat_id, message_ids[chat_id])
+        await media_handler.handle_media(MediaEvent(
+            chat_id, message_ids[chat_id], record.user_id, None, record.is_bot,
+            record.media_type, record.media_group_id, None
+        ))
+        events += 1
+        offset = record.offset
+        if events % 10000 == 0:
+            print(f"… {events} updates, {offset / 3600:.1f}h into the trace, backlog {media_handler.pending_count()}")
+
+    deadline = loop.time() + args.drain_timeout
+    while (media_handler.pending_count() or media_handler.workers.busy_workers) and loop.time() < deadline:
+        await asyncio.sleep(1)
+    left_over = media_handler.pending_count() + media_handler.workers.busy_workers
+    drained_after = loop.time() - replay_start - offset
+
+    sampler.cancel()
+    await media_handler.shutdown()
+    await client.stop()
+    bot.log_listener.stop()
+
+    deleted = client.deleted
+    api_calls = sum(client.api_calls.values())
+    delete_calls = client.api_calls["delete_messages"]
+    hours = max(offset, 1) / 3600
+    print("\n📊 Replay results")
+    print(f"• Trace: {events} media updates over {offset / 3600:.2f}h, replayed in {clock.real_elapsed():.0f}s "
+          f"(fell behind schedule by up to {feed_lag:.1f}s)")
+    print(f"• Scheduled: {media_handler.accepted} | rejected: "
+          + (", ".join(f"{step} {count}" for step, count in media_handler.rejections.items() if count) or "none"))
+    print(f"• Deleted: {deleted}" + (f" | still pending after timeout: {left_over}" if left_over else
+                                      f" | backlog cleared {drained_after:.0f}s after the last update"))
+    print(f"• Backlog: max {max(backlog, default=0)}, mean {sum(backlog) / len(backlog) if backlog else 0:.0f} | "
+          f"waiting for rate budget: max {max(deferred, default=0)} | "
+          f"dropped {media_handler.deferred.total_overflowed} full, {media_handler.deferred.expired} expired")
+    for kind, values in lateness.items():
+        if values:
+            print(f"• Lateness ({kind}): p50 {percentile(values, 0.5):.1f}s, p99 {percentile(values, 0.99):.1f}s, "
+                  f"max {max(values):.1f}s")
+    print(f"• API calls: {api_calls} ({api_calls / hours:,.0f}/h, "
+          f"{api_calls / deleted if deleted else float('nan'):.3f} per deletion) — "
+          + ", ".join(f"{method} {count}" for method, count in client.api_calls.most_common()))
+    print(f"• Delete calls: {delete_calls}, {deleted / delete_calls if delete_calls else 0:.1f} messages per call | "
+          f"FloodWaits: {client.flood_waits}")
+    print(f"• Peak RSS: {peak_rss_mb():.1f} MB")
+
+
+def main():
+    args = parse_args()
+    # Config reads the environment at import time
+    overrides = {
+        "DELETION_DELAY_SECONDS": args.delay,
+        "STICKER_DELETION_DELAY_SECONDS": args.sticker_delay,
+        "MAX_DELETIONS_PER_MINUTE": args.max_per_minute,
+        "MAX_DELETIONS_PER_CHAT_PER_MINUTE": args.max_chat_per_minute,
+        "DELETION_BATCH_WINDOW_MS": args.batch_window_ms,
+        "DELETION_WORKERS": args.workers,
+    }
+    os.environ.update({key: str(value) for key, value in overrides.items() if value is not None})
+    os.environ.update({"API_ID": "1", "API_HASH": "0" * 32, "FAST_PATH": "false"})
+    os.environ.pop("SESSION_STRING", None)
+    os.environ.pop("TRACE_FILE", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FORMAT", "text")
+    # Handler CPU time is magnified by the speed-up; judge loop lag on the real time scale
+    os.environ["SHED_LAG_THRESHOLD_MS"] = str(int(int(os.getenv("SHED_LAG_THRESHOLD_MS", "250")) * args.speed))
+    os.environ["LOOP_STALL_THRESHOLD_MS"] = str(int(int(os.getenv("LOOP_STALL_THRESHOLD_MS", "500")) * args.speed))
+
+    args.trace = os.path.abspath(args.trace)
+    with tempfile.TemporaryDirectory(prefix="mediacleaner-replay-") as workdir:
+        os.chdir(workdir)
+        clock = ScaledClock(args.speed)
+        loop = clock.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(replay(args, clock))
+        finally:
+            loop.close()
+
+
+if __name__ == "__main__":
+    main()
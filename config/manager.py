@@ -1,8 +1,11 @@
 import json
 import os
 from typing import Dict, Any
+from utils.log import get_logger
 from .settings import Config, RuntimeConfig
 
+log = get_logger("config")
+
 class ConfigManager:
     """Manages runtime configuration persistence and access"""
     
@@ -26,7 +29,7 @@ class ConfigManager:
                             setattr(default_runtime, key, value)
                     return default_runtime
         except Exception as e:
-            print(f"Error loading runtime config: {e}")
+            log.error("❌ Error loading runtime config: %s", e)
         
         return RuntimeConfig.from_defaults(self.config)
     
@@ -39,14 +42,20 @@ class ConfigManager:
                 "MAX_DELETIONS_PER_MINUTE": self.runtime_config.MAX_DELETIONS_PER_MINUTE,
                 "OWNER_ID": self.runtime_config.OWNER_ID,
                 "STICKER_GIF_DELETION_ENABLED": self.runtime_config.STICKER_GIF_DELETION_ENABLED,
-                "BOT_ONLY_MODE": self.runtime_config.BOT_ONLY_MODE
+                "BOT_ONLY_MODE": self.runtime_config.BOT_ONLY_MODE,
+                "DELETION_BATCH_WINDOW_MS": self.runtime_config.DELETION_BATCH_WINDOW_MS,
+                "MAX_DELETIONS_PER_CHAT_PER_MINUTE": self.runtime_config.MAX_DELETIONS_PER_CHAT_PER_MINUTE,
+                "MEDIA_TYPE_LIMITS": self.runtime_config.MEDIA_TYPE_LIMITS,
+                "DEFERRED_QUEUE_MAX_SIZE": self.runtime_config.DEFERRED_QUEUE_MAX_SIZE,
+                "DEFERRED_MAX_AGE_SECONDS": self.runtime_config.DEFERRED_MAX_AGE_SECONDS,
+                "DELETION_WORKERS": self.runtime_config.DELETION_WORKERS
             }
             
             with open(self.CONFIG_FILE, 'w') as f:
                 json.dump(config_dict, f, indent=2)
             return True
         except Exception as e:
-            print(f"Error saving runtime config: {e}")
+            log.error("❌ Error saving runtime config: %s", e)
             return False
     
     def update(self, key: str, value: Any) -> bool:
@@ -74,6 +83,14 @@ class ConfigManager:
     def max_deletions(self) -> int:
         return self.runtime_config.MAX_DELETIONS_PER_MINUTE
     
+    @property
+    def max_chat_deletions(self) -> int:
+        return self.runtime_config.MAX_DELETIONS_PER_CHAT_PER_MINUTE
+    
+    @property
+    def media_type_limits(self) -> Dict[str, int]:
+        return self.runtime_config.MEDIA_TYPE_LIMITS
+    
     @property
     def owner_id(self) -> int:
         return self.runtime_config.OWNER_ID
@@ -85,3 +102,20 @@ class ConfigManager:
     @property
     def is_bot_only_mode(self) -> bool:
         return self.runtime_config.BOT_ONLY_MODE
+    
+    @property
+    def batch_window(self) -> float:
+        """Per-chat deletion coalescing window in seconds."""
+        return self.runtime_config.DELETION_BATCH_WINDOW_MS / 1000
+    
+    @property
+    def deferred_max_size(self) -> int:
+        return self.runtime_config.DEFERRED_QUEUE_MAX_SIZE
+    
+    @property
+    def deferred_max_age(self) -> int:
+        return self.runtime_config.DEFERRED_MAX_AGE_SECONDS
+    
+    @property
+    def deletion_workers(self) -> int:
+        return self.runtime_config.DELETION_WORKERS
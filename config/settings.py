@@ -1,6 +1,6 @@
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,7 +16,39 @@ class Config:
     DEFAULT_DELETION_DELAY: int = int(os.getenv("DELETION_DELAY_SECONDS", "40"))
     DEFAULT_STICKER_DELAY: int = int(os.getenv("STICKER_DELETION_DELAY_SECONDS", "360"))
     DEFAULT_MAX_DELETIONS: int = int(os.getenv("MAX_DELETIONS_PER_MINUTE", "20"))
+    DEFAULT_MAX_CHAT_DELETIONS: int = int(os.getenv("MAX_DELETIONS_PER_CHAT_PER_MINUTE", "0"))
     DEFAULT_OWNER_ID: int = int(os.getenv("OWNER_ID", "1873281192"))
+    DEFAULT_BATCH_WINDOW_MS: int = int(os.getenv("DELETION_BATCH_WINDOW_MS", "1500"))
+    DEFAULT_DEFERRED_MAX_SIZE: int = int(os.getenv("DEFERRED_QUEUE_MAX_SIZE", "5000"))
+    DEFAULT_DEFERRED_MAX_AGE: int = int(os.getenv("DEFERRED_MAX_AGE_SECONDS", "3600"))
+    DEFAULT_DELETION_WORKERS: int = int(os.getenv("DELETION_WORKERS", "4"))
+    DELETION_QUEUE_SIZE: int = int(os.getenv("DELETION_QUEUE_SIZE", "200"))  # batches
+    DEDUP_CAPACITY: int = int(os.getenv("DEDUP_CAPACITY", "10000"))  # recent messages remembered
+    # Detect media from raw updates instead of parsed Messages (see utils/fast_path.py)
+    FAST_PATH: bool = os.getenv("FAST_PATH", "false").lower() == "true"
+    
+    # Pipeline logging: level and output format ("json" lines or plain "text")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    
+    # Prometheus metrics: local HTTP port and/or textfile (0 / empty = off)
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_TEXTFILE: str = os.getenv("METRICS_TEXTFILE", "")
+    METRICS_INTERVAL_SECONDS: int = int(os.getenv("METRICS_INTERVAL_SECONDS", "15"))
+    
+    # Chats searched at once by cross-chat purges (.purge) and the downtime/pause backfill
+    PURGE_CONCURRENCY: int = int(os.getenv("PURGE_CONCURRENCY", "4"))
+    
+    # Record anonymized media traffic to this file from startup ("" = off, see utils/trace.py)
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "")
+    
+    # Event loop: stalls longer than this log the blocking stack; USE_UVLOOP=true switches to uvloop if installed
+    LOOP_STALL_THRESHOLD_MS: int = int(os.getenv("LOOP_STALL_THRESHOLD_MS", "500"))
+    USE_UVLOOP: bool = os.getenv("USE_UVLOOP", "false").lower() == "true"
+    
+    # Load shedding thresholds (critical level kicks in at twice these values)
+    SHED_PENDING_THRESHOLD: int = int(os.getenv("SHED_PENDING_THRESHOLD", "5000"))
+    SHED_LAG_THRESHOLD_MS: int = int(os.getenv("SHED_LAG_THRESHOLD_MS", "250"))
 
 @dataclass
 class RuntimeConfig:
@@ -27,6 +59,12 @@ class RuntimeConfig:
     OWNER_ID: int
     STICKER_GIF_DELETION_ENABLED: bool = True
     BOT_ONLY_MODE: bool = False  # ADD THIS LINE
+    DELETION_BATCH_WINDOW_MS: int = 1500
+    MAX_DELETIONS_PER_CHAT_PER_MINUTE: int = 0  # 0 = no per-chat budget
+    MEDIA_TYPE_LIMITS: Dict[str, int] = field(default_factory=dict)  # media type -> deletions/min
+    DEFERRED_QUEUE_MAX_SIZE: int = 5000
+    DEFERRED_MAX_AGE_SECONDS: int = 3600
+    DELETION_WORKERS: int = 4
     
     @classmethod
     def from_defaults(cls, config: Config) -> 'RuntimeConfig':
@@ -37,5 +75,11 @@ class RuntimeConfig:
             MAX_DELETIONS_PER_MINUTE=config.DEFAULT_MAX_DELETIONS,
             OWNER_ID=config.DEFAULT_OWNER_ID,
             STICKER_GIF_DELETION_ENABLED=True,
-            BOT_ONLY_MODE=False  # ADD THIS LINE
+            BOT_ONLY_MODE=False,  # ADD THIS LINE
+            DELETION_BATCH_WINDOW_MS=config.DEFAULT_BATCH_WINDOW_MS,
+            MAX_DELETIONS_PER_CHAT_PER_MINUTE=config.DEFAULT_MAX_CHAT_DELETIONS,
+            MEDIA_TYPE_LIMITS={},
+            DEFERRED_QUEUE_MAX_SIZE=config.DEFAULT_DEFERRED_MAX_SIZE,
+            DEFERRED_MAX_AGE_SECONDS=config.DEFAULT_DEFERRED_MAX_AGE,
+            DELETION_WORKERS=config.DEFAULT_DELETION_WORKERS
         )
\ No newline at end of file
@@ -3,11 +3,15 @@ from .admin import AdminHandler
 from .sudo import SudoHandler
 from .exemptions import ExemptionHandler
 from .quick_actions import QuickActionsHandler
+from .diagnostics import DiagnosticsHandler
+from .router import CommandRouter
 
 __all__ = [
     'MediaHandler', 
     'AdminHandler', 
     'SudoHandler', 
     'ExemptionHandler', 
-    'QuickActionsHandler'
+    'QuickActionsHandler',
+    'DiagnosticsHandler',
+    'CommandRouter'
 ]
@@ -1,48 +1,34 @@
 import asyncio
-from pyrogram import Client, filters
+from typing import Optional
+from pyrogram import Client
 from pyrogram.types import Message
 
 from config import ConfigManager
 from utils import AdminCache
-from utils.helpers import format_user_info
+from utils.permissions import PermissionService
+from utils.helpers import format_user_info, MEDIA_TYPES
+from utils.log import get_logger
+
+log = get_logger("admin")
 
 class AdminHandler:
     """Handles admin-related commands and configuration"""
     
-    def __init__(self, client: Client, config: ConfigManager, admin_cache: AdminCache):
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "config": "view_config",
+        "setconfig": "set_config",
+        "resetconfig": "reset_config",
+        "checkstatus": "check_status",
+        "clearcache": "clear_cache"
+    }
+    
+    def __init__(self, client: Client, config: ConfigManager, admin_cache: AdminCache,
+                 permissions: Optional[PermissionService] = None):
         self.client = client
         self.config = config
         self.admin_cache = admin_cache
-        
-        self._register_handlers()
-    
-    def _register_handlers(self):
-        """Register all admin-related handlers"""
-        print("📌 Registering admin handlers...")
-        
-        # Configuration commands - FIXED
-        @self.client.on_message(filters.command("config", prefixes=".") & filters.me)
-        async def view_config_handler(client: Client, message: Message):
-            await self.view_config(client, message)
-        
-        @self.client.on_message(filters.command("setconfig", prefixes=".") & filters.me)
-        async def set_config_handler(client: Client, message: Message):
-            await self.set_config(client, message)
-        
-        @self.client.on_message(filters.command("resetconfig", prefixes=".") & filters.me)
-        async def reset_config_handler(client: Client, message: Message):
-            await self.reset_config(client, message)
-        
-        # Status and cache commands - FIXED
-        @self.client.on_message(filters.command("checkstatus", prefixes=".") & filters.me)
-        async def check_status_handler(client: Client, message: Message):
-            await self.check_status(client, message)
-        
-        @self.client.on_message(filters.command("clearcache", prefixes=".") & filters.me)
-        async def clear_cache_handler(client: Client, message: Message):
-            await self.clear_cache(client, message)
-        
-        print("✅ Admin handlers registered")
+        self.permissions = permissions or PermissionService(client, admin_cache)
     
     async def view_config(self, client: Client, message: Message):
         """View current runtime configuration."""
@@ -61,6 +47,10 @@ class AdminHandler:
                 f"• **Media Delay:** {self.config.delay} seconds\n"
                 f"• **Sticker/GIF Delay:** {self.config.sticker_delay} seconds\n"
                 f"• **Max Deletions/Min:** {self.config.max_deletions}\n"
+                f"• **Max Deletions/Min per Chat:** {self.config.max_chat_deletions or 'Off'}\n"
+                f"• **Media Type Limits:** {', '.join(f'{t}={n}/min' for t, n in self.config.media_type_limits.items()) or 'Off'}\n"
+                f"• **Batch Window:** {self.config.runtime_config.DELETION_BATCH_WINDOW_MS} ms\n"
+                f"• **Deletion Workers:** {self.config.deletion_workers}\n"
                 f"• **Owner:** {owner_info}\n"
                 f"• **Sticker/GIF Deletion:** {'✅ ON' if self.config.is_sticker_deletion_enabled else '❌ OFF'}\n"
                 f"• **Bot-Only Mode:** {'✅ ON (deleting only bot messages)' if self.config.is_bot_only_mode else '❌ OFF (deleting all messages)'}\n\n"  # ADD THIS LINE
@@ -84,6 +74,12 @@ class AdminHandler:
                     "• `delay` - Media deletion delay (seconds)\n"
                     "• `stickerdelay` - Sticker/GIF delay (seconds)\n"
                     "• `maxdeletions` - Max deletions per minute\n"
+                    "• `batchwindow` - Per-chat deletion batching window (ms)\n"
+                    "• `deferredsize` - Max deletions waiting for rate budget\n"
+                    "• `deferredage` - Max seconds a deletion may wait for rate budget\n"
+                    "• `workers` - Number of concurrent deletion workers\n"
+                    "• `chatlimit` - Max deletions per minute per chat (0 = off)\n"
+                    "• `typelimit <type>` - Max deletions per minute for a media type (0 = off)\n"
                     "• `owner` - Owner user ID\n\n"
                     "**Usage:** `.setconfig delay 60`"
                 )
@@ -95,11 +91,21 @@ class AdminHandler:
             key = message.command[1].lower()
             value = message.command[2]
             
+            # Per-media-type budgets take a type and a limit
+            if key == "typelimit":
+                await self._set_media_type_limit(message)
+                return
+            
             # Map user-friendly keys to config keys
             key_map = {
                 "delay": "DELETION_DELAY_SECONDS",
                 "stickerdelay": "STICKER_DELETION_DELAY_SECONDS",
                 "maxdeletions": "MAX_DELETIONS_PER_MINUTE",
+                "batchwindow": "DELETION_BATCH_WINDOW_MS",
+                "deferredsize": "DEFERRED_QUEUE_MAX_SIZE",
+                "deferredage": "DEFERRED_MAX_AGE_SECONDS",
+                "workers": "DELETION_WORKERS",
+                "chatlimit": "MAX_DELETIONS_PER_CHAT_PER_MINUTE",
                 "owner": "OWNER_ID"
             }
             
@@ -120,6 +126,10 @@ class AdminHandler:
                         new_value = user.id
                     else:
                         new_value = int(value)
+                elif config_key == "MAX_DELETIONS_PER_CHAT_PER_MINUTE":
+                    new_value = int(value)
+                    if new_value < 0:
+                        raise ValueError("Value must not be negative")
                 else:
                     new_value = int(value)
                     if new_value < 1:
@@ -139,7 +149,7 @@ class AdminHandler:
                     f"✅ Configuration updated!\n\n"
                     f"**{key}**: {old_value} → {new_value}"
                 )
-                print(f"⚙️ Config updated: {config_key} = {new_value}")
+                log.info("⚙️ Config updated: %s = %s", config_key, new_value)
             else:
                 await message.edit("❌ Failed to save configuration!")
             
@@ -149,6 +159,41 @@ class AdminHandler:
         await asyncio.sleep(3)
         await message.delete()
     
+    async def _set_media_type_limit(self, message: Message):
+        """Handle `.setconfig typelimit <type> <per minute>`."""
+        try:
+            if len(message.command) < 4:
+                raise ValueError("Usage: `.setconfig typelimit sticker 10`")
+            
+            media_type = message.command[2].lower()
+            if media_type not in MEDIA_TYPES:
+                raise ValueError(f"Unknown media type: {media_type}")
+            
+            new_limit = int(message.command[3])
+            if new_limit < 0:
+                raise ValueError("Value must not be negative")
+            
+            limits = dict(self.config.media_type_limits)
+            old_limit = limits.get(media_type, 0)
+            if new_limit:
+                limits[media_type] = new_limit
+            else:
+                limits.pop(media_type, None)
+            
+            if self.config.update("MEDIA_TYPE_LIMITS", limits):
+                await message.edit(
+                    f"✅ Configuration updated!\n\n"
+                    f"**{media_type} limit**: {old_limit or 'off'} → {new_limit or 'off'}"
+                )
+                log.info("⚙️ Config updated: MEDIA_TYPE_LIMITS = %s", limits)
+            else:
+                await message.edit("❌ Failed to save configuration!")
+        except Exception as e:
+            await message.edit(f"❌ Invalid value: {e}")
+        
+        await asyncio.sleep(3)
+        await message.delete()
+    
     async def reset_config(self, client: Client, message: Message):
         """Reset configuration to defaults from .env file."""
         try:
@@ -156,7 +201,7 @@ class AdminHandler:
             if len(message.command) > 1 and message.command[1].lower() == "confirm":
                 if self.config.reset_to_defaults():
                     await message.edit("✅ Configuration reset to defaults!")
-                    print("⚙️ Configuration reset to defaults")
+                    log.info("⚙️ Configuration reset to defaults")
                 else:
                     await message.edit("❌ Failed to save configuration!")
             else:
@@ -175,19 +220,10 @@ class AdminHandler:
         """Check status in current group."""
         try:
             # Debug admin rights
-            print(f"🔍 Checking admin rights in chat: {message.chat.title} (ID: {message.chat.id})")
+            log.info("🔍 Checking admin rights in chat: %s (ID: %s)", message.chat.title, message.chat.id)
             
-            # Force check admin rights with debug
-            has_rights = await self._check_admin_rights(client, message.chat.id)
-            self.admin_cache.set(message.chat.id, has_rights)
-            
-            # Additional debug info
-            try:
-                me = await client.get_me()
-                member = await client.get_chat_member(message.chat.id, me.id)
-                print(f"🔍 Member status: {member.status}")
-            except Exception as e:
-                print(f"🔍 Error getting member info: {e}")
+            # Same cached answer the media handler uses (.clearcache forces a fresh lookup)
+            has_rights = await self.permissions.can_delete(message.chat.id)
             
             status_text = "✅ Has admin rights with delete permission" if has_rights else "❌ No admin/delete rights"
             
@@ -214,91 +250,46 @@ class AdminHandler:
             for handler in getattr(client, '_custom_handlers', []):
                 if hasattr(handler, 'bot_paused'):
                     pause_status = f"\n⏸️ Bot Status: {'PAUSED - ' + handler.pause_reason if handler.bot_paused else '✅ Running'}"
+                    shedder = handler.load_shedder
+                    pause_status += (
+                        f"\n🔥 Load: {shedder.level_name} (backlog {handler.pending_count()}, "
+                        f"loop lag {shedder.lag * 1000:.0f} ms, {shedder.transitions} transitions)"
+                    )
+                    dedup = handler.dedup
+                    pause_status += (
+                        f"\n🔁 Duplicate updates: {dedup.hits} skipped / {dedup.misses} new "
+                        f"({len(dedup)}/{dedup.capacity} remembered)"
+                    )
+                    exits = ", ".join(f"{step} {count}" for step, count in handler.rejections.items() if count)
+                    pause_status += f"\n🚦 Media checks: {handler.accepted} scheduled, skipped: {exits or 'none'}"
                     break
             
             if hasattr(self, 'data'):
                 sudo_info = f"\n🛡️ Sudo users: {len(self.data.sudo_users)}"
             
+            rate_info = ""
+            if hasattr(self, 'rate_limiter'):
+                headroom = self.rate_limiter.headroom(message.chat.id)
+                rate_info = "\n📊 Rate headroom: " + ", ".join(
+                    f"{scope} {tokens}/{limit}" for scope, (tokens, limit) in headroom.items()
+                )
+            
+            if hasattr(self, 'flood_control'):
+                flood = self.flood_control
+                rate_info += f"\n🌊 Flood control: rate x{flood.rate_factor:.2f}, {flood.flood_waits} FloodWaits"
+                if flood.paused_for > 0:
+                    rate_info += f", paused {flood.paused_for:.0f}s"
+            
             await message.edit(
                 f"Status in '{message.chat.title}': {status_text}"
-                f"{delay_info}{sticker_status}{bot_only_status}{pause_status}{owner_info}{sudo_info}"
+                f"{delay_info}{sticker_status}{bot_only_status}{pause_status}{owner_info}{sudo_info}{rate_info}"
             )
         except Exception as e:
             await message.edit(f"❌ Error: {e}")
         
         await asyncio.sleep(5)
         await message.delete()
-    # Start Admin Rights 
-
-    async def _check_admin_rights(self, client: Client, chat_id: int) -> bool:
-        """Check if the user account has admin rights with delete permission."""
-        try:
-            me = await client.get_me()
-            print(f"🔍 Checking rights for user: {me.first_name} (ID: {me.id})")
-            
-            member = await client.get_chat_member(chat_id, me.id)
-            print(f"🔍 Member status: {member.status} (type: {type(member.status)})")
-            
-            # Check if creator
-            if member.status == "creator" or str(member.status).lower() == "creator":
-                print("✅ User is creator - has all rights")
-                return True
-            
-            # Check if administrator
-            if member.status == "administrator" or str(member.status).lower() == "administrator":
-                print("📋 User is administrator - checking privileges...")
-                # For user accounts as admin, check privileges
-                if hasattr(member, 'privileges') and member.privileges:
-                    print(f"🔍 Privileges object exists: {member.privileges}")
-                    if hasattr(member.privileges, 'can_delete_messages'):
-                        can_delete = bool(member.privileges.can_delete_messages)
-                        print(f"🔍 Can delete messages: {can_delete}")
-                        return can_delete
-                    else:
-                        print("⚠️ can_delete_messages attribute not found, assuming True for admin")
-                        return True
-                else:
-                    print("⚠️ No privileges object found, assuming True for admin")
-                    return True
-            
-            print("❌ User is not creator or administrator")
-            
-            # If not creator or admin, try a different approach
-            # Try to delete a non-existent message to check permissions
-            print("🔍 Trying delete permission test...")
-            try:
-                await client.delete_messages(chat_id, [999999999])
-                print("✅ Delete test passed - has permission")
-                return True
-            except Exception as del_error:
-                error_str = str(del_error).lower()
-                if "message_ids_empty" in error_str or "message to delete not found" in error_str:
-                    # This error means we have permission but message doesn't exist
-                    print("✅ Delete test passed - has permission (message not found)")
-                    return True
-                else:
-                    # Any other error means no permission
-                    print(f"❌ Delete test failed: {del_error}")
-                    return False
-            
-        except Exception as e:
-            print(f"❌ Error checking admin rights: {e}")
-            # Try the delete test as a fallback
-            print("🔍 Trying fallback delete test...")
-            try:
-                await client.delete_messages(chat_id, [999999999])
-                print("✅ Fallback delete test passed")
-                return True
-            except Exception as del_error:
-                error_str = str(del_error).lower()
-                if "message_ids_empty" in error_str or "message to delete not found" in error_str:
-                    print("✅ Fallback delete test passed (message not found)")
-                    return True
-                else:
-                    print(f"❌ Fallback delete test failed: {del_error}")
-            return False
     
-    # Ends Admin Rights 
     async def clear_cache(self, client: Client, message: Message):
         """Clear the admin rights cache."""
         self.admin_cache.clear()
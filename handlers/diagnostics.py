@@ -0,0 +1,196 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from pyrogram import Client
+from pyrogram.types import Message
+
+
+class DiagnosticsHandler:
+    """Live profiling of the running bot: cProfile sessions, tracemalloc snapshots, task counts
+
+    Nothing is instrumented until a command starts it, so there is no
+    overhead while profiling is off. Full results are written to
+    DIAGNOSTICS_DIR; replies only carry a summary.
+    """
+
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "profile": "profile",
+        "memsnap": "memory_snapshot",
+        "tasks": "task_summary"
+    }
+
+    DIAGNOSTICS_DIR = "diagnostics"
+    DEFAULT_PROFILE_SECONDS = 30
+    MAX_PROFILE_SECONDS = 600
+    TOP_ENTRIES = 10
+
+    def __init__(self, client: Client):
+        self.client = client
+        self._profiler: Optional[cProfile.Profile] = None
+        self._profile_stop: Optional[asyncio.Event] = None
+        self._profile_task: Optional[asyncio.Task] = None
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def _output_path(self, kind: str, extension: str) -> str:
+        os.makedirs(self.DIAGNOSTICS_DIR, exist_ok=True)
+        return os.path.join(self.DIAGNOSTICS_DIR, f"{kind}-{datetime.now():%Y%m%d-%H%M%S-%f}.{extension}")
+
+    async def _write(self, path: str, text: str):
+        """Write a report without blocking the event loop."""
+        def write():
+            with open(path, "w") as f:
+                f.write(text)
+        await asyncio.get_running_loop().run_in_executor(None, write)
+
+    async def profile(self, client: Client, message: Message):
+        """Profile the event loop for N seconds: .profile [seconds] | .profile stop"""
+        argument = message.command[1].lower() if len(message.command) > 1 else ""
+
+        if argument == "stop":
+            if self._profiler is None:
+                await message.edit("⚠️ No profiling session is running")
+            else:
+                self._profile_stop.set()
+                await message.edit("⏹️ Stopping profiler...")
+            await asyncio.sleep(3)
+            await message.delete()
+            return
+
+        if self._profiler is not None:
+            await message.edit("⚠️ A profiling session is already running. Use `.profile stop`")
+            await asyncio.sleep(3)
+            await message.delete()
+            return
+
+        try:
+            seconds = min(int(argument), self.MAX_PROFILE_SECONDS) if argument else self.DEFAULT_PROFILE_SECONDS
+            if seconds <= 0:
+                raise ValueError(f"Profile duration must be positive: {seconds}")
+        except ValueError:
+            await message.edit("⚠️ Usage: `.profile [seconds]` or `.profile stop`")
+            await asyncio.sleep(3)
+            await message.delete()
+            return
+
+        self._profiler = cProfile.Profile()
+        self._profile_stop = asyncio.Event()
+        await message.edit(f"🔬 Profiling the event loop for {seconds}s...")
+        # Runs in the background so the session doesn't hold an update worker
+        self._profile_task = asyncio.get_running_loop().create_task(self._run_profile(message, seconds))
+
+    async def _run_profile(self, message: Message, seconds: int):
+        """Profile until the timeout or `.profile stop`, then report."""
+        # The loop runs on this thread, so this profiles every handler and background task
+        self._profiler.enable()
+        try:
+            await asyncio.wait_for(self._profile_stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._profiler.disable()
+        profiler, self._profiler = self._profiler, None
+
+        try:
+            path = self._output_path("profile", "prof")
+            report = io.StringIO()
+            stats = pstats.Stats(profiler, stream=report)
+            await asyncio.get_running_loop().run_in_executor(None, stats.dump_stats, path)
+            stats.sort_stats("cumulative").print_stats(50)
+            await self._write(path.replace(".prof", ".txt"), report.getvalue())
+
+            stats.sort_stats("tottime")
+            text = f"🔬 **Profile** ({stats.total_calls} calls, {stats.total_tt:.2f}s profiled incl. idle polling)\n\n"
+            for func in stats.fcn_list[:self.TOP_ENTRIES]:
+                _, calls, own_time, total_time, _ = stats.stats[func]
+                filename, line, name = func
+                text += f"• `{name}` {os.path.basename(filename)}:{line} — {own_time:.3f}s own, {calls} calls\n"
+            text += f"\n📁 {path}"
+            await message.edit(text)
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+
+        await asyncio.sleep(30)
+        await message.delete()
+
+    async def memory_snapshot(self, client: Client, message: Message):
+        """Top allocators: .memsnap start [frames] | .memsnap | .memsnap stop"""
+        argument = message.command[1].lower() if len(message.command) > 1 else ""
+
+        try:
+            if argument == "start":
+                frames = int(message.command[2]) if len(message.command) > 2 else 1
+                tracemalloc.start(frames)
+                self._last_snapshot = None
+                await message.edit(f"🧠 Tracing allocations ({frames} frame(s)). Use `.memsnap` to snapshot")
+            elif argument == "stop":
+                tracemalloc.stop()
+                self._last_snapshot = None
+                await message.edit("🧠 Allocation tracing stopped")
+            elif not tracemalloc.is_tracing():
+                await message.edit("⚠️ Tracing is off. Start it with `.memsnap start`")
+            else:
+                snapshot = tracemalloc.take_snapshot().filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ))
+                path = self._output_path("memory", "snapshot")
+                await asyncio.get_running_loop().run_in_executor(None, snapshot.dump, path)
+
+                current, peak = tracemalloc.get_traced_memory()
+                text = f"🧠 **Memory** (traced {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB)\n\n"
+                if self._last_snapshot is not None:
+                    text += "**Growth since last snapshot:**\n"
+                    top = snapshot.compare_to(self._last_snapshot, "lineno")[:self.TOP_ENTRIES]
+                    for stat in top:
+                        frame = stat.traceback[0]
+                        text += (f"• {os.path.basename(frame.filename)}:{frame.lineno} "
+                                 f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks)\n")
+                else:
+                    text += "**Top allocators:**\n"
+                    for stat in snapshot.statistics("lineno")[:self.TOP_ENTRIES]:
+                        frame = stat.traceback[0]
+                        text += f"• {os.path.basename(frame.filename)}:{frame.lineno} {stat.size / 1024:.1f} KiB ({stat.count} blocks)\n"
+                self._last_snapshot = snapshot
+                text += f"\n📁 {path}"
+                await message.edit(text)
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+
+        await asyncio.sleep(30)
+        await message.delete()
+
+    async def task_summary(self, client: Client, message: Message):
+        """Count running asyncio tasks grouped by coroutine name."""
+        try:
+            tasks = asyncio.all_tasks()
+            names = Counter()
+            listing = []
+            for task in tasks:
+                coro = task.get_coro()
+                name = getattr(coro, "__qualname__", None) or repr(coro)
+                names[name] += 1
+                stack = task.get_stack(limit=1)
+                where = f"{stack[0].f_code.co_filename}:{stack[0].f_lineno}" if stack else "not started"
+                listing.append(f"{name}\t{task.get_name()}\t{where}")
+
+            path = self._output_path("tasks", "txt")
+            await self._write(path, "\n".join(sorted(listing)) + "\n")
+
+            text = f"🧵 **{len(tasks)} asyncio tasks**\n\n"
+            for name, count in names.most_common(15):
+                text += f"• {count} × `{name}`\n"
+            text += f"\n📁 {path}"
+            await message.edit(text)
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+
+        await asyncio.sleep(15)
+        await message.delete()
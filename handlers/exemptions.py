@@ -1,40 +1,33 @@
 import asyncio
-from datetime import datetime
-from pyrogram import Client, filters
+from pyrogram import Client
 from pyrogram.types import Message
+from typing import Optional
 
 from models import DataManager
 from config import ConfigManager
+from utils import DeletionScheduler
 from utils.helpers import get_user_id_from_input, parse_duration, format_user_info, format_time_left
+from utils.log import get_logger
+
+log = get_logger("exemptions")
 
 class ExemptionHandler:
     """Handles temporary exemption commands"""
     
-    def __init__(self, client: Client, config: ConfigManager, data: DataManager):
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "exempt": "exempt_user",
+        "listexempt": "list_exemptions",
+        "rmexempt": "remove_exemption"
+    }
+    
+    def __init__(self, client: Client, config: ConfigManager, data: DataManager,
+                 scheduler: Optional[DeletionScheduler] = None):
         self.client = client
         self.config = config
         self.data = data
-        
-        self._register_handlers()
+        self.scheduler = scheduler  # Used to cancel deletions already scheduled for the user
     
-    def _register_handlers(self):
-        """Register all exemption-related handlers"""
-        print("📌 Registering exemption handlers...")
-        
-        @self.client.on_message(filters.command("exempt", prefixes=".") & filters.me)
-        async def exempt_user_handler(client: Client, message: Message):
-            await self.exempt_user(client, message)
-        
-        @self.client.on_message(filters.command("listexempt", prefixes=".") & filters.me)
-        async def list_exemptions_handler(client: Client, message: Message):
-            await self.list_exemptions(client, message)
-        
-        @self.client.on_message(filters.command("rmexempt", prefixes=".") & filters.me)
-        async def remove_exemption_handler(client: Client, message: Message):
-            await self.remove_exemption(client, message)
-        
-        print("✅ Exemption handlers registered")
-        
     async def exempt_user(self, client: Client, message: Message):
         """Temporarily exempt a user from media deletion."""
         try:
@@ -76,14 +69,17 @@ class ExemptionHandler:
                 return
             
             # Add exemption
-            expiration_time = datetime.now() + duration
+            expiration_time = self.data.clock.now() + duration
             if self.data.add_exemption(user_id, expiration_time):
                 user_display = f"{first_name} (@{username})" if username else first_name
+                cancelled = self.scheduler.cancel_user(user_id) if self.scheduler else 0
                 await message.edit(
                     f"⏳ Exempted {user_display} (ID: {user_id}) for {duration_str}\n"
                     f"Expires at: {expiration_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                    + (f"\n🚫 Cancelled {cancelled} pending deletions" if cancelled else "")
                 )
-                print(f"⏳ Added temporary exemption for {user_display} (ID: {user_id}) until {expiration_time}")
+                log.info("⏳ Added temporary exemption for %s (ID: %s) until %s, cancelled %s pending deletions",
+                         user_display, user_id, expiration_time, cancelled)
             else:
                 await message.edit("❌ Failed to save exemption!")
             
@@ -106,7 +102,7 @@ class ExemptionHandler:
                 return
             
             exempt_list = "⏳ **Temporary Exemptions:**\n\n"
-            current_time = datetime.now()
+            current_time = self.data.clock.now()
             
             for i, (user_id, exp_time) in enumerate(self.data.temp_exemptions.items(), 1):
                 try:
@@ -154,7 +150,7 @@ class ExemptionHandler:
             if self.data.remove_exemption(user_id):
                 user_display = f"{first_name} (@{username})" if username else first_name
                 await message.edit(f"✅ Removed exemption for {user_display} (ID: {user_id})!")
-                print(f"⏳ Removed exemption for {user_display} (ID: {user_id})")
+                log.info("⏳ Removed exemption for %s (ID: %s)", user_display, user_id)
             else:
                 await message.edit("❌ Failed to save exemptions!")
             
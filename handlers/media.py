@@ -1,69 +1,231 @@
 import asyncio
+import dataclasses
+import os
 import random
-from pyrogram import Client, filters
+import time
+from collections import Counter
+from pyrogram import Client, enums, filters
 from pyrogram.types import Message
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from config import ConfigManager
-from models import DataManager
-from utils import RateLimiter, AdminCache
-from utils.helpers import get_media_type, get_media_emoji, get_sticker_info, format_user_info
+from models import ChatBookmarks, DataManager, DeletionJournal, PurgeCheckpoints
+from utils import RateLimiter, AdminCache, DeletionScheduler, DeletionBatcher, PendingDeletion, UpdateDeduplicator
+from utils.clock import Clock, SYSTEM_CLOCK
+from utils.flood_control import FloodController, RetryLater
+from utils.permissions import PermissionService
+from utils.deferred_queue import DeferredQueue
+from utils.worker_pool import DeletionWorkerPool
+from utils.load_shedder import LoadShedder
+from utils.fast_path import MediaEvent, install_fast_path, parse_raw_media_message
+from utils.log import get_logger
+from utils.metrics import registry, UPDATES_SEEN, MEDIA_DETECTED, DELETIONS, RATE_LIMITED, LATENESS
+from utils.loop_watchdog import LOOP_LAG, LOOP_STALLS, LoopWatchdog
+from utils.trace import TraceRecorder
+from utils.purge import PurgeEngine, PurgeJob, parse_media_types, parse_time_bound, plan_passes, run_bounded
+from utils.helpers import MEDIA_TYPES, get_media_emoji, get_sticker_info, media_filter, get_user_id_from_input
+
+log = get_logger("media")
 
 
 class MediaHandler:
     """Handles media detection and deletion"""
     
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "stickertoggle": "toggle_sticker_deletion",
+        "stickerstatus": "sticker_deletion_status",
+        "clear": "clear_all_media",
+        "testdelete": "test_delete",
+        "botonly": "toggle_bot_only_mode",
+        "botstatus": "bot_only_status",
+        "queue": "queue_status",
+        "stats": "show_stats",
+        "chatweight": "set_chat_weight",
+        "trace": "trace_traffic",
+        "purge": "purge_user"
+    }
+    GROUP_COMMANDS = {"clear", "chatweight"}
+    
+    # Steps of check_media in evaluation order, cheapest first; each counts the messages it rejects
+    DECISION_STEPS = ("paused", "not_media", "sticker_off", "bot_only", "privileged",
+                      "duplicate", "exempted", "no_rights")
+    
+    TRACE_DIR = "traces"  # Default location for .trace start
+    PURGE_REPORT_CHATS = 20  # Per-chat lines in the .purge result
+    BOOKMARK_SAVE_INTERVAL = 30  # Seconds between writes of the per-chat bookmarks
+    MAX_TRANSIENT_ATTEMPTS = 5  # Give up on a batch after this many network failures
+    SHED_STICKER_DELAY_DIVISOR = 4  # Sticker/GIF delay is cut to a quarter while shedding load
+    
     def __init__(self, client: Client, config: ConfigManager, data: DataManager, 
-                 rate_limiter: RateLimiter, admin_cache: AdminCache):
+                 rate_limiter: RateLimiter, admin_cache: AdminCache,
+                 journal: Optional[DeletionJournal] = None,
+                 flood_control: Optional[FloodController] = None,
+                 purge_checkpoints: Optional[PurgeCheckpoints] = None,
+                 bookmarks: Optional[ChatBookmarks] = None,
+                 permissions: Optional[PermissionService] = None,
+                 loop_watchdog: Optional[LoopWatchdog] = None,
+                 clock: Clock = SYSTEM_CLOCK):
         self.client = client
+        self.clock = clock  # Shared by the scheduler, deferred queue, flood control and load shedding
         self.config = config
         self.data = data
         self.rate_limiter = rate_limiter
         self.admin_cache = admin_cache
+        self.permissions = permissions or PermissionService(client, admin_cache)
+        self.flood_control = flood_control or FloodController(rate_limiter, clock)
         self.bot_paused = False
         self.pause_reason = ""
-        
+        # Bulk purges (.clear) share the rate limiter and flood controller with live deletions
+        self.purge = PurgeEngine(client, rate_limiter, self.flood_control, purge_checkpoints)
+        self._purges: Dict[int, asyncio.Task] = {}
+        # Cross-chat purges (.purge) are idempotent to rerun, so they keep no checkpoints
+        self.user_purge = PurgeEngine(client, rate_limiter, self.flood_control)
+        self._user_purge: Optional[asyncio.Task] = None
+        # Last handled message per chat; the gap since it is scanned on startup and .resume
+        self.bookmarks = bookmarks
+        self._gaps: Dict[int, int] = {}  # chat_id -> start of a gap waiting to be scanned
+        self._gap_reasons: List[str] = []
+        if bookmarks is not None:
+            # Pin the gaps now: updates arriving before start() must not move them
+            self._capture_gaps("downtime")
+        self._backfill: Optional[asyncio.Task] = None
+        self._bookmark_saver: Optional[asyncio.Task] = None
+        # Redelivered updates (e.g. after a reconnect) must not schedule a second deletion
+        self.dedup = UpdateDeduplicator(config.config.DEDUP_CAPACITY)
+        self.rejections = dict.fromkeys(self.DECISION_STEPS, 0)
+        self.accepted = 0
+        # Anonymized traffic recording for offline replay (benchmarks/replay.py); off unless started
+        self.trace: Optional[TraceRecorder] = None
+        # Batches are executed by a bounded worker pool, decoupled from update handling
+        self.workers = DeletionWorkerPool(
+            self._delete_batch,
+            config.deletion_workers,
+            config.config.DELETION_QUEUE_SIZE
+        )
+        # Due deletions are coalesced per chat before hitting the API
+        self.batcher = DeletionBatcher(self.workers.submit, lambda: self.config.batch_window)
+        self.scheduler = DeletionScheduler(self._admit_due, journal,
+                                           on_cancel=lambda entries: self.deferred.discard(entries),
+                                           clock=clock)
+        # Due deletions without rate budget wait here instead of being dropped
+        self.deferred = DeferredQueue(
+            rate_limiter,
+            self.batcher.add_many,
+            lambda entry: self.scheduler.mark_done([entry]),
+            lambda: self.config.deferred_max_size,
+            lambda: self.config.deferred_max_age,
+            data.get_chat_weight,
+            clock
+        )
+        # Degrades sticker/GIF handling and logging when the backlog or loop lag is too high
+        self.loop_watchdog = loop_watchdog or LoopWatchdog(clock=clock)
+        self.load_shedder = LoadShedder(
+            self.pending_count,
+            self.loop_watchdog.take_lag,
+            config.config.SHED_PENDING_THRESHOLD,
+            config.config.SHED_LAG_THRESHOLD_MS / 1000,
+            clock
+        )
+        
+        self._register_metrics()
         self._register_handlers()
     
+    def _register_metrics(self):
+        """Expose counters other components already keep; they are read only at export time."""
+        registry.sampled("mediacleaner_pending_deletions", "Deletions anywhere in the pipeline",
+                         "gauge", self.pending_count)
+        registry.sampled("mediacleaner_flood_waits_total", "FloodWait errors received",
+                         "counter", lambda: self.flood_control.flood_waits)
+        registry.sampled("mediacleaner_admin_cache_lookups_total", "AdminCache lookups, by result", "counter",
+                         lambda: {"hit": self.admin_cache.hits, "miss": self.admin_cache.misses}, "result")
+        registry.sampled("mediacleaner_permission_lookups_total", "Admin rights cache misses, by how they were served",
+                         "counter", lambda: {"api": self.permissions.lookups, "coalesced": self.permissions.coalesced},
+                         "source")
+        registry.sampled("mediacleaner_media_rejections_total", "Media messages not scheduled, by check",
+                         "counter", lambda: self.rejections, "step")
+        registry.sampled("mediacleaner_duplicate_updates_total", "Redelivered updates skipped",
+                         "counter", lambda: self.dedup.hits)
+    
+    async def start(self):
+        """Start the deletion scheduler and replay deletions left over from the last run."""
+        await self.permissions.start()
+        restored = self.scheduler.restore()
+        self.scheduler.start()
+        self.workers.start()
+        self.loop_watchdog.start()  # No-op if already running
+        self.load_shedder.start()
+        if self.config.config.TRACE_FILE:
+            self.trace = TraceRecorder(self.config.config.TRACE_FILE)
+            log.info("🎞️ Recording media traffic to %s", self.config.config.TRACE_FILE)
+        if restored:
+            log.info("♻️ Restored %s pending deletions from journal", restored)
+        if self.purge.checkpoints and self.purge.checkpoints.checkpoints:
+            log.info("♻️ %s interrupted purges can be continued with .clear resume",
+                     len(self.purge.checkpoints.checkpoints))
+        if self.bookmarks is not None:
+            self._bookmark_saver = asyncio.create_task(self._save_bookmarks())
+            if not self.bot_paused:
+                self._start_backfill()
+    
+    async def shutdown(self):
+        """Stop the deletion scheduler and flush the journal to disk."""
+        pending = self.pending_count()
+        # Running purges stop here; their checkpoints let .clear resume continue them
+        purges = list(self._purges.values()) + [task for task in (self._user_purge, self._backfill, self._bookmark_saver)
+                                                if task]
+        for task in purges:
+            task.cancel()
+        await asyncio.gather(*purges, return_exceptions=True)
+        await self.load_shedder.stop()
+        await self.loop_watchdog.stop()
+        await self.deferred.stop()
+        await self.batcher.stop()
+        await self.workers.stop()
+        await self.scheduler.stop()
+        if self.trace:
+            self.trace.close()
+        if self.bookmarks is not None:
+            self.bookmarks.save()
+        log.info("💾 Saved %s pending deletions to journal", pending)
+    
+    def set_paused(self, paused: bool, reason: str = ""):
+        """Pause or resume detection and freeze or thaw every queued deletion."""
+        self.bot_paused = paused
+        self.pause_reason = reason
+        if paused:
+            self.scheduler.freeze()
+            self.deferred.freeze()
+        else:
+            self.scheduler.thaw()
+            self.deferred.thaw()
+            # Media posted while paused never reached check_media
+            self.start_backfill("pause")
+    
+    def pending_count(self) -> int:
+        """Number of deletions anywhere in the pipeline (batches count as one)."""
+        return len(self.scheduler) + len(self.deferred) + len(self.batcher) + len(self.workers)
+    
+    @property
+    def verbose(self) -> bool:
+        """Whether per-message logging is affordable right now."""
+        return self.load_shedder.level == LoadShedder.NORMAL and not self.workers.saturated
+    
     def _register_handlers(self):
-        """Register all media-related handlers"""
-        print("📌 Registering media handlers...")
-        
-        # Main media detection handler - FIXED
-        @self.client.on_message(filters.group & ~filters.me)
-        async def check_media_handler(client: Client, message: Message):
-            await self.check_media(client, message)
-        
-        # Toggle commands - FIXED
-        @self.client.on_message(filters.command("stickertoggle", prefixes=".") & filters.me)
-        async def toggle_handler(client: Client, message: Message):
-            await self.toggle_sticker_deletion(client, message)
-        
-        @self.client.on_message(filters.command("stickerstatus", prefixes=".") & filters.me)
-        async def status_handler(client: Client, message: Message):
-            await self.sticker_deletion_status(client, message)
-        
-        # Clear command - FIXED
-        @self.client.on_message(filters.command("clear", prefixes=".") & filters.me & filters.group)
-        async def clear_handler(client: Client, message: Message):
-            await self.clear_all_media(client, message)
-        
-        # Test delete command - FIXED
-        @self.client.on_message(filters.command("testdelete", prefixes=".") & filters.me)
-        async def test_handler(client: Client, message: Message):
-            await self.test_delete(client, message)
-        
-            # ADD THIS NEW HANDLER
-        @self.client.on_message(filters.command("botonly", prefixes=".") & filters.me)
-        async def botonly_toggle_handler(client: Client, message: Message):
-            await self.toggle_bot_only_mode(client, message)
-        
-        @self.client.on_message(filters.command("botstatus", prefixes=".") & filters.me)
-        async def bot_status_handler(client: Client, message: Message):
-            await self.bot_only_status(client, message)
-
-        print("✅ Media handlers registered")
+        """Register media detection (commands are routed by CommandRouter)"""
+        log.info("📌 Registering media handlers...")
+        
+        # Main media detection handler; text is filtered out before any handler code runs
+        if self.config.config.FAST_PATH:
+            install_fast_path(self.client, self.handle_media)
+            log.info("⚡ Fast path enabled: media is detected from raw updates")
+        else:
+            @self.client.on_message(media_filter & filters.group & ~filters.me)
+            async def check_media_handler(client: Client, message: Message):
+                await self.check_media(client, message)
+        
+        log.info("✅ Media handlers registered")
     
     # ADD THESE NEW METHODS
     async def toggle_bot_only_mode(self, client: Client, message: Message):
@@ -75,7 +237,7 @@ class MediaHandler:
             status = "✅ ENABLED" if new_state else "❌ DISABLED"
             mode_desc = "only bot messages" if new_state else "all user messages"
             await message.edit(f"🤖 Bot-only mode is now {status}\nDeleting: {mode_desc}")
-            print(f"🤖 Bot-only mode toggled to: {status}")
+            log.info("🤖 Bot-only mode toggled to: %s", status)
         else:
             await message.edit("❌ Failed to save configuration!")
         
@@ -92,144 +254,302 @@ class MediaHandler:
         await message.delete()
 
     async def check_media(self, client: Client, message: Message):
-        """Check all group messages for media with rate limiting and permission checking."""
+        """Decide whether a parsed group media message gets scheduled for deletion."""
+        await self.handle_media(MediaEvent.from_message(message), message)
+    
+    async def handle_media(self, event: MediaEvent, message: Optional[Message] = None,
+                           posted: Optional[float] = None):
+        """Decide whether a group media message gets scheduled for deletion.
+        
+        Fed by check_media, or straight from raw updates in fast-path mode (no
+        Message then), or by the backfill with the epoch time the message was
+        `posted`. Checks run cheapest first: in-memory flags and lookups
+        before the exemption check (which may rewrite the exemptions file) and
+        the admin rights check (which may call the API on a cache miss).
+        """
+        UPDATES_SEEN.inc()
+        if self.trace is not None and posted is None:
+            self.trace.record(event)
+        rejections = self.rejections
         if self.bot_paused:
+            rejections["paused"] += 1
+            return
+        
+        media_type = event.media_type
+        if not media_type:
+            rejections["not_media"] += 1
+            return
+        MEDIA_DETECTED.inc(1, media_type)
+        if self.bookmarks is not None:
+            self.bookmarks.advance(event.chat_id, event.message_id)
+        
+        # Check if sticker/GIF deletion is disabled (or suspended under critical load)
+        if media_type in ("sticker", "animation") and (
+            not self.config.is_sticker_deletion_enabled or self.load_shedder.level >= LoadShedder.CRITICAL
+        ):
+            rejections["sticker_off"] += 1
             return
         
-            # ADD THIS NEW CHECK
         # Check if bot-only mode is enabled
         if self.config.is_bot_only_mode:
-            if not message.from_user or not message.from_user.is_bot:
-                print("🤖 Bot-only mode: Skipping non-bot user")
+            if not event.is_bot:
+                rejections["bot_only"] += 1
+                if self.verbose:
+                    log.debug("🤖 Bot-only mode: Skipping non-bot user")
                 return
-            print("🤖 Message from bot detected")
+            if self.verbose:
+                log.debug("🤖 Message from bot detected")
 
         # Check if message is from privileged users
-        if await self._is_privileged_user(message):
+        if self._is_privileged_user(event):
+            rejections["privileged"] += 1
             return
         
-        # Check temporary exemptions
-        if message.from_user and self.data.is_user_exempted(message.from_user.id):
-            print(f"⏳ Skipping media from temporarily exempted user @{message.from_user.username} (ID: {message.from_user.id})")
+        # Skip updates pyrogram already delivered once
+        if self.dedup.seen(event.chat_id, event.message_id):
+            rejections["duplicate"] += 1
             return
         
-        # Determine media type
-        media_type = get_media_type(message)
-        if not media_type:
-            return
-        
-        # Check if sticker/GIF deletion is disabled
-        if media_type in ["sticker", "animation"] and not self.config.is_sticker_deletion_enabled:
+        # Check temporary exemptions
+        if event.user_id and self.data.is_user_exempted(event.user_id):
+            rejections["exempted"] += 1
+            if self.verbose:
+                log.info("⏳ Skipping media from temporarily exempted user @%s (ID: %s)", event.username, event.user_id)
             return
         
         # Check admin rights
-        if not await self._check_and_cache_admin_rights(message.chat.id, message.chat.title):
-            return
-        
-        # Check rate limit
-        if not self.rate_limiter.can_delete(self.config.max_deletions):
-            print(f"⚠️ Rate limit reached, skipping deletion")
+        if not await self._check_and_cache_admin_rights(event.chat_id, event.chat_title):
+            rejections["no_rights"] += 1
             return
         
         # Process media deletion
-        await self._process_media_deletion(message, media_type)
+        self.accepted += 1
+        await self._process_media_deletion(event, message, posted)
+    
+    async def _admit_due(self, entries: List[PendingDeletion]):
+        """Send a due deletion, or a whole album, to the batcher if rate budget allows, otherwise defer it."""
+        self._sync_rate_limits()
+        self.workers.resize(self.config.deletion_workers)
+        # Backpressure: while workers are saturated, leave due entries in the compact
+        # scheduler heap instead of piling them up in batch buffers
+        await self.workers.wait_for_room()
+        # Once something is deferred, later entries queue behind it to keep due order;
+        # an album is admitted or deferred as a whole so it is never split across batches
+        chat_id = entries[0].chat_id
+        if len(self.deferred) == 0 and self.rate_limiter.try_acquire_many(
+            chat_id, Counter(entry.media_type for entry in entries)
+        ):
+            await self.batcher.add_many(entries)
+            return
+        RATE_LIMITED.inc(len(entries))
+        if not self.deferred.push(entries):
+            log.warning("⚠️ Deferred queue full, dropping deletion of %s messages in chat %s",
+                        len(entries), chat_id)
     
-    async def _is_privileged_user(self, message: Message) -> bool:
+    def _sync_rate_limits(self):
+        """Push the current runtime limits into the rate limiter."""
+        self.rate_limiter.configure(
+            self.config.max_deletions,
+            self.config.max_chat_deletions,
+            self.config.media_type_limits
+        )
+    
+    def _is_privileged_user(self, event: MediaEvent) -> bool:
         """Check if message is from owner or sudo user."""
-        if not message.from_user:
+        user_id = event.user_id
+        if not user_id:
             return False
         
-        user_id = message.from_user.id
-        
         # Check owner
         if user_id == self.config.owner_id:
-            print(f"👑 Skipping media from owner (ID: {self.config.owner_id})")
+            if self.verbose:
+                log.info("👑 Skipping media from owner (ID: %s)", user_id)
             return True
         
         # Check sudo
         if self.data.is_sudo_user(user_id):
-            print(f"🛡️ Skipping media from sudo user @{message.from_user.username} (ID: {user_id})")
+            if self.verbose:
+                log.info("🛡️ Skipping media from sudo user @%s (ID: %s)", event.username, user_id)
             return True
         
         return False
     
     async def _check_and_cache_admin_rights(self, chat_id: int, chat_title: str) -> bool:
-        """Check and cache admin rights for a chat."""
-        # Check cache first
-        has_rights = self.admin_cache.get(chat_id)
-        
-        if has_rights is None:
-            # Not in cache, check actual rights
-            has_rights = await self._check_admin_rights(chat_id)
-            self.admin_cache.set(chat_id, has_rights)
-            
-            if not has_rights:
-                # Only warn once per chat
-                if f"warned_{chat_id}" not in self.admin_cache.cache:
-                    print(f"⚠️ No admin/delete rights in '{chat_title}' - skipping all media in this chat")
-                    self.admin_cache.set_warned(chat_id)
+        """Check admin rights for a chat through the shared, cached permission service."""
+        has_rights = await self.permissions.can_delete(chat_id)
+        
+        # Only warn once per chat
+        if not has_rights and f"warned_{chat_id}" not in self.admin_cache.cache:
+            log.warning("⚠️ No admin/delete rights in '%s' - skipping all media in this chat", chat_title)
+            self.admin_cache.set_warned(chat_id)
         
         return has_rights
-    # Start admin rights 
-    async def _check_admin_rights(self, chat_id: int) -> bool:
-        """Check if the user account has admin rights with delete permission."""
-        try:
-            me = await self.client.get_me()
-            member = await self.client.get_chat_member(chat_id, me.id)
-            
-            status_str = str(member.status).lower()
-            
-            if "creator" in status_str or member.status == "creator":
-                return True
-            elif "administrator" in status_str or member.status == "administrator":
-                # For admins, check delete permission
-                if hasattr(member, 'privileges') and member.privileges:
-                    if hasattr(member.privileges, 'can_delete_messages'):
-                        return bool(member.privileges.can_delete_messages)
-                return True  # Default to True for admins
-            
-            return False
-            
-        except Exception as e:
-            print(f"❌ Error checking admin rights: {e}")
-            return False
     
-    # Ends admin rights 
-    async def _process_media_deletion(self, message: Message, media_type: str):
-        """Process media deletion with appropriate delay."""
-        sender = message.from_user.username if message.from_user else "Unknown"
-        sender_id = message.from_user.id if message.from_user else "Unknown"
-        chat_title = message.chat.title if message.chat else "Unknown"
+    async def _process_media_deletion(self, event: MediaEvent, message: Optional[Message] = None,
+                                      posted: Optional[float] = None):
+        """Schedule media deletion with appropriate delay and return immediately."""
+        verbose = self.verbose
+        media_type = event.media_type
         
         # Determine delay based on media type
         if media_type in ["sticker", "animation"]:
             base_delay = self.config.sticker_delay
-            
-            if media_type == "sticker":
-                sticker_info = get_sticker_info(message.sticker)
-                print(f"🎨 Sticker{sticker_info} detected from @{sender} (ID: {sender_id}) in '{chat_title}'")
-            else:
-                print(f"🎬 GIF detected from @{sender} (ID: {sender_id}) in '{chat_title}'")
+            if self.load_shedder.level >= LoadShedder.SHEDDING:
+                # Don't let long-lived sticker/GIF entries pile up while overloaded
+                base_delay = min(base_delay, max(self.config.delay, base_delay // self.SHED_STICKER_DELAY_DIVISOR))
         else:
             base_delay = self.config.delay
         
         # Add random delay
         random_delay = base_delay + random.randint(0, 5)
-        
-        emoji = get_media_emoji(media_type)
-        print(f"{emoji} Scheduling deletion of {media_type} in {random_delay} seconds from @{sender} (ID: {sender_id}) in '{chat_title}'")
-        
-        await asyncio.sleep(random_delay)
-        
+        if posted is not None:
+            # Backfilled media: the delay counts from when it was posted; overdue ones go right away
+            random_delay = max(0, random_delay - int(self.data.clock.time() - posted))
+        
+        if verbose:
+            sender = event.username or "Unknown"
+            sender_id = event.user_id or "Unknown"
+            chat_title = event.chat_title or "Unknown"
+            
+            if media_type == "sticker":
+                sticker_info = get_sticker_info(message.sticker) if message else ""
+                log.debug("🎨 Sticker%s detected from @%s (ID: %s) in '%s'", sticker_info, sender, sender_id, chat_title)
+            elif media_type == "animation":
+                log.debug("🎬 GIF detected from @%s (ID: %s) in '%s'", sender, sender_id, chat_title)
+            
+            log.info(
+                "%s Scheduling deletion of %s in %s seconds from @%s (ID: %s) in '%s'",
+                get_media_emoji(media_type), media_type, random_delay, sender, sender_id, chat_title,
+                extra={"fields": {"chat_id": event.chat_id, "message_id": event.message_id,
+                                  "media_type": media_type, "delay": random_delay}}
+            )
+        
+        # Only ids are kept; the Message object is released when this handler returns
+        self.scheduler.schedule(event.chat_id, event.message_id, media_type, random_delay,
+                                event.media_group_id, event.user_id)
+    
+    async def _delete_batch(self, chat_id: int, entries: List[PendingDeletion]):
+        """Delete a batch of due messages from one chat with a single API call."""
+        entries = [entry for entry in entries if not entry.cancelled]
+        if not entries:
+            return
+        if self.bot_paused:
+            # Paused after this batch was queued; the frozen scheduler holds it until resume
+            self.scheduler.reschedule(entries, 0)
+            return
+        message_ids = [entry.message_id for entry in entries]
+        attempt = max(entry.attempts for entry in entries)
         try:
-            await message.delete()
-            self.rate_limiter.record_deletion()
-            print(f"✅ Deleted {media_type} from @{sender} (ID: {sender_id}) in '{chat_title}'")
+            await self.flood_control.call(self.client.delete_messages, chat_id, message_ids, attempt=attempt)
+            log.info("✅ Deleted %s media messages in chat %s", len(message_ids), chat_id,
+                     extra={"fields": {"chat_id": chat_id, "deleted": len(message_ids)}})
+            DELETIONS.inc(len(entries), "success")
+            now = self.clock.monotonic()
+            for entry in entries:
+                LATENESS.observe(now - entry.deadline,
+                                 "sticker" if entry.media_type in ("sticker", "animation") else "media")
+        except RetryLater as e:
+            if not e.transient or attempt + 1 < self.MAX_TRANSIENT_ATTEMPTS:
+                for entry in entries:
+                    entry.attempts += e.transient
+                # Still live in the journal, so nothing is lost if we restart meanwhile
+                self.scheduler.reschedule(entries, e.retry_after)
+                log.warning("⏳ Re-queued %s deletions in chat %s: %s", len(message_ids), chat_id, e)
+                return
+            log.error("❌ Giving up on %s deletions in chat %s: %s", len(message_ids), chat_id, e)
+            DELETIONS.inc(len(entries), "failed")
         except Exception as e:
-            print(f"❌ Error deleting {media_type} in '{chat_title}': {e}")
+            log.error("❌ Error deleting %s media messages in chat %s: %s", len(message_ids), chat_id, e)
+            DELETIONS.inc(len(entries), "failed")
             # Update cache if permission error
             if "MESSAGE_DELETE_FORBIDDEN" in str(e) or "not enough rights" in str(e).lower():
-                self.admin_cache.set(message.chat.id, False)
+                self.admin_cache.set(chat_id, False)
+                # Everything else queued for this chat would fail the same way
+                cancelled = self.scheduler.cancel_chat(chat_id)
+                log.warning("🚫 Cancelled %s pending deletions in chat %s (no delete rights)", cancelled, chat_id)
+        self.scheduler.mark_done(entries)
+    
+    def start_backfill(self, reason: str):
+        """Catch up on media posted since each chat's current bookmark, in the background."""
+        if self.bookmarks is None:
+            return
+        self._capture_gaps(reason)
+        self._start_backfill()
+    
+    def _capture_gaps(self, reason: str):
+        """Pin every chat's bookmark as the start of a gap for the next backfill pass."""
+        added = False
+        for chat_id, message_id in self.bookmarks.hold_all().items():
+            if chat_id not in self._gaps:
+                self._gaps[chat_id] = message_id
+                added = True
+        if added and reason not in self._gap_reasons:
+            self._gap_reasons.append(reason)
+    
+    def _start_backfill(self):
+        """Scan the captured gaps; a backfill already running picks them up when its pass ends."""
+        if self._gaps and (self._backfill is None or self._backfill.done()):
+            self._backfill = asyncio.create_task(self._run_backfill())
+    
+    async def _run_backfill(self):
+        """Scan captured gaps until none are left, one pass per batch of gaps."""
+        while self._gaps:
+            gaps, self._gaps = self._gaps, {}
+            reason = " and ".join(self._gap_reasons)
+            self._gap_reasons = []
+            await self._backfill_pass(gaps, reason)
+    
+    async def _backfill_pass(self, gaps: Dict[int, int], reason: str):
+        """Scan the gap since each bookmark in managed groups and feed what it finds to handle_media."""
+        for chat_id, message_id in gaps.items():
+            # An earlier pass may have released a chat whose gap was queued again meanwhile
+            self.bookmarks.hold(chat_id, message_id)
+        media_types = [media_type for media_type in MEDIA_TYPES
+                       if self.config.is_sticker_deletion_enabled or media_type not in ("sticker", "animation")]
+        journal = self.scheduler.journal
+        
+        async def backfill_chat(chat: Tuple[int, str]) -> int:
+            chat_id, title = chat
+            if not await self._check_and_cache_admin_rights(chat_id, title):
+                self.bookmarks.release(chat_id)
+                return 0
+            job = PurgeJob(chat_id, media_types, min_id=gaps[chat_id])
+            found = 0
+            try:
+                async for messages, users, chats in self.purge.pages(job):
+                    for raw_message in messages:
+                        if self.bot_paused:
+                            return found  # Still held; the next resume rescans the rest
+                        event = parse_raw_media_message(raw_message, users, chats)
+                        # Restored from the journal already
+                        if not event or (journal and (chat_id, event.message_id) in journal.live):
+                            continue
+                        await self.handle_media(event, posted=raw_message.date)
+                        found += 1
+            except Exception as e:
+                log.error("❌ Backfill of chat %s failed: %s", chat_id, e)
+                return found
+            self.bookmarks.release(chat_id)
+            return found
+        
+        try:
+            chats = [chat for chat in await self.group_chats() if chat[0] in gaps]
+            # Groups we have left have nothing to catch up on
+            for chat_id in set(gaps) - {chat_id for chat_id, _ in chats}:
+                self.bookmarks.release(chat_id)
+            found = await run_bounded(chats, backfill_chat, self.config.config.PURGE_CONCURRENCY)
+            self.bookmarks.save()
+            if sum(found):
+                log.info("⏪ Caught up on %s media messages posted during %s in %s groups",
+                         sum(found), reason, sum(1 for count in found if count))
+        except Exception as e:
+            log.error("❌ Backfill after %s failed: %s", reason, e)
+    
+    async def _save_bookmarks(self):
+        """Write the bookmarks every BOOKMARK_SAVE_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(self.BOOKMARK_SAVE_INTERVAL)
+            self.bookmarks.save()
     
     async def toggle_sticker_deletion(self, client: Client, message: Message):
         """Toggle sticker and GIF deletion on/off."""
@@ -239,7 +559,7 @@ class MediaHandler:
         if self.config.update("STICKER_GIF_DELETION_ENABLED", new_state):
             status = "✅ ENABLED" if new_state else "❌ DISABLED"
             await message.edit(f"🎨 Sticker/GIF deletion is now {status}")
-            print(f"🎨 Sticker/GIF deletion toggled to: {status}")
+            log.info("🎨 Sticker/GIF deletion toggled to: %s", status)
         else:
             await message.edit("❌ Failed to save configuration!")
         
@@ -256,47 +576,361 @@ class MediaHandler:
         await message.delete()
     
     async def clear_all_media(self, client: Client, message: Message):
-        """Delete all media in current chat (with confirmation)."""
+        """Purge media in this chat: .clear confirm [types|all] [since X] [until Y] | resume | stop"""
+        chat_id = message.chat.id
+        argument = message.command[1].lower() if len(message.command) > 1 else ""
         try:
-            # Check if this is a confirmation
-            if len(message.command) > 1 and message.command[1].lower() == "confirm":
-                # Check admin rights
-                if not await self._check_admin_rights(message.chat.id):
+            if argument == "stop":
+                task = self._purges.get(chat_id)
+                if task:
+                    task.cancel()
+                    await message.edit("⏹️ Purge stopped. Continue later with `.clear resume`")
+                else:
+                    await message.edit("⚠️ No purge is running in this chat")
+            elif argument in ("confirm", "resume"):
+                if chat_id in self._purges:
+                    await message.edit("⚠️ A purge is already running here. Stop it with `.clear stop`")
+                elif not await self.permissions.can_delete(chat_id, force_check=True):
                     await message.edit("❌ No admin rights to delete messages in this chat!")
-                    await asyncio.sleep(3)
-                    await message.delete()
-                    return
-                
-                await message.edit("🗑️ Clearing all media in this chat...")
-                
-                deleted_count = 0
-                async for msg in client.get_chat_history(message.chat.id, limit=1000):
-                    if get_media_type(msg):
-                        try:
-                            await msg.delete()
-                            deleted_count += 1
-                            if deleted_count % 10 == 0:
-                                await asyncio.sleep(1)
-                        except:
-                            pass
-                
-                await message.edit(f"✅ Deleted {deleted_count} media messages!")
-                print(f"🗑️ Cleared {deleted_count} media messages in {message.chat.title}")
+                else:
+                    if argument == "resume":
+                        job = self.purge.checkpoint(chat_id)
+                        if not job:
+                            await message.edit("⚠️ No interrupted purge to resume in this chat")
+                            await asyncio.sleep(5)
+                            await message.delete()
+                            return
+                    else:
+                        job = self._parse_purge_job(chat_id, message.command[2:])
+                    self._purges[chat_id] = asyncio.create_task(self._run_purge(job, message))
+                    return  # The purge task reports its own progress and cleans up the message
             else:
                 # Ask for confirmation
+                interrupted = self.purge.checkpoint(chat_id)
                 await message.edit(
                     "⚠️ **WARNING**: This will delete ALL media in this chat!\n"
-                    "To confirm, use: `.clear confirm`\n\n"
-                    "This action cannot be undone!"
+                    "To confirm, use: `.clear confirm`\n"
+                    "Options: `.clear confirm photo,video since 7d until 2024-05-01`\n"
+                    "Stickers have no server-side filter, so including them scans every message.\n"
+                    + (f"\n♻️ Interrupted purge ({interrupted.deleted} deleted so far): `.clear resume`\n"
+                       if interrupted else "")
+                    + "\nThis action cannot be undone!"
                 )
-            
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(5)
+        await message.delete()
+    
+    def _parse_purge_job(self, chat_id: int, options: List[str], from_user: Optional[int] = None) -> PurgeJob:
+        """Build a purge job from `[types|all] [since X] [until Y]`."""
+        job = PurgeJob(chat_id, from_user=from_user, started=self.clock.time())
+        now = self.data.clock.time()
+        options = list(options)
+        while options:
+            option = options.pop(0).lower()
+            if option in ("since", "until"):
+                if not options:
+                    raise ValueError(f"Missing value after '{option}'")
+                bound = parse_time_bound(options.pop(0), now)
+                if option == "since":
+                    job.min_date = bound
+                else:
+                    job.max_date = bound
+            else:
+                job.media_types = parse_media_types(option)
+                job.passes = plan_passes(job.media_types)
+        return job
+    
+    async def _run_purge(self, job: PurgeJob, message: Message):
+        """Run a purge in the background, editing the command message with its progress."""
+        chat_title = message.chat.title
+        
+        async def report(job: PurgeJob):
+            try:
+                await message.edit(
+                    f"🗑️ Purging media in this chat… pass {min(job.pass_index + 1, len(job.passes))}/{len(job.passes)}\n"
+                    f"• Scanned: {job.scanned} of {job.found or '?'} found\n"
+                    f"• Deleted: {job.deleted}\n"
+                    "Stop with `.clear stop`"
+                )
+            except Exception as e:
+                log.debug("Could not update purge progress: %s", e)
+        
+        try:
+            await report(job)
+            await self.purge.run(job, report)
+            await message.edit(f"✅ Deleted {job.deleted} media messages! ({job.scanned} scanned, "
+                               f"{self.clock.time() - job.started:.0f}s)")
+            log.info("🗑️ Cleared %s media messages in %s", job.deleted, chat_title)
+        except asyncio.CancelledError:
+            log.info("⏹️ Purge in %s stopped after %s deletions", chat_title, job.deleted)
+            await self._close_stopped_purge(message, f"⏹️ Purge stopped after {job.deleted} deletions. "
+                                                     "Continue later with `.clear resume`")
+            raise
+        except Exception as e:
+            log.error("❌ Purge in chat %s failed: %s", job.chat_id, e)
+            await message.edit(f"❌ Purge failed after {job.deleted} deletions: {e}\n"
+                               "Continue with `.clear resume`")
+        finally:
+            self._purges.pop(job.chat_id, None)
+        
+        await asyncio.sleep(10)
+        await message.delete()
+    
+    async def _close_stopped_purge(self, message: Message, text: str):
+        """Show a stopped purge's final count briefly, then remove its progress message."""
+        try:
+            await message.edit(text)
             await asyncio.sleep(5)
             await message.delete()
+        except Exception as e:
+            log.debug("Could not clean up purge progress: %s", e)
+    
+    async def group_chats(self) -> List[Tuple[int, str]]:
+        """Every group and supergroup in the dialog list as (chat id, title)."""
+        return [(dialog.chat.id, dialog.chat.title) async for dialog in self.client.get_dialogs()
+                if dialog.chat.type in (enums.ChatType.GROUP, enums.ChatType.SUPERGROUP)]
+    
+    async def purge_user(self, client: Client, message: Message):
+        """Delete one user's media in every managed group: .purge <user|reply> [types|all] [since X] [until Y] | stop"""
+        try:
+            if len(message.command) > 1 and message.command[1].lower() == "stop":
+                if self._user_purge:
+                    self._user_purge.cancel()
+                    await message.edit("⏹️ Cross-chat purge stopped")
+                else:
+                    await message.edit("⚠️ No cross-chat purge is running")
+            elif self._user_purge:
+                await message.edit("⚠️ A cross-chat purge is already running. Stop it with `.purge stop`")
+            else:
+                user_info = await get_user_id_from_input(client, message)
+                if not user_info:
+                    await message.edit(
+                        "⚠️ **Usage:** `.purge <user_id|@username>` or reply to a user\n"
+                        "Options: `.purge @spammer photo,video since 1d`"
+                    )
+                elif user_info[0] == self.config.owner_id or self.data.is_sudo_user(user_info[0]):
+                    await message.edit("❌ Cannot purge the owner or a sudo user!")
+                else:
+                    user_id, username, first_name = user_info
+                    options = message.command[1:] if message.reply_to_message else message.command[2:]
+                    template = self._parse_purge_job(0, options, user_id)
+                    name = f"@{username}" if username else first_name
+                    self._user_purge = asyncio.create_task(self._run_user_purge(template, name, message))
+                    return  # The purge task reports its own progress and cleans up the message
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(5)
+        await message.delete()
+    
+    async def _run_user_purge(self, template: PurgeJob, name: str, message: Message):
+        """Purge one user's media across managed groups, a few chats at a time, with one progress message."""
+        jobs: Dict[int, PurgeJob] = {}
+        results: Dict[int, str] = {}
+        titles: Dict[int, str] = {}
+        done = asyncio.Event()
+        
+        def summary() -> str:
+            deleted = sum(job.deleted for job in jobs.values())
+            scanned = sum(job.scanned for job in jobs.values())
+            skipped = sum(result == "no rights" for result in results.values())
+            return (f"🧹 Purging media from {name} in {len(titles)} groups\n"
+                    f"• Chats finished: {len(results)}/{len(titles)} ({skipped} without delete rights)\n"
+                    f"• Scanned: {scanned} | Deleted: {deleted}\n")
+        
+        async def report():
+            while not done.is_set():
+                try:
+                    await message.edit(summary() + "Stop with `.purge stop`")
+                except Exception as e:
+                    log.debug("Could not update purge progress: %s", e)
+                try:
+                    await asyncio.wait_for(done.wait(), self.user_purge.PROGRESS_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        
+        async def purge_chat(chat: Tuple[int, str]):
+            chat_id, title = chat
+            # Served from the admin cache for chats the live pipeline has already seen
+            if not await self._check_and_cache_admin_rights(chat_id, title):
+                results[chat_id] = "no rights"
+                return
+            job = jobs[chat_id] = dataclasses.replace(template, chat_id=chat_id, started=self.clock.time())
+            try:
+                await self.user_purge.run(job)
+                results[chat_id] = f"{job.deleted} deleted"
+            except Exception as e:
+                log.error("❌ Purge of user media in chat %s failed: %s", chat_id, e)
+                results[chat_id] = f"failed after {job.deleted}: {e}"
+        
+        reporter = None
+        try:
+            await message.edit(f"🧹 Looking for groups to purge media from {name}…")
+            chats = await self.group_chats()
+            titles.update(chats)
+            reporter = asyncio.create_task(report())
+            await run_bounded(chats, purge_chat, self.config.config.PURGE_CONCURRENCY)
+            done.set()
+            await reporter
             
+            lines = sorted(((jobs[chat_id].deleted if chat_id in jobs else -1, titles[chat_id], result)
+                            for chat_id, result in results.items()), reverse=True)
+            text = summary().replace("🧹 Purging", "✅ Purged") + "\n**Per chat:**\n"
+            text += "".join(f"• {title}: {result}\n" for _, title, result in lines[:self.PURGE_REPORT_CHATS])
+            if len(lines) > self.PURGE_REPORT_CHATS:
+                text += f"… and {len(lines) - self.PURGE_REPORT_CHATS} more chats\n"
+            await message.edit(text)
+            log.info("🧹 Purged %s media messages from %s in %s groups",
+                     sum(job.deleted for job in jobs.values()), name, len(jobs))
+        except asyncio.CancelledError:
+            deleted = sum(job.deleted for job in jobs.values())
+            log.info("⏹️ Cross-chat purge of %s stopped after %s deletions", name, deleted)
+            done.set()
+            if reporter:
+                reporter.cancel()
+            await self._close_stopped_purge(message, f"⏹️ Cross-chat purge of {name} stopped after {deleted} deletions")
+            raise
         except Exception as e:
+            log.error("❌ Cross-chat purge failed: %s", e)
             await message.edit(f"❌ Error: {e}")
-            await asyncio.sleep(3)
-            await message.delete()
+        finally:
+            done.set()
+            if reporter:
+                reporter.cancel()
+            self._user_purge = None
+        
+        await asyncio.sleep(15)
+        await message.delete()
+    
+    async def queue_status(self, client: Client, message: Message):
+        """Show pending and rate-deferred deletion backlog per chat."""
+        try:
+            deferred = self.deferred
+            text = (
+                "📦 **Deletion Backlog:**\n\n"
+                f"• Scheduled: {len(self.scheduler)}\n"
+                f"• Waiting for rate budget: {len(deferred)}/{self.config.deferred_max_size}\n"
+                f"• Batching: {len(self.batcher)}\n"
+                f"• Batches queued for workers: {len(self.workers)} "
+                f"({self.workers.busy_workers}/{self.workers.size} workers busy)\n"
+                f"• Dropped (queue full): {deferred.total_overflowed}\n"
+                f"• Dropped (older than {self.config.deferred_max_age}s): {deferred.expired}\n"
+            )
+            
+            busiest = sorted(deferred.depth.items(), key=lambda item: item[1], reverse=True)[:10]
+            if busiest:
+                text += "\n**Deferred per chat:**\n"
+                for chat_id, depth in busiest:
+                    try:
+                        chat = await client.get_chat(chat_id)
+                        chat_name = chat.title or chat_id
+                    except:
+                        chat_name = chat_id
+                    overflow = deferred.overflowed.get(chat_id, 0)
+                    text += f"• {chat_name}: {depth}" + (f" (dropped {overflow})" if overflow else "") + "\n"
+            
+            await message.edit(text)
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(10)
+        await message.delete()
+    
+    async def show_stats(self, client: Client, message: Message):
+        """Summarize throughput, errors and deletion lateness since startup."""
+        try:
+            deleted = DELETIONS.values.get("success", 0)
+            failed = DELETIONS.values.get("failed", 0)
+            lookups = self.admin_cache.hits + self.admin_cache.misses
+            hit_rate = f"{self.admin_cache.hits / lookups:.0%}" if lookups else "n/a"
+            detected = ", ".join(f"{media_type} {int(count)}" for media_type, count in
+                                 sorted(MEDIA_DETECTED.values.items(), key=lambda item: -item[1]))
+            
+            text = (
+                "📈 **Stats since startup:**\n\n"
+                f"• Media updates seen: {int(UPDATES_SEEN.total())}\n"
+                f"• Detected: {detected or 'none'}\n"
+                f"• Deleted: {int(deleted)} | Failed: {int(failed)}\n"
+                f"• FloodWaits: {self.flood_control.flood_waits} | "
+                f"Rate-limit deferrals: {int(RATE_LIMITED.total())}\n"
+                f"• Admin cache hit rate: {hit_rate} ({lookups} lookups)\n"
+                f"• Pending: {self.pending_count()}\n"
+            )
+            if LOOP_LAG.count():
+                text += (
+                    f"• Loop lag: p50 ≤ {LOOP_LAG.quantile(0.5) * 1000:g} ms, "
+                    f"p99 ≤ {LOOP_LAG.quantile(0.99) * 1000:g} ms, {int(LOOP_STALLS.total())} stalls\n"
+                )
+            for kind, name, delay in (("media", "delay", self.config.delay),
+                                      ("sticker", "sticker delay", self.config.sticker_delay)):
+                if LATENESS.count(kind):
+                    text += (
+                        f"• Lateness past {name} ({delay}s): p50 ≤ {LATENESS.quantile(0.5, kind):g}s, "
+                        f"p99 ≤ {LATENESS.quantile(0.99, kind):g}s\n"
+                    )
+            
+            await message.edit(text)
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(10)
+        await message.delete()
+    
+    async def trace_traffic(self, client: Client, message: Message):
+        """Record anonymized media traffic for replay: .trace start [file] | .trace stop | .trace"""
+        argument = message.command[1].lower() if len(message.command) > 1 else ""
+        try:
+            if argument == "start":
+                if self.trace:
+                    self.trace.close()
+                path = (message.command[2] if len(message.command) > 2 else
+                        os.path.join(self.TRACE_DIR, f"trace-{datetime.now():%Y%m%d-%H%M%S}.mctrace"))
+                self.trace = TraceRecorder(path)
+                await message.edit(f"🎞️ Recording media traffic to {path}")
+            elif argument == "stop":
+                if not self.trace:
+                    await message.edit("⚠️ No trace is being recorded")
+                else:
+                    trace, self.trace = self.trace, None
+                    trace.close()
+                    await message.edit(f"🎞️ Saved {trace.count} media updates to {trace.path}")
+            elif self.trace:
+                await message.edit(f"🎞️ Recording to {self.trace.path}: {self.trace.count} media updates "
+                                   f"in {(time.time() - self.trace.started) / 60:.0f} min")
+            else:
+                await message.edit("🎞️ Not recording. **Usage:** `.trace start [file]` / `.trace stop`")
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(5)
+        await message.delete()
+    
+    async def set_chat_weight(self, client: Client, message: Message):
+        """Show or set this chat's share of the deletion budget under contention."""
+        try:
+            chat_id = message.chat.id
+            if len(message.command) < 2:
+                await message.edit(
+                    f"⚖️ Fair-share weight for '{message.chat.title}': {self.data.get_chat_weight(chat_id)}\n"
+                    "**Usage:** `.chatweight 3` (1 = default)"
+                )
+            else:
+                weight = int(message.command[1])
+                if weight < 1:
+                    raise ValueError("Weight must be positive")
+                
+                if self.data.set_chat_weight(chat_id, weight):
+                    await message.edit(f"⚖️ Fair-share weight for '{message.chat.title}' set to {weight}")
+                    log.info("⚖️ Chat weight for %s (%s) set to %s", message.chat.title, chat_id, weight)
+                else:
+                    await message.edit("❌ Failed to save chat weights!")
+        except Exception as e:
+            await message.edit(f"❌ Error: {e}")
+        
+        await asyncio.sleep(5)
+        await message.delete()
     
     async def test_delete(self, client: Client, message: Message):
         """Test deletion on a specific message."""
@@ -1,29 +1,23 @@
 import asyncio
-from pyrogram import Client, filters
+from pyrogram import Client
 from pyrogram.types import Message
 
+from utils.log import get_logger
+
+log = get_logger("quick_actions")
+
 class QuickActionsHandler:
     """Handles quick action commands like pause/resume"""
     
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "pause": "pause_bot",
+        "resume": "resume_bot"
+    }
+    
     def __init__(self, client: Client, media_handler=None):
         self.client = client
         self.media_handler = media_handler  # Reference to MediaHandler for pause/resume
-        
-        self._register_handlers()
-    
-    def _register_handlers(self):
-        """Register all quick action handlers"""
-        print("📌 Registering quick action handlers...")
-        
-        @self.client.on_message(filters.command("pause", prefixes=".") & filters.me)
-        async def pause_bot_handler(client: Client, message: Message):
-            await self.pause_bot(client, message)
-        
-        @self.client.on_message(filters.command("resume", prefixes=".") & filters.me)
-        async def resume_bot_handler(client: Client, message: Message):
-            await self.resume_bot(client, message)
-        
-        print("✅ Quick action handlers registered")
     
     def set_media_handler(self, media_handler):
         """Set reference to MediaHandler (called after initialization)"""
@@ -37,11 +31,13 @@ class QuickActionsHandler:
             await message.delete()
             return
         
-        self.media_handler.bot_paused = True
-        self.media_handler.pause_reason = " ".join(message.command[1:]) if len(message.command) > 1 else "Manual pause"
+        reason = " ".join(message.command[1:]) if len(message.command) > 1 else "Manual pause"
+        # Also freezes deletions that were already scheduled
+        self.media_handler.set_paused(True, reason)
+        frozen = self.media_handler.pending_count()
         
-        await message.edit(f"⏸️ Bot paused. Reason: {self.media_handler.pause_reason}")
-        print(f"⏸️ Bot paused. Reason: {self.media_handler.pause_reason}")
+        await message.edit(f"⏸️ Bot paused. Reason: {reason}\n🧊 Frozen pending deletions: {frozen}")
+        log.info("⏸️ Bot paused. Reason: %s (%s pending deletions frozen)", reason, frozen)
         
         await asyncio.sleep(3)
         await message.delete()
@@ -60,10 +56,10 @@ class QuickActionsHandler:
             await message.delete()
             return
         
-        self.media_handler.bot_paused = False
-        await message.edit("▶️ Bot resumed!")
-        print(f"▶️ Bot resumed after pause. Previous reason: {self.media_handler.pause_reason}")
-        self.media_handler.pause_reason = ""
+        previous_reason = self.media_handler.pause_reason
+        self.media_handler.set_paused(False)
+        await message.edit("▶️ Bot resumed! ⏪ Catching up on media posted while paused...")
+        log.info("▶️ Bot resumed after pause. Previous reason: %s", previous_reason)
         
         await asyncio.sleep(3)
         await message.delete()
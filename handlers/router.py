@@ -0,0 +1,78 @@
+import re
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from pyrogram import Client, enums, filters
+from pyrogram.types import Message
+
+from utils.log import get_logger
+
+log = get_logger("router")
+
+GROUP_CHAT_TYPES = (enums.ChatType.GROUP, enums.ChatType.SUPERGROUP)
+
+# Same argument splitting as filters.command: quoted strings or whitespace-separated words
+ARGUMENT_RE = re.compile(r"([\"'])(.*?)(?<!\\)\1|(\S+)")
+
+CommandCallback = Callable[[Client, Message], Awaitable[None]]
+
+
+class CommandRouter:
+    """Single dispatcher for every dot-command
+
+    Handlers declare their commands in a COMMANDS dict (command -> method name)
+    and optionally a GROUP_COMMANDS set of commands that only work in groups.
+    Only one pyrogram handler is registered, so group traffic pays for a
+    single prefix check no matter how many commands exist.
+    """
+
+    def __init__(self, client: Client, prefix: str = "."):
+        self.client = client
+        self.prefix = prefix
+        self.routes: Dict[str, Tuple[CommandCallback, bool]] = {}  # command -> (callback, group only)
+
+        async def is_own_command(_, __, message: Message) -> bool:
+            text = message.text or message.caption
+            if not text or not text.startswith(prefix):
+                return False
+            # Same test as filters.me
+            return bool(message.from_user and message.from_user.is_self or message.outgoing)
+
+        self.filter = filters.create(is_own_command, "OwnCommandFilter")
+        self.client.on_message(self.filter)(self._dispatch)
+
+    def register(self, handler):
+        """Add every command declared by a handler."""
+        commands: Dict[str, str] = getattr(handler, "COMMANDS", {})
+        group_commands: Set[str] = getattr(handler, "GROUP_COMMANDS", set())
+        for command, method_name in commands.items():
+            self.add(command, getattr(handler, method_name), command in group_commands)
+        log.info("✅ %s: %s commands registered", type(handler).__name__, len(commands))
+
+    def add(self, command: str, callback: CommandCallback, group_only: bool = False):
+        """Route a single command to a coroutine."""
+        command = command.lower()
+        if command in self.routes:
+            raise ValueError(f"Command .{command} is already registered")
+        self.routes[command] = (callback, group_only)
+
+    async def _dispatch(self, client: Client, message: Message):
+        """Parse the command once and call its handler."""
+        parts = (message.text or message.caption)[len(self.prefix):].split(maxsplit=1)
+        if not parts:
+            return
+        name = parts[0].lower()
+        route = self.routes.get(name)
+        if route is None:
+            return
+
+        callback, group_only = route
+        if group_only and message.chat.type not in GROUP_CHAT_TYPES:
+            return
+
+        # Same shape filters.command produces, so handlers keep using message.command
+        arguments = parts[1] if len(parts) > 1 else ""
+        message.command = [name] + [
+            re.sub(r"\\([\"'])", r"\1", match.group(2) or match.group(3) or "")
+            for match in ARGUMENT_RE.finditer(arguments)
+        ]
+        await callback(client, message)
@@ -1,38 +1,32 @@
 import asyncio
-from pyrogram import Client, filters
+from pyrogram import Client
 from pyrogram.types import Message
+from typing import Optional
 
 from models import DataManager
 from config import ConfigManager
+from utils import DeletionScheduler
 from utils.helpers import get_user_id_from_input, format_user_info
+from utils.log import get_logger
+
+log = get_logger("sudo")
 
 class SudoHandler:
     """Handles sudo user management commands"""
     
-    def __init__(self, client: Client, config: ConfigManager, data: DataManager):
+    # Dot-commands routed to this handler by CommandRouter
+    COMMANDS = {
+        "addsudo": "add_sudo",
+        "rmsudo": "remove_sudo",
+        "listsudo": "list_sudo"
+    }
+    
+    def __init__(self, client: Client, config: ConfigManager, data: DataManager,
+                 scheduler: Optional[DeletionScheduler] = None):
         self.client = client
         self.config = config
         self.data = data
-        
-        self._register_handlers()
-    
-    def _register_handlers(self):
-        """Register all sudo-related handlers"""
-        print("📌 Registering sudo handlers...")
-        
-        @self.client.on_message(filters.command("addsudo", prefixes=".") & filters.me)
-        async def add_sudo_handler(client: Client, message: Message):
-            await self.add_sudo(client, message)
-        
-        @self.client.on_message(filters.command("rmsudo", prefixes=".") & filters.me)
-        async def remove_sudo_handler(client: Client, message: Message):
-            await self.remove_sudo(client, message)
-        
-        @self.client.on_message(filters.command("listsudo", prefixes=".") & filters.me)
-        async def list_sudo_handler(client: Client, message: Message):
-            await self.list_sudo(client, message)
-        
-        print("✅ Sudo handlers registered")
+        self.scheduler = scheduler  # Used to cancel deletions already scheduled for the user
     
     async def add_sudo(self, client: Client, message: Message):
         """Add a user to sudo list."""
@@ -65,8 +59,12 @@ class SudoHandler:
             # Add to sudo list
             if self.data.add_sudo_user(user_id):
                 user_display = f"{first_name} (@{username})" if username else first_name
-                await message.edit(f"✅ Added {user_display} (ID: {user_id}) to sudo users!")
-                print(f"🛡️ Added sudo user: {user_display} (ID: {user_id})")
+                cancelled = self.scheduler.cancel_user(user_id) if self.scheduler else 0
+                await message.edit(
+                    f"✅ Added {user_display} (ID: {user_id}) to sudo users!"
+                    + (f"\n🚫 Cancelled {cancelled} pending deletions" if cancelled else "")
+                )
+                log.info("🛡️ Added sudo user: %s (ID: %s), cancelled %s pending deletions", user_display, user_id, cancelled)
             else:
                 await message.edit("❌ Failed to save sudo users!")
             
@@ -101,7 +99,7 @@ class SudoHandler:
             if self.data.remove_sudo_user(user_id):
                 user_display = f"{first_name} (@{username})" if username else first_name
                 await message.edit(f"✅ Removed {user_display} (ID: {user_id}) from sudo users!")
-                print(f"🛡️ Removed sudo user: {user_display} (ID: {user_id})")
+                log.info("🛡️ Removed sudo user: %s (ID: %s)", user_display, user_id)
             else:
                 await message.edit("❌ Failed to save sudo users!")
             
@@ -1,34 +1,65 @@
-from pyrogram import Client
+from pyrogram import Client, idle
 import asyncio
+from typing import Optional
 
 from config import Config, ConfigManager
-from models import DataManager
-from utils import RateLimiter, AdminCache
+from models import ChatBookmarks, DataManager, DeletionJournal, PurgeCheckpoints
+from utils import RateLimiter, AdminCache, FloodController, PermissionService, Clock, SystemClock
+from utils.log import get_logger, setup_logging
+from utils.metrics import registry, MetricsExporter
+from utils.loop_watchdog import LoopWatchdog
 from handlers import (
     MediaHandler, 
     AdminHandler, 
     SudoHandler, 
     ExemptionHandler, 
-    QuickActionsHandler
+    QuickActionsHandler,
+    DiagnosticsHandler,
+    CommandRouter
 )
 
+log = get_logger("main")
+
 class MediaCleanerBot:
     """Main bot class that initializes and manages all components"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[Client] = None, clock: Optional[Clock] = None):
+        # One clock for rate windows, caches, expiry and the deletion pipeline (a VirtualClock in tests)
+        self.clock = clock or SystemClock()
+        
         # Initialize configuration
         self.config = Config()
+        # Pipeline logs are written by a background thread, never by the event loop
+        self.log_listener = setup_logging(self.config.LOG_LEVEL, self.config.LOG_FORMAT == "json")
         self.config_manager = ConfigManager(self.config)
         
         # Initialize data manager
-        self.data_manager = DataManager()
+        self.data_manager = DataManager(self.clock)
+        self.deletion_journal = DeletionJournal()
+        self.purge_checkpoints = PurgeCheckpoints()
+        self.chat_bookmarks = ChatBookmarks()
         
         # Initialize utilities
-        self.rate_limiter = RateLimiter()
-        self.admin_cache = AdminCache()
+        self.rate_limiter = RateLimiter(
+            self.config_manager.max_deletions,
+            self.config_manager.max_chat_deletions,
+            self.config_manager.media_type_limits,
+            self.clock
+        )
+        self.admin_cache = AdminCache(clock=self.clock)
+        self.flood_control = FloodController(self.rate_limiter, self.clock)
+        self.loop_watchdog = LoopWatchdog(stall_threshold=self.config.LOOP_STALL_THRESHOLD_MS / 1000, clock=self.clock)
+        self.metrics_exporter = MetricsExporter(
+            registry,
+            self.config.METRICS_PORT,
+            self.config.METRICS_TEXTFILE,
+            self.config.METRICS_INTERVAL_SECONDS
+        )
         
-        # Initialize Pyrogram client
-        self.client = self._create_client()
+        # Initialize Pyrogram client (or use an injected one, e.g. the benchmarks' FakeClient)
+        self.client = client or self._create_client()
+        # One admin-rights answer per chat for every handler, fetched at most once at a time
+        self.permissions = PermissionService(self.client, self.admin_cache)
         
         # Initialize handlers
         self._initialize_handlers()
@@ -39,8 +70,14 @@ class MediaCleanerBot:
             self.admin_handler,
             self.sudo_handler,
             self.exemption_handler,
-            self.quick_actions_handler
+            self.quick_actions_handler,
+            self.diagnostics_handler
         ]
+        
+        # One pyrogram handler dispatches every dot-command
+        self.command_router = CommandRouter(self.client)
+        for handler in self.client._custom_handlers:
+            self.command_router.register(handler)
     
     def _create_client(self) -> Client:
         """Create and configure Pyrogram client"""
@@ -66,59 +103,106 @@ class MediaCleanerBot:
             self.config_manager,
             self.data_manager,
             self.rate_limiter,
-            self.admin_cache
+            self.admin_cache,
+            self.deletion_journal,
+            self.flood_control,
+            self.purge_checkpoints,
+            self.chat_bookmarks,
+            self.permissions,
+            self.loop_watchdog,
+            self.clock
         )
         
         self.admin_handler = AdminHandler(
             self.client,
             self.config_manager,
-            self.admin_cache
+            self.admin_cache,
+            self.permissions
         )
         # Add data reference for sudo count in status
         self.admin_handler.data = self.data_manager
+        # Add rate limiter and flood control references for headroom in status
+        self.admin_handler.rate_limiter = self.rate_limiter
+        self.admin_handler.flood_control = self.flood_control
         
         self.sudo_handler = SudoHandler(
             self.client,
             self.config_manager,
-            self.data_manager
+            self.data_manager,
+            self.media_handler.scheduler
         )
         
         self.exemption_handler = ExemptionHandler(
             self.client,
             self.config_manager,
-            self.data_manager
+            self.data_manager,
+            self.media_handler.scheduler
         )
         
         self.quick_actions_handler = QuickActionsHandler(self.client)
         # Set media handler reference for pause/resume
         self.quick_actions_handler.set_media_handler(self.media_handler)
+        
+        self.diagnostics_handler = DiagnosticsHandler(self.client)
     
     def print_startup_info(self):
-        """Print startup information"""
-        print("🚀 Starting Media Cleaner Userbot...")
-        print(f"⏱️  Media deletion delay: {self.config_manager.delay} seconds")
-        print(f"🎨 Sticker/GIF deletion delay: {self.config_manager.sticker_delay} seconds")
-        print(f"👑 Owner ID: {self.config_manager.owner_id if self.config_manager.owner_id != 0 else 'Not set'}")
-        print(f"🛡️ Loaded {len(self.data_manager.sudo_users)} sudo users")
-        print(f"⏳ Loaded {len(self.data_manager.temp_exemptions)} active exemptions")
-        print(f"🤖 Bot-only mode: {'ENABLED' if self.config_manager.is_bot_only_mode else 'DISABLED'}")
-        print("\n📋 Available Commands:")
-        print("Configuration: .config, .setconfig, .resetconfig")
-        print("Admin: .checkstatus, .clearcache, .testdelete")
-        print("Sudo: .addsudo, .rmsudo, .listsudo")
-        print("Exemptions: .exempt, .listexempt, .rmexempt")
-        print("Media: .stickertoggle, .stickerstatus, .clear")
-        print("Quick Actions: .pause, .resume")
-        print("\n✅ Bot initialized successfully!")
+        """Log startup information"""
+        log.info("🚀 Starting Media Cleaner Userbot...")
+        log.info("⏱️  Media deletion delay: %s seconds", self.config_manager.delay)
+        log.info("🎨 Sticker/GIF deletion delay: %s seconds", self.config_manager.sticker_delay)
+        log.info("👑 Owner ID: %s", self.config_manager.owner_id if self.config_manager.owner_id != 0 else 'Not set')
+        log.info("🛡️ Loaded %s sudo users", len(self.data_manager.sudo_users))
+        log.info("⏳ Loaded %s active exemptions", len(self.data_manager.temp_exemptions))
+        log.info("🤖 Bot-only mode: %s", 'ENABLED' if self.config_manager.is_bot_only_mode else 'DISABLED')
+        log.info("📋 Available Commands:")
+        log.info("Configuration: .config, .setconfig, .resetconfig")
+        log.info("Admin: .checkstatus, .clearcache, .testdelete")
+        log.info("Sudo: .addsudo, .rmsudo, .listsudo")
+        log.info("Exemptions: .exempt, .listexempt, .rmexempt")
+        log.info("Media: .stickertoggle, .stickerstatus, .clear, .purge, .queue, .stats, .chatweight, .trace")
+        log.info("Quick Actions: .pause, .resume")
+        log.info("Diagnostics: .profile, .memsnap, .tasks")
+        log.info("✅ Bot initialized successfully!")
+    
+    async def _serve(self):
+        """Run the client until SIGINT/SIGTERM, then persist pending work"""
+        await self.client.start()
+        await self.media_handler.start()
+        await self.metrics_exporter.start()
+        self.loop_watchdog.start()
+        try:
+            await idle()
+        finally:
+            await self.loop_watchdog.stop()
+            await self.metrics_exporter.stop()
+            await self.media_handler.shutdown()
+            await self.client.stop()
+            self.log_listener.stop()
     
     def run(self):
         """Start the bot"""
         self.print_startup_info()
-        self.client.run()
+        self.client.run(self._serve())
+
+def install_event_loop(use_uvloop: bool) -> str:
+    """Select the event loop implementation; must run before the Client grabs its loop."""
+    if not use_uvloop:
+        return "asyncio"
+    try:
+        import uvloop
+    except ImportError:
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
 
 def main():
     """Main entry point"""
+    event_loop = install_event_loop(Config.USE_UVLOOP)
     bot = MediaCleanerBot()
+    # Logged once the bot has set up logging
+    if Config.USE_UVLOOP and event_loop != "uvloop":
+        log.warning("⚠️ USE_UVLOOP is set but uvloop is not installed - using the asyncio event loop")
+    log.info("🔁 Event loop: %s", event_loop)
     bot.run()
 
 if __name__ == "__main__":
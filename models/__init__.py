@@ -1,3 +1,6 @@
 from .data_manager import DataManager
+from .deletion_journal import DeletionJournal
+from .purge_checkpoints import PurgeCheckpoints
+from .chat_bookmarks import ChatBookmarks
 
-__all__ = ['DataManager']
+__all__ = ['DataManager', 'DeletionJournal', 'PurgeCheckpoints', 'ChatBookmarks']
@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Dict, Optional
+
+from utils.log import get_logger
+
+log = get_logger("bookmarks")
+
+
+class ChatBookmarks:
+    """Last media message id handled per chat, so media posted while stopped or paused can be caught up
+
+    Bookmarks advance in memory on every handled update and are written
+    periodically. A chat whose gap is still being scanned is "held": its
+    saved bookmark stays at the start of the gap until the scan finishes,
+    so a crash mid-backfill rescans the gap instead of skipping it.
+    """
+
+    BOOKMARK_FILE = "chat_bookmarks.json"
+
+    def __init__(self):
+        self.bookmarks: Dict[int, int] = self._load()
+        self.held: Dict[int, int] = {}
+        self._dirty = False
+
+    def _load(self) -> Dict[int, int]:
+        """Load bookmarks from file."""
+        try:
+            if os.path.exists(self.BOOKMARK_FILE):
+                with open(self.BOOKMARK_FILE, 'r') as f:
+                    return {int(chat_id): message_id for chat_id, message_id in json.load(f).items()}
+        except Exception as e:
+            log.error("❌ Error loading chat bookmarks: %s", e)
+        return {}
+
+    def save(self) -> bool:
+        """Write bookmarks atomically if anything changed."""
+        if not self._dirty:
+            return True
+        try:
+            saved = {**self.bookmarks, **self.held}
+            tmp_file = self.BOOKMARK_FILE + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({str(chat_id): message_id for chat_id, message_id in saved.items()}, f)
+            os.replace(tmp_file, self.BOOKMARK_FILE)
+            self._dirty = False
+            return True
+        except Exception as e:
+            log.error("❌ Error saving chat bookmarks: %s", e)
+            return False
+
+    def get(self, chat_id: int) -> Optional[int]:
+        return self.bookmarks.get(chat_id)
+
+    def advance(self, chat_id: int, message_id: int):
+        """Note that a message was handled (ids only move forward)."""
+        if message_id > self.bookmarks.get(chat_id, 0):
+            self.bookmarks[chat_id] = message_id
+            self._dirty = True
+
+    def hold(self, chat_id: int, message_id: int):
+        """Pin the start of a chat's gap; a gap that is still pending keeps its older start."""
+        if chat_id not in self.held:
+            self.held[chat_id] = message_id
+            self._dirty = True
+
+    def hold_all(self) -> Dict[int, int]:
+        """Pin every chat's current bookmark as the start of a gap to scan; returns all held gaps."""
+        for chat_id, message_id in self.bookmarks.items():
+            self.hold(chat_id, message_id)
+        return dict(self.held)
+
+    def release(self, chat_id: int):
+        """The gap of a chat was scanned; its live bookmark may be saved again."""
+        if self.held.pop(chat_id, None) is not None:
+            self._dirty = True
@@ -3,15 +3,25 @@ import os
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from utils.clock import Clock, SYSTEM_CLOCK
+from utils.log import get_logger
+
+log = get_logger("data")
+
 class DataManager:
     """Manages persistent data storage for sudo users and exemptions"""
     
     SUDO_FILE = "sudo_users.json"
     EXEMPTIONS_FILE = "temp_exemptions.json"
+    CHAT_WEIGHTS_FILE = "chat_weights.json"
     
-    def __init__(self):
+    def __init__(self, clock: Clock = SYSTEM_CLOCK):
+        self.clock = clock
         self.sudo_users = self._load_sudo_users()
         self.temp_exemptions = self._load_exemptions()
+        # Expiry as epoch seconds, so the per-message check is a float comparison
+        self._exemption_expiry = {user_id: exp_time.timestamp() for user_id, exp_time in self.temp_exemptions.items()}
+        self.chat_weights = self._load_chat_weights()
     
     # Sudo Users Management
     def _load_sudo_users(self) -> List[int]:
@@ -21,7 +31,7 @@ class DataManager:
                 with open(self.SUDO_FILE, 'r') as f:
                     return json.load(f)
         except Exception as e:
-            print(f"Error loading sudo users: {e}")
+            log.error("❌ Error loading sudo users: %s", e)
         return []
     
     def save_sudo_users(self) -> bool:
@@ -31,7 +41,7 @@ class DataManager:
                 json.dump(self.sudo_users, f, indent=2)
             return True
         except Exception as e:
-            print(f"Error saving sudo users: {e}")
+            log.error("❌ Error saving sudo users: %s", e)
             return False
     
     def add_sudo_user(self, user_id: int) -> bool:
@@ -62,7 +72,7 @@ class DataManager:
                     return {int(user_id): datetime.fromisoformat(exp_time) 
                            for user_id, exp_time in data.items()}
         except Exception as e:
-            print(f"Error loading exemptions: {e}")
+            log.error("❌ Error loading exemptions: %s", e)
         return {}
     
     def save_exemptions(self) -> bool:
@@ -74,25 +84,28 @@ class DataManager:
                 json.dump(data, f, indent=2)
             return True
         except Exception as e:
-            print(f"Error saving exemptions: {e}")
+            log.error("❌ Error saving exemptions: %s", e)
             return False
     
     def add_exemption(self, user_id: int, expiration: datetime) -> bool:
         """Add a temporary exemption for a user."""
         self.temp_exemptions[user_id] = expiration
+        self._exemption_expiry[user_id] = expiration.timestamp()
         return self.save_exemptions()
     
     def remove_exemption(self, user_id: int) -> bool:
         """Remove a user's exemption."""
         if user_id in self.temp_exemptions:
             del self.temp_exemptions[user_id]
+            self._exemption_expiry.pop(user_id, None)
             return self.save_exemptions()
         return False
     
     def is_user_exempted(self, user_id: int) -> bool:
         """Check if a user is currently exempted."""
-        if user_id in self.temp_exemptions:
-            if datetime.now() < self.temp_exemptions[user_id]:
+        expiry = self._exemption_expiry.get(user_id)
+        if expiry is not None:
+            if self.clock.time() < expiry:
                 return True
             else:
                 # Exemption expired, remove it
@@ -101,14 +114,50 @@ class DataManager:
     
     def clean_expired_exemptions(self) -> List[int]:
         """Remove expired exemptions and return list of cleaned user IDs."""
-        current_time = datetime.now()
-        expired = [uid for uid, exp_time in self.temp_exemptions.items() 
-                  if exp_time < current_time]
+        current_time = self.clock.time()
+        expired = [uid for uid, expiry in self._exemption_expiry.items() 
+                  if expiry < current_time]
         
         for uid in expired:
             del self.temp_exemptions[uid]
+            del self._exemption_expiry[uid]
         
         if expired:
             self.save_exemptions()
         
         return expired
+    
+    # Fair-share Weights Management
+    def _load_chat_weights(self) -> Dict[int, int]:
+        """Load per-chat fair-share weights from file."""
+        try:
+            if os.path.exists(self.CHAT_WEIGHTS_FILE):
+                with open(self.CHAT_WEIGHTS_FILE, 'r') as f:
+                    data = json.load(f)
+                    return {int(chat_id): int(weight) for chat_id, weight in data.items()}
+        except Exception as e:
+            log.error("❌ Error loading chat weights: %s", e)
+        return {}
+    
+    def save_chat_weights(self) -> bool:
+        """Save per-chat fair-share weights to file."""
+        try:
+            data = {str(chat_id): weight for chat_id, weight in self.chat_weights.items()}
+            with open(self.CHAT_WEIGHTS_FILE, 'w') as f:
+                json.dump(data, f, indent=2)
+            return True
+        except Exception as e:
+            log.error("❌ Error saving chat weights: %s", e)
+            return False
+    
+    def set_chat_weight(self, chat_id: int, weight: int) -> bool:
+        """Set a chat's fair-share weight (1 is the default and is not stored)."""
+        if weight == 1:
+            self.chat_weights.pop(chat_id, None)
+        else:
+            self.chat_weights[chat_id] = weight
+        return self.save_chat_weights()
+    
+    def get_chat_weight(self, chat_id: int) -> int:
+        """Get a chat's fair-share weight."""
+        return self.chat_weights.get(chat_id, 1)
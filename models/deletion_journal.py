@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from utils.log import get_logger
+
+log = get_logger("journal")
+
+class DeletionJournal:
+    """Append-only on-disk journal of pending media deletions"""
+
+    JOURNAL_FILE = "pending_deletions.jsonl"
+    COMPACT_MIN_DEAD = 500  # Don't rewrite the file for a handful of finished records
+
+    def __init__(self):
+        # (chat_id, message_id) -> (media_type, due as wall-clock epoch seconds, media_group_id, user_id)
+        self.live: Dict[Tuple[int, int], Tuple[str, float, Optional[int], Optional[int]]] = {}
+        self.dead_records = 0
+        self._load()
+        self._file = None
+        self.compact()
+
+    def _load(self):
+        """Replay the journal file into the live set."""
+        try:
+            if not os.path.exists(self.JOURNAL_FILE):
+                return
+            with open(self.JOURNAL_FILE, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write
+                        continue
+                    key = (record["c"], record["m"])
+                    if record["op"] == "a":
+                        self.live[key] = (record["t"], record["d"], record.get("g"), record.get("u"))
+                    else:
+                        self.live.pop(key, None)
+        except Exception as e:
+            log.error("❌ Error loading deletion journal: %s", e)
+
+    def _append(self, record: dict):
+        """Append a single record to the journal."""
+        try:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._file.flush()
+        except Exception as e:
+            log.error("❌ Error writing deletion journal: %s", e)
+
+    @staticmethod
+    def _add_record(chat_id: int, message_id: int, media_type: str, due: float,
+                    media_group_id: Optional[int], user_id: Optional[int]) -> dict:
+        """Build an "add" record for one pending deletion."""
+        record = {"op": "a", "c": chat_id, "m": message_id, "t": media_type, "d": due}
+        if media_group_id:
+            record["g"] = media_group_id
+        if user_id:
+            record["u"] = user_id
+        return record
+
+    def record_scheduled(self, chat_id: int, message_id: int, media_type: str, due: float,
+                         media_group_id: Optional[int] = None, user_id: Optional[int] = None):
+        """Record a newly scheduled deletion (due is a wall-clock timestamp)."""
+        self.live[(chat_id, message_id)] = (media_type, due, media_group_id, user_id)
+        self._append(self._add_record(chat_id, message_id, media_type, due, media_group_id, user_id))
+
+    def record_done(self, chat_id: int, message_id: int):
+        """Record that a deletion no longer needs to happen."""
+        if self.live.pop((chat_id, message_id), None) is None:
+            return
+        self._append({"op": "d", "c": chat_id, "m": message_id})
+        # Each finished deletion leaves two dead lines behind
+        self.dead_records += 2
+        if self.dead_records >= self.COMPACT_MIN_DEAD and self.dead_records > len(self.live):
+            self.compact()
+
+    def pending(self) -> List[Tuple[int, int, str, float, Optional[int], Optional[int]]]:
+        """Return pending deletions as (chat_id, message_id, media_type, due, media_group_id, user_id)."""
+        return [(chat_id, message_id, *details) for (chat_id, message_id), details in self.live.items()]
+
+    def compact(self) -> bool:
+        """Rewrite the journal so it only contains live entries."""
+        try:
+            if self._file:
+                self._file.close()
+            tmp_file = self.JOURNAL_FILE + ".tmp"
+            with open(tmp_file, 'w') as f:
+                for (chat_id, message_id), details in self.live.items():
+                    record = self._add_record(chat_id, message_id, *details)
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.JOURNAL_FILE)
+            self.dead_records = 0
+            return True
+        except Exception as e:
+            log.error("❌ Error compacting deletion journal: %s", e)
+            return False
+        finally:
+            self._file = open(self.JOURNAL_FILE, 'a')
+
+    def close(self):
+        """Compact and close the journal (called on shutdown)."""
+        self.compact()
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Dict, Optional
+
+from utils.log import get_logger
+
+log = get_logger("checkpoints")
+
+
+class PurgeCheckpoints:
+    """Progress of bulk purges per chat, so an interrupted purge can resume where it stopped"""
+
+    CHECKPOINT_FILE = "purge_checkpoints.json"
+
+    def __init__(self):
+        self.checkpoints: Dict[int, dict] = self._load()
+
+    def _load(self) -> Dict[int, dict]:
+        """Load checkpoints from file."""
+        try:
+            if os.path.exists(self.CHECKPOINT_FILE):
+                with open(self.CHECKPOINT_FILE, 'r') as f:
+                    return {int(chat_id): state for chat_id, state in json.load(f).items()}
+        except Exception as e:
+            log.error("❌ Error loading purge checkpoints: %s", e)
+        return {}
+
+    def _save(self) -> bool:
+        """Write all checkpoints atomically."""
+        try:
+            tmp_file = self.CHECKPOINT_FILE + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({str(chat_id): state for chat_id, state in self.checkpoints.items()}, f)
+            os.replace(tmp_file, self.CHECKPOINT_FILE)
+            return True
+        except Exception as e:
+            log.error("❌ Error saving purge checkpoints: %s", e)
+            return False
+
+    def get(self, chat_id: int) -> Optional[dict]:
+        return self.checkpoints.get(chat_id)
+
+    def set(self, chat_id: int, state: dict) -> bool:
+        """Record a purge's current state (called after every deleted batch)."""
+        self.checkpoints[chat_id] = state
+        return self._save()
+
+    def clear(self, chat_id: int) -> bool:
+        """Forget a finished or abandoned purge."""
+        if self.checkpoints.pop(chat_id, None) is None:
+            return False
+        return self._save()
@@ -1,5 +1,11 @@
 from .rate_limiter import RateLimiter
 from .cache import AdminCache
+from .scheduler import DeletionScheduler, PendingDeletion
+from .batcher import DeletionBatcher
+from .flood_control import FloodController
+from .dedup import UpdateDeduplicator
+from .clock import Clock, SystemClock, VirtualClock
+from .permissions import PermissionService
 from .helpers import (
     parse_duration, 
     get_media_type, 
@@ -13,6 +19,15 @@ from .helpers import (
 __all__ = [
     'RateLimiter', 
     'AdminCache', 
+    'DeletionScheduler',
+    'PendingDeletion',
+    'DeletionBatcher',
+    'FloodController',
+    'UpdateDeduplicator',
+    'Clock',
+    'SystemClock',
+    'VirtualClock',
+    'PermissionService',
     'parse_duration', 
     'get_media_type', 
     'format_user_info',
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from .scheduler import PendingDeletion
+from .log import get_logger
+
+log = get_logger("batcher")
+
+# Telegram accepts at most 100 message ids per delete_messages call
+MAX_BATCH_SIZE = 100
+
+
+def chunk_deletions(entries: List[PendingDeletion], size: int = MAX_BATCH_SIZE) -> List[List[PendingDeletion]]:
+    """Split entries into chunks of at most `size` ids without splitting albums."""
+    # Group album items together, keeping first-seen order
+    groups: Dict[Tuple, List[PendingDeletion]] = {}
+    for entry in entries:
+        key = ("album", entry.media_group_id) if entry.media_group_id else ("single", entry.message_id)
+        groups.setdefault(key, []).append(entry)
+
+    chunks: List[List[PendingDeletion]] = []
+    current: List[PendingDeletion] = []
+    for members in groups.values():
+        if current and len(current) + len(members) > size:
+            chunks.append(current)
+            current = []
+        current.extend(members)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class DeletionBatcher:
+    """Coalesces due deletions per chat into batched delete calls"""
+
+    def __init__(self, execute: Callable[[int, List[PendingDeletion]], Awaitable[None]],
+                 window: Callable[[], float]):
+        self.execute = execute  # Called with (chat_id, entries) for each batch
+        self.window = window    # Returns the coalescing window in seconds
+        self._buffers: Dict[int, List[PendingDeletion]] = {}
+        self._flushers: Dict[int, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def add(self, entry: PendingDeletion):
+        """Buffer a due deletion; the chat's batch is sent when its window closes."""
+        buffer = self._buffers.setdefault(entry.chat_id, [])
+        buffer.append(entry)
+
+        if entry.chat_id not in self._flushers:
+            self._flushers[entry.chat_id] = asyncio.get_running_loop().create_task(
+                self._flush_after_window(entry.chat_id)
+            )
+
+    async def add_many(self, entries: List[PendingDeletion]):
+        """Buffer deletions admitted together (e.g. an album) so they land in the same batch."""
+        for entry in entries:
+            await self.add(entry)
+
+    async def _flush_after_window(self, chat_id: int):
+        """Wait for the coalescing window, then send everything buffered for the chat."""
+        try:
+            await asyncio.sleep(self.window())
+        finally:
+            self._flushers.pop(chat_id, None)
+        await self.flush(chat_id)
+
+    async def flush(self, chat_id: int):
+        """Send all buffered deletions for a chat in chunks of up to 100 ids."""
+        entries = [entry for entry in self._buffers.pop(chat_id, []) if not entry.cancelled]
+        for chunk in chunk_deletions(entries):
+            try:
+                await self.execute(chat_id, chunk)
+            except Exception as e:
+                log.error("❌ Error executing deletion batch in chat %s: %s", chat_id, e)
+
+    async def stop(self):
+        """Cancel pending flushes; unsent entries are still in the journal."""
+        for task in list(self._flushers.values()):
+            task.cancel()
+        self._flushers.clear()
+        self._buffers.clear()
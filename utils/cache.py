@@ -1,12 +1,19 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Dict, Tuple, Optional
 
+from .clock import Clock, SYSTEM_CLOCK
+
 class AdminCache:
     """Caches admin status to avoid repeated API calls"""
     
-    def __init__(self, cache_duration: timedelta = timedelta(minutes=5)):
-        self.cache: Dict[str, Tuple[datetime, bool]] = {}
+    def __init__(self, cache_duration: timedelta = timedelta(minutes=5), clock: Clock = SYSTEM_CLOCK):
+        # key -> (clock.monotonic() when cached, has rights)
+        self.cache: Dict[str, Tuple[float, bool]] = {}
         self.cache_duration = cache_duration
+        self.clock = clock
+        self._ttl = cache_duration.total_seconds()
+        self.hits = 0
+        self.misses = 0
     
     def get(self, chat_id: int, force_check: bool = False) -> Optional[bool]:
         """Get cached admin status for a chat."""
@@ -16,14 +23,16 @@ class AdminCache:
         cache_key = str(chat_id)
         if cache_key in self.cache:
             cached_time, has_rights = self.cache[cache_key]
-            if datetime.now() - cached_time < self.cache_duration:
+            if self.clock.monotonic() - cached_time < self._ttl:
+                self.hits += 1
                 return has_rights
+        self.misses += 1
         return None
     
     def set(self, chat_id: int, has_rights: bool):
         """Cache admin status for a chat."""
         cache_key = str(chat_id)
-        self.cache[cache_key] = (datetime.now(), has_rights)
+        self.cache[cache_key] = (self.clock.monotonic(), has_rights)
     
     def clear(self):
         """Clear all cached entries."""
@@ -47,4 +56,4 @@ class AdminCache:
     def set_warned(self, chat_id: int):
         """Mark a chat as warned about no admin rights."""
         cache_key = f"warned_{chat_id}"
-        self.cache[cache_key] = (datetime.now(), True)
+        self.cache[cache_key] = (self.clock.monotonic(), True)
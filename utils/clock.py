@@ -0,0 +1,62 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+
+class Clock(ABC):
+    """Source of time for rate windows, caches and expiry checks
+
+    monotonic() is for intervals and in-memory expiry: cheap, and immune to
+    wall-clock jumps. time() (epoch seconds) is only for timestamps that are
+    persisted or shown to users, such as exemption expiry.
+    """
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        ...
+
+    @abstractmethod
+    def time(self) -> float:
+        ...
+
+    def now(self) -> datetime:
+        """Local wall-clock datetime, for display and persisted timestamps."""
+        return datetime.fromtimestamp(self.time())
+
+
+class SystemClock(Clock):
+    """The real clocks"""
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+
+class VirtualClock(Clock):
+    """Clock that only moves when advanced, so tests and simulations can skip hours instantly
+
+    Monotonic and wall-clock time advance together, so expiry checks and
+    persisted timestamps stay consistent with each other.
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self.elapsed = 0.0
+        self.start = time.time() if start is None else start  # Epoch seconds at elapsed 0
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def time(self) -> float:
+        return self.start + self.elapsed
+
+    def advance(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("A monotonic clock cannot go backwards")
+        self.elapsed += seconds
+
+
+# Shared default for components constructed without an explicit clock
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+from typing import Tuple
+
+
+class UpdateDeduplicator:
+    """Bounded LRU of recently handled (chat_id, message_id) pairs
+
+    pyrogram can redeliver updates after a reconnect; remembering the last
+    `capacity` messages keeps a redelivered one from being scheduled twice
+    while keeping memory fixed.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self._seen: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+        self.hits = 0    # Duplicates suppressed
+        self.misses = 0  # First sightings
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def seen(self, chat_id: int, message_id: int) -> bool:
+        """Return True if the message was already handled, otherwise remember it."""
+        key = (chat_id, message_id)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        self._seen[key] = None
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return False
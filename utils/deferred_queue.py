@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import itertools
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .batcher import MAX_BATCH_SIZE
+from .clock import Clock, SYSTEM_CLOCK
+from .rate_limiter import RateLimiter
+from .scheduler import PendingDeletion
+from .log import get_logger
+
+log = get_logger("deferred")
+
+
+class DeferredQueue:
+    """Bounded queue of deletions waiting for rate-limit budget, drained fairly across chats
+
+    Each chat keeps its own due-ordered heap of units: a single deletion, or
+    all items of an album, which are always admitted together. The drain task
+    picks chats by deficit round robin: on its turn a chat may release up to a
+    batch of entries per unit of weight, so every backlogged chat gets a
+    guaranteed share of the global budget while chats with nothing queued
+    leave their share to the others. A chat's entries are released in chunks
+    that fill one delete_messages call, so a binding budget still yields full
+    batches. A chat's own per-chat and per-type budgets are only tried: a chat
+    over its own limit is passed over until they refill, and only the global
+    budget makes the drain wait.
+    """
+
+    MIN_RETRY = 0.05  # Seconds; floor for re-checking chats that are over their own budget
+
+    def __init__(self, rate_limiter: RateLimiter,
+                 release: Callable[[List[PendingDeletion]], Awaitable[None]],
+                 drop: Callable[[PendingDeletion], None],
+                 max_size: Callable[[], int],
+                 max_age: Callable[[], float],
+                 weight: Callable[[int], int] = lambda chat_id: 1,
+                 clock: Clock = SYSTEM_CLOCK):
+        self.rate_limiter = rate_limiter
+        self.clock = clock        # Same clock as the rate limiter, so expiry and refill agree
+        self.release = release    # Called with a unit's entries once budget is available for them
+        self.drop = drop          # Called for entries that overflow or expire
+        self.max_size = max_size  # Returns the current size limit
+        self.max_age = max_age    # Returns the max seconds an entry may be overdue
+        self.weight = weight      # Returns a chat's fair-share weight
+        # chat_id -> due-ordered heap of (due, sequence, unit)
+        self._queues: Dict[int, List[Tuple[float, int, List[PendingDeletion]]]] = {}
+        self._depth: Dict[int, int] = {}  # chat_id -> queued entries
+        self._sequence = itertools.count()
+        self._active: Deque[int] = deque()  # Backlogged chats in round-robin order
+        self._deficit: Dict[int, int] = {}
+        self._serving: Optional[int] = None  # Chat whose turn it currently is
+        self._size = 0
+        self._releasing = 0  # Entries taken off the queue that are waiting for budget
+        self._frozen = False
+        self.overflowed: Dict[int, int] = {}  # chat_id -> entries dropped because the queue was full
+        self.expired = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._size + self._releasing
+
+    @property
+    def depth(self) -> Dict[int, int]:
+        """Queued entries per chat."""
+        return dict(self._depth)
+
+    @property
+    def total_overflowed(self) -> int:
+        return sum(self.overflowed.values())
+
+    def push(self, entries: List[PendingDeletion]) -> bool:
+        """Queue an over-limit deletion or album as one unit; returns False if it had to be dropped."""
+        chat_id = entries[0].chat_id
+        while self._size + len(entries) > self.max_size():
+            # Make room at the expense of the chat with the largest backlog
+            noisiest = max(self._depth, key=self._depth.get, default=None)
+            if noisiest is None or self._depth.get(chat_id, 0) >= self._depth[noisiest]:
+                self._count_overflow(entries)
+                return False
+            self._count_overflow(self._pop(noisiest))
+
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = []
+            self._active.append(chat_id)
+            self._deficit[chat_id] = 0
+            self._depth[chat_id] = 0
+        heapq.heappush(queue, (entries[0].due, next(self._sequence), entries))
+        self._depth[chat_id] += len(entries)
+        self._size += len(entries)
+        self.start()
+        self._wakeup.set()
+        return True
+
+    def _count_overflow(self, entries: List[PendingDeletion]):
+        """Account for and drop a unit that did not fit."""
+        for entry in entries:
+            self.overflowed[entry.chat_id] = self.overflowed.get(entry.chat_id, 0) + 1
+            self.drop(entry)
+
+    def _pop(self, chat_id: int) -> List[PendingDeletion]:
+        """Remove the earliest-due unit of a chat."""
+        queue = self._queues[chat_id]
+        _, _, entries = heapq.heappop(queue)
+        self._size -= len(entries)
+        self._depth[chat_id] -= len(entries)
+        if not queue:
+            self._forget_chat(chat_id)
+        return entries
+
+    def _forget_chat(self, chat_id: int):
+        """Drop the bookkeeping of a chat with nothing left queued."""
+        del self._queues[chat_id]
+        del self._deficit[chat_id]
+        del self._depth[chat_id]
+        self._active.remove(chat_id)
+        if self._serving == chat_id:
+            self._serving = None
+
+    def discard(self, entries: List[PendingDeletion]) -> int:
+        """Remove cancelled entries so size and depth only count live work; returns entries removed."""
+        removed = 0
+        for chat_id in {entry.chat_id for entry in entries}:
+            queue = self._queues.get(chat_id)
+            if queue is None:
+                continue
+            kept = []
+            for due, sequence, unit in queue:
+                live = [entry for entry in unit if not entry.cancelled]
+                removed += len(unit) - len(live)
+                self._depth[chat_id] -= len(unit) - len(live)
+                if live:
+                    kept.append((due, sequence, live))
+            if kept:
+                heapq.heapify(kept)
+                self._queues[chat_id] = kept
+            else:
+                self._forget_chat(chat_id)
+        self._size -= removed
+        return removed
+
+    def _chunk_size(self) -> int:
+        """Largest chunk released at once: one delete call, never more than a minute of global budget."""
+        return max(1, min(MAX_BATCH_SIZE, self.rate_limiter.global_bucket.per_minute))
+
+    def _take(self, chat_id: int) -> Tuple[List[PendingDeletion], bool]:
+        """Pop a chunk of a chat's units that its deficit and per-chat/per-type budget allow.
+
+        Returns the chunk and whether the chat ran out of its own budget.
+        """
+        limit = self._chunk_size()
+        chunk: List[PendingDeletion] = []
+        while chat_id in self._queues:
+            due, _, unit = self._queues[chat_id][0]
+            entries = [entry for entry in unit if not entry.cancelled]
+            if not entries or self.clock.monotonic() - due > self.max_age():
+                self._pop(chat_id)
+                if entries:
+                    self.expired += len(entries)
+                    for entry in entries:
+                        self.drop(entry)
+                continue
+            if len(entries) > self._deficit[chat_id]:
+                break
+            if chunk and len(chunk) + len(entries) > limit:
+                # An album larger than the limit still goes out, on its own
+                break
+            if not self.rate_limiter.try_acquire_many(chat_id, _type_counts(entries), include_global=False):
+                return chunk, True
+            self._deficit[chat_id] -= len(entries)
+            self._pop(chat_id)
+            chunk.extend(entries)
+        return chunk, False
+
+    def _select(self) -> Optional[List[PendingDeletion]]:
+        """Pick the next chunk by deficit round robin and take its per-chat/per-type budget.
+
+        Returns None when every backlogged chat is over its own budget.
+        """
+        blocked = 0  # Chats in a row passed over for lack of their own budget
+        while self._active and blocked < len(self._active):
+            chat_id = self._active[0]
+            if self._serving != chat_id:
+                # Start of this chat's turn
+                self._serving = chat_id
+                self._deficit[chat_id] += self._chunk_size() * max(1, self.weight(chat_id))
+            chunk, over_limit = self._take(chat_id)
+            if chunk:
+                return chunk
+            if chat_id not in self._queues:
+                # Everything it had queued was cancelled or expired
+                continue
+            if over_limit:
+                # Over its own limit: it forfeits this turn and the others go ahead
+                self._deficit[chat_id] = 0
+                blocked += 1
+            else:
+                blocked = 0
+            # Turn over: move the chat to the back of the ring
+            self._active.rotate(-1)
+            self._serving = None
+        return None
+
+    def _local_wait(self) -> float:
+        """Seconds until some backlogged chat's own budget admits its next unit."""
+        return min(
+            (self.rate_limiter.wait_time(chat_id, _type_counts(queue[0][2]), include_global=False)
+             for chat_id, queue in self._queues.items()),
+            default=0.0
+        )
+
+    def freeze(self):
+        """Stop releasing entries until thaw() is called."""
+        self._frozen = True
+
+    def thaw(self):
+        """Resume releasing entries."""
+        self._frozen = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the drain task if it is not already running."""
+        if self._drainer is None or self._drainer.done():
+            self._wakeup = asyncio.Event()
+            self._drainer = asyncio.get_running_loop().create_task(self._drain())
+
+    async def stop(self):
+        """Cancel the drain task; queued entries are still in the journal."""
+        if self._drainer and not self._drainer.done():
+            self._drainer.cancel()
+            try:
+                await self._drainer
+            except asyncio.CancelledError:
+                pass
+        self._drainer = None
+
+    async def _drain(self):
+        """Release chunks in fair order, waiting only for the global budget."""
+        while True:
+            while not self._size or self._frozen:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            entries = self._select()
+            if entries is None:
+                # Every backlogged chat is over its own limit; new entries may wake us earlier
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(self.MIN_RETRY, self._local_wait()))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._releasing = len(entries)
+            try:
+                await self.rate_limiter.acquire(count=len(entries))
+                await self.release(entries)
+            except Exception as e:
+                log.error("❌ Error releasing deferred deletions %s: %s", entries, e)
+            finally:
+                self._releasing = 0
+
+
+def _type_counts(entries: List[PendingDeletion]) -> Dict[Optional[str], int]:
+    """Deletions per media type, as the rate limiter charges them."""
+    return Counter(entry.media_type for entry in entries)
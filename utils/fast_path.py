@@ -0,0 +1,147 @@
+from typing import Awaitable, Callable, Dict, Optional
+
+from pyrogram import Client, raw, utils as pyrogram_utils
+from pyrogram.types import Message
+
+from .helpers import get_media_type
+
+# Raw updates that carry a freshly posted message
+NEW_MESSAGE_UPDATES = (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)
+
+
+class MediaEvent:
+    """The few fields of a group media message the deletion pipeline needs"""
+
+    __slots__ = ("chat_id", "message_id", "user_id", "username", "is_bot", "media_type",
+                 "media_group_id", "chat_title")
+
+    def __init__(self, chat_id: int, message_id: int, user_id: Optional[int], username: Optional[str],
+                 is_bot: bool, media_type: Optional[str], media_group_id: Optional[int],
+                 chat_title: Optional[str]):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.user_id = user_id
+        self.username = username
+        self.is_bot = is_bot
+        self.media_type = media_type
+        self.media_group_id = media_group_id
+        self.chat_title = chat_title
+
+    @classmethod
+    def from_message(cls, message: Message) -> "MediaEvent":
+        """Build an event from a parsed pyrogram Message."""
+        user = message.from_user
+        return cls(
+            message.chat.id,
+            message.id,
+            user.id if user else None,
+            user.username if user else None,
+            bool(user and user.is_bot),
+            get_media_type(message),
+            message.media_group_id,
+            message.chat.title
+        )
+
+
+def get_raw_media_type(media) -> Optional[str]:
+    """Classify a raw MessageMedia constructor the same way get_media_type does for Messages."""
+    if isinstance(media, raw.types.MessageMediaPhoto):
+        return "photo" if isinstance(media.photo, raw.types.Photo) else None
+
+    if not isinstance(media, raw.types.MessageMediaDocument):
+        return None
+    document = media.document
+    if not isinstance(document, raw.types.Document):
+        return None
+
+    # Same precedence as pyrogram's Message._parse
+    attributes = {type(attribute): attribute for attribute in document.attributes}
+    if raw.types.DocumentAttributeAnimated in attributes:
+        return "animation"
+    if raw.types.DocumentAttributeSticker in attributes:
+        return "sticker"
+    video = attributes.get(raw.types.DocumentAttributeVideo)
+    if video:
+        return "video_note" if video.round_message else "video"
+    audio = attributes.get(raw.types.DocumentAttributeAudio)
+    if audio:
+        return "voice" if audio.voice else "audio"
+    return "document"
+
+
+def parse_raw_media(update, users: Dict[int, "raw.base.User"],
+                    chats: Dict[int, "raw.base.Chat"]) -> Optional[MediaEvent]:
+    """Extract a MediaEvent from an incoming group media update, or None for anything else."""
+    return parse_raw_media_message(update.message, users, chats)
+
+
+def parse_raw_media_message(message, users: Dict[int, "raw.base.User"],
+                            chats: Dict[int, "raw.base.Chat"]) -> Optional[MediaEvent]:
+    """Extract a MediaEvent from a raw incoming group media message (e.g. a search result)."""
+    if not isinstance(message, raw.types.Message) or message.out:
+        return None
+
+    media_type = get_raw_media_type(message.media)
+    if media_type is None:
+        return None
+
+    # Only basic groups and supergroups, like filters.group
+    peer = message.peer_id
+    if isinstance(peer, raw.types.PeerChannel):
+        chat = chats.get(peer.channel_id)
+        if not getattr(chat, "megagroup", False):
+            return None
+    elif isinstance(peer, raw.types.PeerChat):
+        chat = chats.get(peer.chat_id)
+    else:
+        return None
+
+    user = None
+    user_id = None
+    if isinstance(message.from_id, raw.types.PeerUser):
+        user_id = message.from_id.user_id
+        user = users.get(user_id)
+
+    return MediaEvent(
+        pyrogram_utils.get_peer_id(peer),
+        message.id,
+        user_id,
+        getattr(user, "username", None),
+        bool(getattr(user, "bot", False)),
+        media_type,
+        message.grouped_id,
+        getattr(chat, "title", None)
+    )
+
+
+def install_fast_path(client: Client, on_media: Callable[[MediaEvent], Awaitable[None]]):
+    """Route incoming group media straight from raw updates, skipping Message construction.
+
+    Incoming new messages are no longer parsed into pyrogram Messages, so
+    on_message handlers only see our own (outgoing) messages - which is all
+    the command handlers need. Media events go to `on_media` through a raw
+    update handler instead.
+    """
+    parsers = client.dispatcher.update_parsers
+
+    for update_type in NEW_MESSAGE_UPDATES:
+        parse_message = parsers[update_type]
+
+        async def parse_outgoing_only(update, users, chats, parse_message=parse_message):
+            message = update.message
+            if isinstance(message, raw.types.Message) and not message.out:
+                # Handled by the raw handler below; no MessageHandler will run
+                return None, type(None)
+            return await parse_message(update, users, chats)
+
+        parsers[update_type] = parse_outgoing_only
+
+    # Own group: in a shared group, running this handler would stop the command handlers
+    # from seeing outgoing messages
+    @client.on_raw_update(group=-1)
+    async def raw_media_handler(client: Client, update, users, chats):
+        if type(update) not in NEW_MESSAGE_UPDATES:
+            return
+        event = parse_raw_media(update, users, chats)
+        if event:
+            await on_media(event)
@@ -0,0 +1,98 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable
+
+from pyrogram.errors import FloodWait, SlowmodeWait, InternalServerError, ServiceUnavailable
+
+from .clock import Clock, SYSTEM_CLOCK
+from .rate_limiter import RateLimiter
+from .log import get_logger
+
+log = get_logger("flood")
+
+# Errors worth retrying after a short backoff
+TRANSIENT_ERRORS = (InternalServerError, ServiceUnavailable, OSError, asyncio.TimeoutError)
+
+
+class RetryLater(Exception):
+    """Raised when a deletion call should be re-queued after `retry_after` seconds"""
+
+    def __init__(self, retry_after: float, reason: str, transient: bool = False):
+        super().__init__(f"{reason}, retrying in {retry_after:.0f}s")
+        self.retry_after = retry_after
+        self.transient = transient  # Network hiccup rather than a server-imposed wait
+
+
+class FloodController:
+    """Shared FloodWait pause and AIMD throttle for all deletion API calls"""
+
+    MIN_RATE_FACTOR = 0.1
+    DECREASE_FACTOR = 0.5      # Multiplicative decrease once per flood window
+    INCREASE_STEP = 0.1        # Additive increase per quiet interval
+    INCREASE_INTERVAL = 60.0   # Seconds without FloodWait before stepping back up
+    MAX_TRANSIENT_BACKOFF = 60.0
+
+    def __init__(self, rate_limiter: RateLimiter, clock: Clock = SYSTEM_CLOCK):
+        self.rate_limiter = rate_limiter
+        self.clock = clock
+        self.resume_at = 0.0  # Clock.monotonic() until which all deletions are paused
+        self.rate_factor = 1.0
+        self.last_adjusted = self.clock.monotonic()
+        self.flood_waits = 0
+        self.transient_errors = 0
+
+    @property
+    def paused_for(self) -> float:
+        """Seconds left in the current FloodWait pause."""
+        return max(0.0, self.resume_at - self.clock.monotonic())
+
+    async def wait_ready(self):
+        """Block while a FloodWait pause is in effect."""
+        while True:
+            remaining = self.resume_at - self.clock.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, attempt: int = 0) -> Any:
+        """Run a deletion API call, translating flood and network errors into RetryLater."""
+        await self.wait_ready()
+        try:
+            result = await func(*args)
+        except FloodWait as e:
+            # Pause everything for the server-specified time plus jitter
+            wait = float(e.value) + random.uniform(1.0, 1.0 + 0.1 * float(e.value))
+            self.flood_waits += 1
+            now = self.clock.monotonic()
+            if now >= self.resume_at:
+                # Calls already in flight when the window opened hit the same flood; count it once
+                self._decrease()
+            self.resume_at = max(self.resume_at, now + wait)
+            log.warning("🌊 FloodWait %ss - pausing deletions for %.0fs, rate x%.2f", e.value, wait, self.rate_factor)
+            raise RetryLater(wait, "FloodWait")
+        except SlowmodeWait as e:
+            # Slow mode is per chat, so only this call is delayed
+            raise RetryLater(float(e.value) + random.uniform(0.5, 2.0), "SlowmodeWait")
+        except TRANSIENT_ERRORS as e:
+            self.transient_errors += 1
+            backoff = min(self.MAX_TRANSIENT_BACKOFF, 2.0 ** (attempt + 1)) * random.uniform(1.0, 1.5)
+            raise RetryLater(backoff, type(e).__name__, transient=True)
+
+        self._maybe_increase()
+        return result
+
+    def _decrease(self):
+        """Multiplicative decrease of the effective deletion rate."""
+        self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor * self.DECREASE_FACTOR)
+        self.last_adjusted = self.clock.monotonic()
+        self.rate_limiter.set_scale(self.rate_factor)
+
+    def _maybe_increase(self):
+        """Additive increase once a full interval has passed without FloodWait."""
+        if self.rate_factor >= 1.0:
+            return
+        now = self.clock.monotonic()
+        if now - self.last_adjusted >= self.INCREASE_INTERVAL:
+            self.rate_factor = min(1.0, self.rate_factor + self.INCREASE_STEP)
+            self.last_adjusted = now
+            self.rate_limiter.set_scale(self.rate_factor)
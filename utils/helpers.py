@@ -1,8 +1,20 @@
 import re
 from datetime import timedelta
 from typing import Optional, Tuple
+from pyrogram import filters
 from pyrogram.types import Message
 
+# Every media type reported by get_media_type
+MEDIA_TYPES = ("sticker", "animation", "photo", "video", "document", "audio", "voice", "video_note")
+
+async def _has_handled_media(_, __, message: Message) -> bool:
+    # pyrogram's MessageMediaType values are the lowercase type names.
+    # Must be a coroutine: pyrogram runs plain-function filters in a thread pool.
+    return message.media is not None and message.media.value in MEDIA_TYPES
+
+# Matches only messages carrying one of MEDIA_TYPES, so text never reaches the media handler
+media_filter = filters.create(_has_handled_media, "MediaTypesFilter")
+
 def parse_duration(duration_str: str) -> Optional[timedelta]:
     """Parse duration string (e.g., '1h', '30m', '2d') to timedelta."""
     try:
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Callable, Optional
+
+from .clock import Clock, SYSTEM_CLOCK
+from .log import get_logger
+
+log = get_logger("load")
+
+
+class LoadShedder:
+    """Samples backlog and event-loop lag and switches degradation levels with hysteresis
+
+    Loop lag comes from the LoopWatchdog's heartbeat rather than a second
+    timer of our own.
+    """
+
+    NORMAL, SHEDDING, CRITICAL = 0, 1, 2
+    LEVEL_NAMES = ("normal", "shedding", "critical")
+
+    SAMPLE_INTERVAL = 0.5  # Seconds between samples
+    EXIT_RATIO = 0.5       # Step down only once load falls below half of the level's entry point
+    MIN_DWELL = 30.0       # Seconds to stay in a level before stepping down
+
+    def __init__(self, pending: Callable[[], int], lag: Callable[[], float],
+                 pending_threshold: int, lag_threshold: float, clock: Clock = SYSTEM_CLOCK):
+        self.pending = pending                      # Returns the current deletion backlog
+        self.sample_lag = lag                       # Returns the worst loop lag since the last sample
+        self.pending_threshold = pending_threshold  # Backlog that triggers shedding (x2 = critical)
+        self.lag_threshold = lag_threshold          # Loop lag in seconds that triggers shedding
+        self.clock = clock
+        self.level = self.NORMAL
+        self.lag = 0.0
+        self.changed_at = self.clock.monotonic()
+        self.transitions = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def level_name(self) -> str:
+        return self.LEVEL_NAMES[self.level]
+
+    def load(self, pending: int, lag: float) -> float:
+        """Overall load as a multiple of the shedding threshold."""
+        return max(pending / self.pending_threshold, lag / self.lag_threshold)
+
+    def evaluate(self, pending: int, lag: float):
+        """Move between levels: up immediately, down one step at a time after cooling off."""
+        load = self.load(pending, lag)
+        target = self.CRITICAL if load >= 2 else self.SHEDDING if load >= 1 else self.NORMAL
+
+        if target > self.level:
+            self._set_level(target, pending, lag)
+        elif (self.level > self.NORMAL and load < self.EXIT_RATIO * self.level
+              and self.clock.monotonic() - self.changed_at >= self.MIN_DWELL):
+            self._set_level(self.level - 1, pending, lag)
+
+    def _set_level(self, level: int, pending: int, lag: float):
+        """Switch level and log the transition once."""
+        previous = self.level_name
+        self.level = level
+        self.changed_at = self.clock.monotonic()
+        self.transitions += 1
+        emoji = "🔥" if level > self.NORMAL else "🌤️"
+        log.warning("%s Load level %s → %s (backlog %s, loop lag %.0f ms)",
+                    emoji, previous, self.level_name, pending, lag * 1000)
+
+    def start(self):
+        """Start the sampling task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the sampling task."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        """Re-evaluate the level from the current backlog and loop lag every SAMPLE_INTERVAL."""
+        while True:
+            await asyncio.sleep(self.SAMPLE_INTERVAL)
+            try:
+                self.lag = self.sample_lag()
+                self.evaluate(self.pending(), self.lag)
+            except Exception as e:
+                log.error("❌ Load shedder error: %s", e)
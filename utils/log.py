@@ -0,0 +1,106 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict, List, Tuple
+
+LOGGER_NAME = "mediacleaner"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module; call its methods with %-style args so formatting stays lazy."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The plain console lines the bot always printed, plus suppression counts"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `burst` records per call site through every `interval` seconds
+
+    Records are keyed on the unformatted message template, so the number of
+    keys is bounded by the number of log statements. The first record of the
+    next window carries how many were suppressed in the previous one.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, str], List] = {}  # key -> [window start, passed, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            record.suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched; the listener thread does all formatting and I/O."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: str = "INFO", json_lines: bool = True,
+                  burst: int = 20, interval: float = 10.0) -> logging.handlers.QueueListener:
+    """Route the bot's loggers through a queue drained by a background thread.
+
+    The event loop only pays for the level check, the rate-limit filter and a
+    queue put; formatting and the stdout write happen on the listener thread.
+    Returns the started listener; stop() it on shutdown to flush.
+    """
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if json_lines else TextFormatter("%(message)s"))
+    listener = logging.handlers.QueueListener(records, output)
+
+    handler = _LazyQueueHandler(records)
+    handler.addFilter(RateLimitFilter(burst, interval))
+
+    root = logging.getLogger(LOGGER_NAME)
+    root.setLevel(level.upper())
+    root.handlers = [handler]
+    root.propagate = False
+
+    listener.start()
+    return listener
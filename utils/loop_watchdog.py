@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import threading
+import traceback
+from typing import Optional
+
+from .clock import Clock, SYSTEM_CLOCK
+from .log import get_logger
+from .metrics import registry
+
+log = get_logger("watchdog")
+
+LOOP_LAG = registry.histogram(
+    "mediacleaner_event_loop_lag_seconds", "How late the watchdog's periodic wakeups ran",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+LOOP_STALLS = registry.counter(
+    "mediacleaner_event_loop_stalls_total", "Event-loop stalls longer than the watchdog threshold")
+
+
+class LoopWatchdog:
+    """Measures event-loop scheduling lag and captures the stack of code that blocks it
+
+    A heartbeat task on the loop records how late each wakeup is. A daemon
+    thread checks the heartbeat; if the loop has not come back for longer
+    than the stall threshold, it grabs the loop thread's current stack - the
+    code doing the blocking - and logs it once per stall.
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.5, clock: Clock = SYSTEM_CLOCK):
+        self.clock = clock
+        self.interval = interval                # Seconds between heartbeats
+        self.stall_threshold = stall_threshold  # Seconds without a heartbeat that count as a stall
+        self.max_lag = 0.0
+        self._recent_lag = 0.0  # Worst lag since the last take_lag()
+        self.last_stall_stack = ""
+        self._last_beat = self.clock.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the heartbeat task and the watching thread (call from the loop)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = self.clock.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _beat(self):
+        """Wake up every interval and record how late the wakeup was."""
+        while True:
+            started = self.clock.monotonic()
+            await asyncio.sleep(self.interval)
+            now = self.clock.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self._recent_lag:
+                self._recent_lag = lag
+            self._last_beat = now
+
+    def take_lag(self) -> float:
+        """Worst loop lag seen since the previous call, so readers sampling less often miss no spike."""
+        lag, self._recent_lag = self._recent_lag, 0.0
+        return lag
+
+    def _watch(self):
+        """Runs on its own thread: report the loop thread's stack when heartbeats stop."""
+        reported = False
+        while not self._stopping.wait(self.interval):
+            stalled_for = self.clock.monotonic() - self._last_beat
+            if stalled_for < self.stall_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            LOOP_STALLS.inc()
+            self.last_stall_stack = "".join(traceback.format_stack(frame))
+            log.warning("🐢 Event loop blocked for %.0f ms, currently in:\n%s",
+                        stalled_for * 1000, self.last_stall_stack,
+                        extra={"fields": {"stalled_ms": round(stalled_for * 1000)}})
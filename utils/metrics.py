@@ -0,0 +1,240 @@
+import asyncio
+import os
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from .log import get_logger
+
+log = get_logger("metrics")
+
+LabelValue = Optional[str]
+
+
+class Counter:
+    """Monotonic count, optionally split by one label"""
+
+    __slots__ = ("name", "help", "label", "values")
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[LabelValue, float] = {}
+
+    def inc(self, amount: float = 1, label: LabelValue = None):
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def samples(self):
+        for label, value in self.values.items():
+            yield self.name, label, value
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    __slots__ = ()
+    kind = "gauge"
+
+    def set(self, value: float, label: LabelValue = None):
+        self.values[label] = value
+
+
+class Sampled:
+    """Counter or gauge read from a callback at export time, so hot paths pay nothing"""
+
+    __slots__ = ("name", "help", "kind", "label", "read")
+
+    def __init__(self, name: str, help: str, kind: str,
+                 read: Callable[[], Union[float, Dict[str, float]]], label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self.read = read  # Returns a value, or {label value: value} when `label` is set
+
+    def samples(self):
+        value = self.read()
+        if self.label:
+            for label, labelled in value.items():
+                yield self.name, label, labelled
+        else:
+            yield self.name, None, value
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by one label"""
+
+    __slots__ = ("name", "help", "label", "buckets", "series")
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        # label value -> [per-bucket counts (+Inf last), sum, count]
+        self.series: Dict[LabelValue, list] = {}
+
+    def observe(self, value: float, label: LabelValue = None):
+        series = self.series.get(label)
+        if series is None:
+            series = self.series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, label: LabelValue = None) -> int:
+        series = self.series.get(label)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, label: LabelValue = None) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bucket)."""
+        series = self.series.get(label)
+        if not series or not series[2]:
+            return None
+        rank = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        for label, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", label, cumulative, ("le", "+Inf" if bound == float("inf") else f"{bound:g}")
+            yield f"{self.name}_sum", label, total
+            yield f"{self.name}_count", label, count
+
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Union[Counter, Gauge, Sampled, Histogram]] = {}
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        return self._add(Counter(name, help, label))
+
+    def gauge(self, name: str, help: str, label: Optional[str] = None) -> Gauge:
+        return self._add(Gauge(name, help, label))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float], label: Optional[str] = None) -> Histogram:
+        return self._add(Histogram(name, help, buckets, label))
+
+    def sampled(self, name: str, help: str, kind: str, read: Callable, label: Optional[str] = None) -> Sampled:
+        """Register (or replace) a metric read from `read()` at export time."""
+        return self._add(Sampled(name, help, kind, read, label))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, label, value, *extra in metric.samples():
+                    labels = []
+                    if label is not None:
+                        labels.append(f'{metric.label}="{label}"')
+                    labels.extend(f'{key}="{val}"' for key, val in extra)
+                    lines.append(f"{name}{{{','.join(labels)}}} {value}" if labels else f"{name} {value}")
+            except Exception as e:
+                log.error("❌ Error collecting metric %s: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the metrics recorded in the deletion pipeline
+registry = MetricsRegistry()
+
+UPDATES_SEEN = registry.counter(
+    "mediacleaner_updates_seen_total", "Group media updates that reached the media handler")
+MEDIA_DETECTED = registry.counter(
+    "mediacleaner_media_detected_total", "Media messages detected, by media type", "type")
+DELETIONS = registry.counter(
+    "mediacleaner_deletions_total", "Messages whose scheduled deletion finished, by result", "result")
+RATE_LIMITED = registry.counter(
+    "mediacleaner_rate_limit_rejections_total", "Due deletions deferred for lack of rate-limit budget")
+LATENESS = registry.histogram(
+    "mediacleaner_deletion_lateness_seconds",
+    "How long after its deadline (detection + configured delay) a message was actually deleted",
+    (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600), "kind")  # kind: media | sticker
+
+
+class MetricsExporter:
+    """Serves the registry on a local HTTP port and/or writes it to a textfile periodically"""
+
+    def __init__(self, registry: MetricsRegistry, port: int = 0, textfile: str = "", interval: float = 15.0):
+        self.registry = registry
+        self.port = port          # 0 disables the HTTP endpoint
+        self.textfile = textfile  # "" disables the textfile (node_exporter textfile collector format)
+        self.interval = interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.port:
+            self._server = await asyncio.start_server(self._serve, "127.0.0.1", self.port)
+            log.info("📈 Metrics at http://127.0.0.1:%s/metrics", self.port)
+        if self.textfile:
+            self._writer = asyncio.get_running_loop().create_task(self._write_periodically())
+            log.info("📈 Writing metrics to %s every %gs", self.textfile, self.interval)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._writer:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+            await self._write_textfile()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer any GET with the current metrics (one request per connection)."""
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            body = self.registry.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._write_textfile()
+
+    async def _write_textfile(self):
+        """Render on the loop, write atomically off it."""
+        text = self.registry.render()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _atomic_write, self.textfile, text)
+        except OSError as e:
+            log.error("❌ Error writing metrics file %s: %s", self.textfile, e)
+
+
+def _atomic_write(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Dict, Optional
+
+from pyrogram import Client, enums
+from pyrogram.errors import ChannelPrivate, ChatAdminRequired, UserNotParticipant
+
+from .cache import AdminCache
+from .log import get_logger
+
+log = get_logger("permissions")
+
+
+class PermissionService:
+    """Whether we can delete messages in a chat, for every handler
+
+    Answers come from the shared AdminCache. On a miss, concurrent callers
+    for the same chat wait on a single in-flight get_chat_member call
+    instead of each issuing their own, and our own user id is fetched once
+    instead of per lookup.
+    """
+
+    def __init__(self, client: Client, admin_cache: AdminCache):
+        self.client = client
+        self.admin_cache = admin_cache
+        self.me_id: Optional[int] = None
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self.lookups = 0    # get_chat_member calls made
+        self.coalesced = 0  # Callers that joined a lookup already in flight
+
+    async def start(self):
+        """Fetch our own user id (once the client is connected)."""
+        if self.me_id is None:
+            self.me_id = (await self.client.get_me()).id
+
+    async def can_delete(self, chat_id: int, force_check: bool = False) -> bool:
+        """Whether we may delete others' messages in a chat; force_check skips the cache."""
+        has_rights = self.admin_cache.get(chat_id, force_check)
+        if has_rights is not None:
+            return has_rights
+
+        task = self._inflight.get(chat_id)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(chat_id))
+            self._inflight[chat_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(chat_id, None))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the lookup other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _lookup(self, chat_id: int) -> bool:
+        """Ask Telegram for our membership in a chat and cache definitive answers."""
+        self.lookups += 1
+        try:
+            await self.start()
+            member = await self.client.get_chat_member(chat_id, self.me_id)
+            if member.status == enums.ChatMemberStatus.OWNER:
+                has_rights = True
+            elif member.status == enums.ChatMemberStatus.ADMINISTRATOR:
+                # Admins without a privileges object are assumed to have full rights
+                has_rights = bool(member.privileges.can_delete_messages) if member.privileges else True
+            else:
+                has_rights = False
+        except (UserNotParticipant, ChannelPrivate, ChatAdminRequired) as e:
+            # Definitive: we are not in the chat or may not look, so cannot delete
+            log.warning("⚠️ No access to chat %s: %s", chat_id, e)
+            has_rights = False
+        except Exception as e:
+            # Transient (network, FloodWait, ...): answer no for now but ask again next time
+            log.error("❌ Error checking admin rights in chat %s: %s", chat_id, e)
+            return False
+        self.admin_cache.set(chat_id, has_rights)
+        return has_rights
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from datetime import datetime
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from pyrogram import Client, raw
+
+from models import PurgeCheckpoints
+from .batcher import MAX_BATCH_SIZE
+from .fast_path import get_raw_media_type
+from .flood_control import FloodController, RetryLater
+from .helpers import MEDIA_TYPES, parse_duration
+from .log import get_logger
+from .rate_limiter import RateLimiter
+
+log = get_logger("purge")
+
+T = TypeVar("T")
+
+# Server-side search filters as (media types they return, filter), preferred first.
+# Stickers have no filter of their own; asking for them means scanning every message.
+SEARCH_FILTERS = (
+    (("photo", "video"), raw.types.InputMessagesFilterPhotoVideo),
+    (("photo",), raw.types.InputMessagesFilterPhotos),
+    (("video",), raw.types.InputMessagesFilterVideo),
+    (("animation",), raw.types.InputMessagesFilterGif),
+    (("document",), raw.types.InputMessagesFilterDocument),
+    (("audio",), raw.types.InputMessagesFilterMusic),
+    (("voice", "video_note"), raw.types.InputMessagesFilterRoundVoice),
+    (("voice",), raw.types.InputMessagesFilterVoice),
+    (("video_note",), raw.types.InputMessagesFilterRoundVideo),
+)
+FILTERS_BY_NAME = {search_filter.__name__: search_filter for _, search_filter in SEARCH_FILTERS}
+FILTERS_BY_NAME[raw.types.InputMessagesFilterEmpty.__name__] = raw.types.InputMessagesFilterEmpty
+
+
+def plan_passes(media_types: Iterable[str]) -> List[str]:
+    """Pick the fewest search filters that together return exactly the requested media types."""
+    remaining = set(media_types)
+    if "sticker" in remaining:
+        # One unfiltered scan covers every type at once
+        return [raw.types.InputMessagesFilterEmpty.__name__]
+    passes = []
+    for types, search_filter in SEARCH_FILTERS:
+        if remaining.issuperset(types):
+            passes.append(search_filter.__name__)
+            remaining.difference_update(types)
+    return passes
+
+
+def parse_media_types(value: str) -> List[str]:
+    """Parse 'photo,video' (or 'all') into media types; raises ValueError on unknown names."""
+    if value.lower() == "all":
+        return list(MEDIA_TYPES)
+    media_types = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in media_types if name not in MEDIA_TYPES]
+    if unknown or not media_types:
+        raise ValueError(f"Unknown media type(s): {', '.join(unknown) or value}. "
+                         f"Use: {', '.join(MEDIA_TYPES)} or all")
+    return media_types
+
+
+def parse_time_bound(value: str, now: float) -> int:
+    """Parse a date (2024-05-01) or a duration ago (7d, 12h) into epoch seconds."""
+    duration = parse_duration(value)
+    if duration:
+        return int(now - duration.total_seconds())
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").timestamp())
+    except ValueError:
+        raise ValueError(f"Invalid date or duration: {value} (use e.g. 2024-05-01 or 7d)") from None
+
+
+async def run_bounded(items: Iterable[T], func: Callable[[T], Awaitable[Any]], concurrency: int) -> List[Any]:
+    """Await func(item) for every item, at most `concurrency` at a time, and return the results in order."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run(item: T):
+        async with semaphore:
+            return await func(item)
+    
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+@dataclass
+class PurgeJob:
+    """What to purge from one chat and how far it got; saved as the resumable checkpoint"""
+
+    chat_id: int
+    media_types: List[str] = field(default_factory=lambda: list(MEDIA_TYPES))
+    min_date: int = 0             # Epoch seconds, 0 = no lower bound
+    max_date: int = 0             # Epoch seconds, 0 = no upper bound
+    min_id: int = 0               # Only messages newer than this id
+    from_user: Optional[int] = None
+    passes: List[str] = field(default_factory=list)
+    pass_index: int = 0
+    offset_id: int = 0            # Next page starts below this id (0 = newest)
+    found: int = 0                # Messages the server reported for the passes started so far
+    scanned: int = 0
+    deleted: int = 0
+    started: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        if not self.passes:
+            self.passes = plan_passes(self.media_types)
+
+    @property
+    def done(self) -> bool:
+        return self.pass_index >= len(self.passes)
+
+    @classmethod
+    def from_checkpoint(cls, state: dict) -> "PurgeJob":
+        return cls(**state)
+
+
+ProgressCallback = Callable[[PurgeJob], Awaitable[None]]
+SearchPage = Tuple[List[raw.base.Message], Dict[int, raw.base.User], Dict[int, raw.base.Chat]]
+
+
+class PurgeEngine:
+    """Bulk media deletion driven by server-side search instead of client-side history scans
+
+    Pages of up to 100 matching ids come from messages.search, so text
+    history is never downloaded (unless stickers are requested), and each
+    page is deleted with one call. Each call takes one token from the shared
+    rate limiter and goes through the shared flood controller, so a purge
+    cannot push the account past the limits the live pipeline respects, nor
+    run the budget into debt that starves live deletions. The job is
+    checkpointed after every page.
+    """
+
+    PROGRESS_INTERVAL = 5.0  # Seconds between progress callbacks
+    MAX_ATTEMPTS = 5         # Per call, for transient errors
+
+    def __init__(self, client: Client, rate_limiter: RateLimiter, flood_control: FloodController,
+                 checkpoints: Optional[PurgeCheckpoints] = None):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.flood_control = flood_control
+        self.checkpoints = checkpoints
+
+    def checkpoint(self, chat_id: int) -> Optional[PurgeJob]:
+        """The interrupted purge saved for a chat, if any."""
+        state = self.checkpoints.get(chat_id) if self.checkpoints else None
+        return PurgeJob.from_checkpoint(state) if state else None
+
+    async def run(self, job: PurgeJob, on_progress: Optional[ProgressCallback] = None) -> PurgeJob:
+        """Run (or resume) a purge to completion; raises on errors, leaving the checkpoint."""
+        wanted = set(job.media_types)
+        reported = time.monotonic()
+
+        async for messages, _, _ in self.pages(job):
+            # The filter is a hint; every id is still checked against the requested types
+            ids = [message.id for message in messages
+                   if isinstance(message, raw.types.Message) and get_raw_media_type(message.media) in wanted]
+            if ids:
+                job.deleted += await self._delete(job.chat_id, ids)
+            self._save(job)
+
+            if on_progress and time.monotonic() - reported >= self.PROGRESS_INTERVAL:
+                reported = time.monotonic()
+                await on_progress(job)
+
+        if self.checkpoints:
+            self.checkpoints.clear(job.chat_id)
+        log.info("🗑️ Purged %s media messages in chat %s (%s scanned)", job.deleted, job.chat_id, job.scanned,
+                 extra={"fields": {"chat_id": job.chat_id, "deleted": job.deleted, "scanned": job.scanned}})
+        return job
+
+    async def pages(self, job: PurgeJob) -> AsyncIterator[SearchPage]:
+        """Yield (messages, users, chats) pages matching a job, newest first, advancing its position."""
+        peer = await self.client.resolve_peer(job.chat_id)
+        from_peer = await self.client.resolve_peer(job.from_user) if job.from_user else None
+        while not job.done:
+            search_filter = FILTERS_BY_NAME[job.passes[job.pass_index]]
+            page = await self._call(self.client.invoke, raw.functions.messages.Search(
+                peer=peer, q="", filter=search_filter(), min_date=job.min_date, max_date=job.max_date,
+                offset_id=job.offset_id, add_offset=0, limit=MAX_BATCH_SIZE, max_id=0, min_id=job.min_id,
+                hash=0, from_id=from_peer
+            ))
+            if job.offset_id == 0:
+                job.found += getattr(page, "count", len(page.messages))
+
+            if not page.messages:
+                job.pass_index += 1
+                job.offset_id = 0
+                continue
+            job.scanned += len(page.messages)
+            job.offset_id = min(message.id for message in page.messages)
+            yield (page.messages, {user.id: user for user in page.users},
+                   {chat.id: chat for chat in page.chats})
+
+    def _save(self, job: PurgeJob):
+        if self.checkpoints:
+            self.checkpoints.set(job.chat_id, asdict(job))
+
+    async def _delete(self, chat_id: int, message_ids: Sequence[int]) -> int:
+        """Delete one page of ids once the shared budget allows another API call."""
+        # Charged per request: a 100-id page costs what one live deletion does
+        await self.rate_limiter.acquire(chat_id)
+        return await self._call(self.client.delete_messages, chat_id, list(message_ids))
+
+    async def _call(self, func, *args):
+        """Call through the flood controller, waiting out FloodWait and transient errors."""
+        attempt = 0
+        while True:
+            try:
+                return await self.flood_control.call(func, *args, attempt=attempt)
+            except RetryLater as e:
+                if e.transient:
+                    attempt += 1
+                    if attempt >= self.MAX_ATTEMPTS:
+                        raise
+                log.warning("⏳ Purge call delayed: %s", e)
+                await asyncio.sleep(e.retry_after)
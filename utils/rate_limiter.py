@@ -1,35 +1,210 @@
-from datetime import datetime, timedelta
-from typing import List
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from .clock import Clock, SYSTEM_CLOCK
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    __slots__ = ("per_minute", "rate", "tokens", "updated")
+
+    def __init__(self, per_minute: int, now: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0  # tokens per second
+        self.tokens = float(per_minute)
+        self.updated = now
+
+    def refill(self, now: float):
+        """Add the tokens earned since the last update."""
+        if now > self.updated:
+            self.tokens = min(float(self.per_minute), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, count: int) -> float:
+        """Seconds until `count` tokens are available (assumes refill was just called)."""
+        # A request larger than the bucket only has to wait for a full bucket
+        needed = min(float(count), float(self.per_minute)) - self.tokens
+        return needed / self.rate if needed > 0 else 0.0
+
+    def set_limit(self, per_minute: int, now: float):
+        """Change the refill rate and capacity, keeping the current fill level."""
+        self.refill(now)
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = min(self.tokens, float(per_minute))
+
 
 class RateLimiter:
-    """Manages rate limiting for message deletions"""
-    
-    def __init__(self):
-        self.deletion_times: List[datetime] = []
-    
-    def can_delete(self, max_deletions_per_minute: int) -> bool:
-        """Check if we can delete based on rate limit."""
-        now = datetime.now()
-        # Clean up old entries
-        self.deletion_times[:] = [
-            t for t in self.deletion_times 
-            if now - t < timedelta(minutes=1)
-        ]
-        return len(self.deletion_times) < max_deletions_per_minute
-    
-    def record_deletion(self):
-        """Record a deletion timestamp."""
-        self.deletion_times.append(datetime.now())
-    
+    """Hierarchical token-bucket limiter with global, per-chat and per-media-type budgets"""
+
+    MAX_CHAT_BUCKETS = 1024  # Idle (full) per-chat buckets are dropped past this size
+
+    def __init__(self, max_per_minute: int = 20, per_chat_per_minute: int = 0,
+                 media_type_limits: Optional[Dict[str, int]] = None, clock: Clock = SYSTEM_CLOCK):
+        self.clock = clock
+        now = clock.monotonic()
+        self.max_per_minute = max_per_minute
+        self.scale = 1.0  # Lowered by the flood controller after FloodWait
+        self.global_bucket = TokenBucket(max_per_minute, now)
+        self.per_chat_per_minute = per_chat_per_minute  # 0 disables per-chat budgets
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.type_buckets: Dict[str, TokenBucket] = {
+            media_type: TokenBucket(limit, now)
+            for media_type, limit in (media_type_limits or {}).items() if limit > 0
+        }
+
+    def configure(self, max_per_minute: int, per_chat_per_minute: int = 0,
+                  media_type_limits: Optional[Dict[str, int]] = None):
+        """Apply changed limits; cheap to call when nothing changed."""
+        now = self.clock.monotonic()
+        if self.max_per_minute != max_per_minute:
+            self.max_per_minute = max_per_minute
+            self._apply_global_limit(now)
+
+        if self.per_chat_per_minute != per_chat_per_minute:
+            self.per_chat_per_minute = per_chat_per_minute
+            for bucket in self.chat_buckets.values():
+                bucket.set_limit(per_chat_per_minute, now)
+            if not per_chat_per_minute:
+                self.chat_buckets.clear()
+
+        media_type_limits = media_type_limits or {}
+        for media_type in list(self.type_buckets):
+            if not media_type_limits.get(media_type):
+                del self.type_buckets[media_type]
+        for media_type, limit in media_type_limits.items():
+            if limit <= 0:
+                continue
+            bucket = self.type_buckets.get(media_type)
+            if bucket is None:
+                self.type_buckets[media_type] = TokenBucket(limit, now)
+            elif bucket.per_minute != limit:
+                bucket.set_limit(limit, now)
+
+    def set_scale(self, scale: float):
+        """Scale the global budget (1.0 = configured limit)."""
+        if scale != self.scale:
+            self.scale = scale
+            self._apply_global_limit(self.clock.monotonic())
+
+    def _apply_global_limit(self, now: float):
+        """Resize the global bucket to the configured limit times the current scale."""
+        effective = max(1, int(self.max_per_minute * self.scale))
+        if self.global_bucket.per_minute != effective:
+            self.global_bucket.set_limit(effective, now)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Get or create the bucket for a chat."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                self._prune_chat_buckets()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.per_chat_per_minute, self.clock.monotonic())
+        return bucket
+
+    def _prune_chat_buckets(self):
+        """Drop full buckets; a full bucket behaves exactly like a fresh one."""
+        now = self.clock.monotonic()
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.per_minute:
+                del self.chat_buckets[chat_id]
+
+    def _demands(self, chat_id: Optional[int], counts: Dict[Optional[str], int],
+                 include_global: bool = True) -> List[Tuple[TokenBucket, int]]:
+        """Collect every bucket a group of deletions has to pass through, with the tokens it needs."""
+        total = sum(counts.values())
+        demands = [(self.global_bucket, total)] if include_global else []
+        if chat_id is not None and self.per_chat_per_minute:
+            demands.append((self._chat_bucket(chat_id), total))
+        for media_type, count in counts.items():
+            bucket = self.type_buckets.get(media_type) if media_type is not None else None
+            if bucket is not None:
+                demands.append((bucket, count))
+        return demands
+
+    def try_acquire(self, chat_id: Optional[int] = None, media_type: Optional[str] = None,
+                    count: int = 1) -> bool:
+        """Take `count` tokens from every applicable budget, or none if any is short."""
+        return self.try_acquire_many(chat_id, {media_type: count})
+
+    def try_acquire_many(self, chat_id: Optional[int], counts: Dict[Optional[str], int],
+                         include_global: bool = True) -> bool:
+        """Like try_acquire for deletions of several media types (e.g. an album) at once.
+
+        With include_global=False only the per-chat and per-type budgets are
+        charged, for callers that wait for the global budget separately.
+        """
+        now = self.clock.monotonic()
+        demands = self._demands(chat_id, counts, include_global)
+        for bucket, count in demands:
+            bucket.refill(now)
+            if bucket.tokens < count:
+                return False
+        for bucket, count in demands:
+            bucket.tokens -= count
+        return True
+
+    def wait_time(self, chat_id: Optional[int], counts: Dict[Optional[str], int],
+                  include_global: bool = True) -> float:
+        """Seconds until try_acquire_many with the same arguments could succeed."""
+        now = self.clock.monotonic()
+        wait = 0.0
+        for bucket, count in self._demands(chat_id, counts, include_global):
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(count))
+        return wait
+
+    async def acquire(self, chat_id: Optional[int] = None, media_type: Optional[str] = None,
+                      count: int = 1):
+        """Wait until every applicable budget has room, then take the tokens."""
+        await self.acquire_many(chat_id, {media_type: count})
+
+    async def acquire_many(self, chat_id: Optional[int], counts: Dict[Optional[str], int]):
+        """Like acquire for deletions of several media types (e.g. an album) at once."""
+        while True:
+            now = self.clock.monotonic()
+            demands = self._demands(chat_id, counts)
+            wait = 0.0
+            for bucket, count in demands:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(count))
+            if wait <= 0:
+                # Oversized requests may push a bucket into debt, which later
+                # requests pay back at the normal refill rate
+                for bucket, count in demands:
+                    bucket.tokens -= count
+                return
+            await asyncio.sleep(wait)
+
+    def record_deletion(self, count: int = 1):
+        """Charge deletions that bypassed admission (e.g. `.clear`) to the global budget."""
+        self.global_bucket.refill(self.clock.monotonic())
+        self.global_bucket.tokens -= count
+
+    def headroom(self, chat_id: Optional[int] = None) -> Dict[str, Tuple[int, int]]:
+        """Return {scope: (tokens available, per-minute limit)} without scanning history."""
+        now = self.clock.monotonic()
+        scopes = {"global": self.global_bucket}
+        if chat_id is not None and self.per_chat_per_minute:
+            scopes["chat"] = self.chat_buckets.get(chat_id) or TokenBucket(self.per_chat_per_minute, now)
+        for media_type, bucket in self.type_buckets.items():
+            scopes[media_type] = bucket
+
+        result = {}
+        for scope, bucket in scopes.items():
+            bucket.refill(now)
+            result[scope] = (max(0, int(bucket.tokens)), bucket.per_minute)
+        return result
+
     def get_current_rate(self) -> int:
-        """Get current number of deletions in the last minute."""
-        now = datetime.now()
-        recent_deletions = [
-            t for t in self.deletion_times 
-            if now - t < timedelta(minutes=1)
-        ]
-        return len(recent_deletions)
-    
+        """Approximate number of global tokens used in the last minute."""
+        tokens, limit = self.headroom()["global"]
+        return limit - tokens
+
     def reset(self):
-        """Reset the rate limiter."""
-        self.deletion_times.clear()
+        """Refill every budget."""
+        now = self.clock.monotonic()
+        for bucket in [self.global_bucket, *self.chat_buckets.values(), *self.type_buckets.values()]:
+            bucket.tokens = float(bucket.per_minute)
+            bucket.updated = now
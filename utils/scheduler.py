@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from models.deletion_journal import DeletionJournal
+from .clock import Clock, SYSTEM_CLOCK
+from .log import get_logger
+
+log = get_logger("scheduler")
+
+
+class PendingDeletion:
+    """Compact record of a message waiting to be deleted"""
+
+    __slots__ = ("chat_id", "message_id", "media_type", "due", "deadline", "media_group_id", "user_id",
+                 "attempts", "cancelled", "in_heap")
+
+    def __init__(self, chat_id: int, message_id: int, media_type: str, due: float,
+                 media_group_id: Optional[int] = None, user_id: Optional[int] = None):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.media_type = media_type
+        self.due = due  # Clock.monotonic() time the entry fires next
+        self.deadline = due  # Original deadline; `due` moves on retries, this does not
+        self.media_group_id = media_group_id
+        self.user_id = user_id  # Sender, if known
+        self.attempts = 0  # Failed transient delete attempts so far
+        self.cancelled = False  # Set by cancel_*; every pipeline stage skips cancelled entries
+        self.in_heap = False
+
+    def __lt__(self, other: "PendingDeletion") -> bool:
+        return self.due < other.due
+
+    def __repr__(self) -> str:
+        return f"PendingDeletion({self.chat_id}, {self.message_id}, {self.media_type!r}, due={self.due:.1f})"
+
+
+class DeletionScheduler:
+    """Min-heap of pending deletions fired by a single driver task
+
+    Every entry that has not been completed yet (whether still waiting in the
+    heap or already handed downstream) is indexed by chat and sender, so a
+    user's or a chat's pending deletions can be cancelled in O(1) per entry.
+    """
+
+    def __init__(self, on_due: Callable[[List[PendingDeletion]], Awaitable[None]],
+                 journal: Optional[DeletionJournal] = None,
+                 on_cancel: Optional[Callable[[List[PendingDeletion]], None]] = None,
+                 clock: Clock = SYSTEM_CLOCK):
+        self.on_due = on_due  # Called with each due entry, or with all due items of an album together
+        self.on_cancel = on_cancel  # Called with cancelled entries, so downstream queues can let go of them
+        self.clock = clock
+        self.journal = journal
+        self._heap: List[PendingDeletion] = []
+        self._cancelled_in_heap = 0
+        # (chat_id, media_group_id) -> due time shared by every item of an album
+        self._album_due: Dict[Tuple[int, int], float] = {}
+        # chat_id -> user_id -> entries, plus user_id -> chats for cross-chat cancellation
+        self._by_chat: Dict[int, Dict[Optional[int], Set[PendingDeletion]]] = {}
+        self._user_chats: Dict[int, Set[int]] = {}
+        self._frozen = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._driver: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled_in_heap
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def schedule(self, chat_id: int, message_id: int, media_type: str, delay: float,
+                 media_group_id: Optional[int] = None, user_id: Optional[int] = None,
+                 persist: bool = True) -> PendingDeletion:
+        """Queue a message for deletion after `delay` seconds and return immediately."""
+        due = self.clock.monotonic() + delay
+        if media_group_id:
+            # Later album items inherit the first item's deadline so they fire together
+            due = self._album_due.setdefault((chat_id, media_group_id), due)
+            delay = due - self.clock.monotonic()
+
+        entry = PendingDeletion(chat_id, message_id, media_type, due, media_group_id, user_id)
+        self._push(entry)
+        self._index_add(entry)
+        if persist and self.journal:
+            # The journal stores wall-clock time so it stays valid across restarts
+            self.journal.record_scheduled(chat_id, message_id, media_type, self.clock.time() + delay,
+                                          media_group_id, user_id)
+        self.start()
+        # Only wake the driver if the new entry is now the earliest one
+        if self._heap[0] is entry:
+            self._wakeup.set()
+        return entry
+
+    def _push(self, entry: PendingDeletion):
+        entry.in_heap = True
+        heapq.heappush(self._heap, entry)
+
+    def reschedule(self, entries: Iterable[PendingDeletion], delay: float):
+        """Put entries back in the heap to retry after `delay` seconds (journal is unchanged)."""
+        due = self.clock.monotonic() + delay
+        for entry in entries:
+            if entry.cancelled:
+                continue
+            entry.due = due
+            self._push(entry)
+        self.start()
+        self._wakeup.set()
+
+    def mark_done(self, entries: Iterable[PendingDeletion]):
+        """Forget entries once their deletion has been attempted."""
+        for entry in entries:
+            self._index_remove(entry)
+            if self.journal:
+                self.journal.record_done(entry.chat_id, entry.message_id)
+
+    # Cancellation index
+    def _index_add(self, entry: PendingDeletion):
+        users = self._by_chat.setdefault(entry.chat_id, {})
+        users.setdefault(entry.user_id, set()).add(entry)
+        if entry.user_id is not None:
+            self._user_chats.setdefault(entry.user_id, set()).add(entry.chat_id)
+
+    def _index_remove(self, entry: PendingDeletion):
+        users = self._by_chat.get(entry.chat_id)
+        if not users or entry.user_id not in users:
+            return
+        entries = users[entry.user_id]
+        entries.discard(entry)
+        if entries:
+            return
+        del users[entry.user_id]
+        if not users:
+            del self._by_chat[entry.chat_id]
+        if entry.user_id is not None:
+            chats = self._user_chats[entry.user_id]
+            chats.discard(entry.chat_id)
+            if not chats:
+                del self._user_chats[entry.user_id]
+
+    def cancel_user(self, user_id: int, chat_id: Optional[int] = None) -> int:
+        """Cancel a user's pending deletions in one chat, or in every chat."""
+        chat_ids = [chat_id] if chat_id is not None else list(self._user_chats.get(user_id, ()))
+        cancelled = []
+        for cid in chat_ids:
+            cancelled.extend(self._by_chat.get(cid, {}).get(user_id, ()))
+        return self._retire(cancelled)
+
+    def cancel_chat(self, chat_id: int) -> int:
+        """Cancel every pending deletion in a chat."""
+        cancelled = [entry for entries in self._by_chat.get(chat_id, {}).values() for entry in entries]
+        return self._retire(cancelled)
+
+    def pending_for_chat(self, chat_id: int) -> int:
+        """Number of uncompleted deletions in a chat."""
+        return sum(len(entries) for entries in self._by_chat.get(chat_id, {}).values())
+
+    def _retire(self, entries: List[PendingDeletion]) -> int:
+        """Mark entries cancelled and drop them from the index and journal."""
+        for entry in entries:
+            entry.cancelled = True
+            if entry.in_heap:
+                self._cancelled_in_heap += 1
+            if entry.media_group_id:
+                # The heap rebuild below may discard the entry before the driver ever pops it
+                self._album_due.pop((entry.chat_id, entry.media_group_id), None)
+        self.mark_done(entries)
+        if self.on_cancel and entries:
+            self.on_cancel(entries)
+        # Rebuild the heap once cancelled entries dominate it
+        if self._cancelled_in_heap > 1000 and self._cancelled_in_heap * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled_in_heap = 0
+        return len(entries)
+
+    # Pause support
+    def freeze(self):
+        """Stop firing due entries until thaw() is called."""
+        self._frozen = True
+
+    def thaw(self):
+        """Resume firing; anything that became due meanwhile fires right away."""
+        self._frozen = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the driver task if it is not already running."""
+        if self._driver is None or self._driver.done():
+            self._wakeup = asyncio.Event()
+            self._driver = asyncio.get_running_loop().create_task(self._run())
+
+    def restore(self) -> int:
+        """Re-schedule deletions left in the journal by a previous run."""
+        if not self.journal:
+            return 0
+        now = self.clock.time()
+        pending = self.journal.pending()
+        for chat_id, message_id, media_type, due, media_group_id, user_id in pending:
+            # Overdue entries get a zero delay and fire on the next driver pass
+            self.schedule(chat_id, message_id, media_type, max(0.0, due - now),
+                          media_group_id, user_id, persist=False)
+        return len(pending)
+
+    async def stop(self):
+        """Cancel the driver task; pending entries stay in the heap and journal."""
+        if self._driver and not self._driver.done():
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+        self._driver = None
+        if self.journal:
+            self.journal.close()
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest pending deletion, or None if idle."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0].due - self.clock.monotonic())
+
+    def _pop_album(self, first: PendingDeletion) -> List[PendingDeletion]:
+        """Pop the rest of `first`'s album; its items share one deadline, so they sit at the top of the heap."""
+        siblings, others = [], []
+        while self._heap and self._heap[0].due == first.due:
+            entry = heapq.heappop(self._heap)
+            entry.in_heap = False
+            if entry.cancelled:
+                self._cancelled_in_heap -= 1
+            elif entry.chat_id == first.chat_id and entry.media_group_id == first.media_group_id:
+                siblings.append(entry)
+            else:
+                others.append(entry)
+        for entry in others:
+            self._push(entry)
+        return siblings
+
+    async def _run(self):
+        """Driver loop: sleep until the earliest deadline, then fire everything due."""
+        while True:
+            timeout = None
+            if not self._frozen:
+                now = self.clock.monotonic()
+                while self._heap and self._heap[0].due <= now and not self._frozen:
+                    entry = heapq.heappop(self._heap)
+                    entry.in_heap = False
+                    if entry.media_group_id:
+                        # Also for cancelled items, or fully cancelled albums would leak their key
+                        self._album_due.pop((entry.chat_id, entry.media_group_id), None)
+                    if entry.cancelled:
+                        self._cancelled_in_heap -= 1
+                        continue
+                    due = [entry]
+                    if entry.media_group_id:
+                        due.extend(self._pop_album(entry))
+                    try:
+                        await self.on_due(due)
+                    except Exception as e:
+                        log.error("❌ Error firing scheduled deletion %s: %s", entry, e)
+                    now = self.clock.monotonic()
+
+                if self._heap and not self._frozen:
+                    timeout = self._heap[0].due - now
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+
+from .scheduler import PendingDeletion
+from .log import get_logger
+
+log = get_logger("workers")
+
+
+class DeletionWorkerPool:
+    """Resizable pool of deletion workers fed by a bounded queue of batches"""
+
+    def __init__(self, execute: Callable[[int, List[PendingDeletion]], Awaitable[None]],
+                 size: int, capacity: int):
+        self.execute = execute  # Called with (chat_id, entries) for each batch
+        self.size = size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=capacity)
+        self._workers: Set[asyncio.Task] = set()
+        self._busy: Set[asyncio.Task] = set()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+
+    def __len__(self) -> int:
+        return self.queue.qsize()
+
+    @property
+    def saturated(self) -> bool:
+        """True when the batch queue is full and producers should back off."""
+        return self.queue.full()
+
+    @property
+    def busy_workers(self) -> int:
+        return len(self._busy)
+
+    async def submit(self, chat_id: int, entries: List[PendingDeletion]):
+        """Queue a batch, waiting if the queue is at capacity."""
+        self.start()
+        await self.queue.put((chat_id, entries))
+
+    async def wait_for_room(self):
+        """Block while the batch queue is full."""
+        while self.queue.full():
+            self._has_room.clear()
+            await self._has_room.wait()
+
+    def start(self):
+        """Spawn workers up to the configured pool size."""
+        loop = asyncio.get_running_loop()
+        while len(self._workers) < self.size:
+            task = loop.create_task(self._worker())
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+
+    def resize(self, size: int):
+        """Change the number of workers; busy workers finish their batch before exiting."""
+        if size == self.size:
+            return
+        self.size = size
+        if len(self._workers) < size:
+            self.start()
+            return
+        # Cancel idle workers first; busy ones exit after their current batch.
+        # Cancelled workers leave the set now so busy ones only count survivors.
+        for task in list(self._workers - self._busy)[:len(self._workers) - size]:
+            self._workers.discard(task)
+            task.cancel()
+
+    async def stop(self):
+        """Cancel all workers; queued batches are still in the journal."""
+        workers = list(self._workers)
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _worker(self):
+        """Take batches off the queue and execute them one at a time."""
+        me: Optional[asyncio.Task] = asyncio.current_task()
+        while True:
+            if len(self._workers) > self.size:
+                # Pool was shrunk while this worker was busy
+                self._workers.discard(me)
+                return
+            chat_id, entries = await self.queue.get()
+            self._has_room.set()
+            self._busy.add(me)
+            try:
+                await self.execute(chat_id, entries)
+            except Exception as e:
+                log.error("❌ Deletion worker error in chat %s: %s", chat_id, e)
+            finally:
+                self._busy.discard(me)
+                self.queue.task_done()